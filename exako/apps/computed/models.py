@@ -7,6 +7,7 @@ from pydantic import ValidationError
 from exako.apps.computed import schema
 from exako.apps.exercise import models
 from exako.core.constants import ExerciseType, Language
+from exako.core.fields import CHOICE_MAP_ENCODERS, ChoiceMapField
 
 
 class ExerciseComputed(Document):
@@ -62,12 +63,14 @@ class ExerciseComputed(Document):
             computed = await cls(**data).insert()
         else:
             cls.validate_exercise_data(**data | computed.model_dump(exclude_none=True))
-            computed = await computed.update({'$set': data})
+            # validated again so choice maps are stored with their bson encoder
+            computed = await cls.model_validate(computed.model_dump() | data).save()
         return await cls.insert_exercise(computed)
 
     class Settings:
         is_root = True
         name = 'exercises_computed'
+        bson_encoders = CHOICE_MAP_ENCODERS
 
 
 class OrderSentenceComputed(ExerciseComputed):
@@ -94,7 +97,7 @@ class ListenTermMChoiceComputed(ExerciseComputed):
     audio_url: str | None = None
     content: str | None = None
     term_id: UUID
-    distractors: dict[UUID, str] | None = None
+    distractors: ChoiceMapField | None = None
 
     term_reference: ClassVar[str] = 'term_id'
     model: ClassVar = models.ListenTermMChoice
@@ -137,7 +140,7 @@ class TermSentenceMChoiceComputed(ExerciseComputed):
     sentence: str | None = None
     answer: str | None = None
     term_id: UUID
-    distractors: dict[UUID, str] | None = None
+    distractors: ChoiceMapField | None = None
 
     term_reference: ClassVar[str] = 'term_id'
     model: ClassVar = models.TermSentenceMChoice
@@ -149,7 +152,7 @@ class TermDefinitionMChoiceComputed(ExerciseComputed):
     answer: str | None = None
     term_id: UUID
     term_definition_id: UUID
-    distractors: dict[UUID, str] | None = None
+    distractors: ChoiceMapField | None = None
 
     term_reference: ClassVar[str] = 'term_definition_id'
     model: ClassVar = models.TermDefinitionMChoice
@@ -160,7 +163,7 @@ class TermImageMChoiceComputed(ExerciseComputed):
     image_url: str | None = None
     audio_url: str | None = None
     term_id: UUID
-    distractors: dict[UUID, str] | None = None
+    distractors: ChoiceMapField | None = None
 
     term_reference: ClassVar[str] = 'term_id'
     model: ClassVar = models.TermImageMChoice
@@ -171,7 +174,7 @@ class TermImageTextMChoiceComputed(ExerciseComputed):
     image_url: str | None = None
     answer: str | None = None
     term_id: UUID
-    distractors: dict[UUID, str] | None = None
+    distractors: ChoiceMapField | None = None
 
     term_reference: ClassVar[str] = 'term_id'
     model: ClassVar = models.TermImageTextMChoice
@@ -181,8 +184,8 @@ class TermImageTextMChoiceComputed(ExerciseComputed):
 class TermConnectionComputed(ExerciseComputed):
     content: str | None = None
     term_id: UUID
-    connections: dict[UUID, str] | None = None
-    distractors: dict[UUID, str] | None = None
+    connections: ChoiceMapField | None = None
+    distractors: ChoiceMapField | None = None
 
     term_reference: ClassVar[str] = 'term_id'
     model: ClassVar = models.TermConnection
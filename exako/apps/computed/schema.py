@@ -9,7 +9,7 @@ from exako.apps.exercise.schema import (
     validate_image_url,
 )
 from exako.core.constants import ExerciseType, Language
-from exako.core.helper import normalize_array_text
+from exako.core.normalize import normalize_texts
 
 
 class ExerciseCreateBase(BaseModel):
@@ -32,8 +32,8 @@ class OrderSentenceSchema(BaseModel):
 
     @model_validator(mode='after')
     def validate_distractors(self):
-        normalized_sentence = normalize_array_text(self.sentence)
-        normalized_distractors = normalize_array_text(self.distractors)
+        normalized_sentence = normalize_texts(self.sentence)
+        normalized_distractors = normalize_texts(self.distractors)
 
         intersection = set(normalized_sentence).intersection(
             set(normalized_distractors)
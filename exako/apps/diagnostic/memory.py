@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+from exako import prefork
+
+PROC_DIR = Path('/proc')
+
+SMAPS_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared',
+    'Shared_Dirty': 'shared',
+    'Private_Clean': 'uss',
+    'Private_Dirty': 'uss',
+}
+
+
+def parse_smaps(content: str) -> dict[str, int]:
+    # values are reported in kB, smaps has one block per mapping and
+    # smaps_rollup a single block with the sums.
+    memory = dict.fromkeys(SMAPS_FIELDS.values(), 0)
+    for line in content.splitlines():
+        name, _, value = line.partition(':')
+        field = SMAPS_FIELDS.get(name)
+        if field is not None:
+            memory[field] += int(value.split()[0]) * 1024
+    return memory
+
+
+def process_memory(pid: int) -> dict[str, int]:
+    rollup = PROC_DIR / str(pid) / 'smaps_rollup'
+    if not rollup.exists():
+        rollup = PROC_DIR / str(pid) / 'smaps'
+    return parse_smaps(rollup.read_text())
+
+
+def child_pids(pid: int) -> list[int]:
+    children = list()
+    for stat in PROC_DIR.glob('[0-9]*/stat'):
+        try:
+            # the command name may contain spaces, the fields after it do not
+            fields = stat.read_text().rpartition(')')[2].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(stat.parent.name))
+    return sorted(children)
+
+
+def server_processes() -> list[tuple[int, str]]:
+    parent_pid = prefork.get_parent_pid()
+    if parent_pid is None or parent_pid != os.getppid():
+        return [(os.getpid(), 'worker')]
+    return [(parent_pid, 'master')] + [
+        (pid, 'worker') for pid in child_pids(parent_pid)
+    ]
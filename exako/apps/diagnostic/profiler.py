@@ -0,0 +1,156 @@
+import cProfile
+import io
+import marshal
+import pstats
+from collections import OrderedDict
+from datetime import datetime, timezone
+from time import perf_counter
+from uuid import uuid4
+
+from starlette.responses import JSONResponse
+
+from exako.auth import is_admin_token
+
+PROFILE_HEADER = b'x-profile'
+PROFILE_ID_HEADER = b'x-profile-id'
+PROFILE_HISTORY = 20
+REPORT_LIMIT = 60
+
+
+class RequestProfile:
+    __slots__ = (
+        'id',
+        'method',
+        'path',
+        'status',
+        'duration',
+        'concurrent',
+        'created_at',
+        'stats',
+    )
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid4().hex
+        self.method = method
+        self.path = path
+        self.status: int | None = None
+        self.duration = 0.0
+        # other requests on the loop while profiling, their calls are included
+        self.concurrent = 0
+        self.created_at = datetime.now(timezone.utc)
+        self.stats: pstats.Stats | None = None
+
+    def report(self, limit: int = REPORT_LIMIT) -> str:
+        stream = io.StringIO()
+        if self.concurrent:
+            print(
+                f'{self.concurrent} other requests ran during this profile, '
+                'their calls are included.',
+                file=stream,
+            )
+        # sorting changes the stats, each report works on its own copy
+        stats = pstats.Stats(stream=stream)
+        stats.add(self.stats)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        stats.print_stats(limit)
+        stats.print_callees(limit)
+        return stream.getvalue()
+
+    def dump(self) -> bytes:
+        # same format as pstats.Stats.dump_stats, readable by snakeviz
+        return marshal.dumps(self.stats.stats)
+
+
+class ProfileStore:
+    def __init__(self, size: int = PROFILE_HISTORY):
+        self.size = size
+        self.profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+
+    def add(self, profile: RequestProfile):
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.size:
+            self.profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        return self.profiles.get(profile_id)
+
+    def list(self) -> list[RequestProfile]:
+        return list(reversed(self.profiles.values()))
+
+
+profile_store = ProfileStore()
+
+
+def header_value(scope, name: bytes) -> bytes | None:
+    for key, value in scope['headers']:
+        if key == name:
+            return value
+    return None
+
+
+def bearer_token(scope) -> str | None:
+    authorization = header_value(scope, b'authorization')
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.decode('latin-1').partition(' ')
+    return token if scheme.lower() == 'bearer' else None
+
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = 0
+        self.profile: RequestProfile | None = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        self.in_flight += 1
+        try:
+            if await self.should_profile(scope):
+                return await self.profile_request(scope, receive, send)
+            if self.profile is not None:
+                self.profile.concurrent += 1
+            return await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def should_profile(self, scope) -> bool:
+        if header_value(scope, PROFILE_HEADER) is None:
+            return False
+        token = bearer_token(scope)
+        return token is not None and await is_admin_token(token)
+
+    async def profile_request(self, scope, receive, send):
+        # cProfile follows one thread, a second profiler would mix both requests
+        if self.profile is not None:
+            response = JSONResponse(
+                status_code=409,
+                content={'detail': 'another request is being profiled.'},
+            )
+            return await response(scope, receive, send)
+
+        profile = RequestProfile(scope['method'], scope['path'])
+
+        async def send_with_profile(message):
+            if message['type'] == 'http.response.start':
+                profile.status = message['status']
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (PROFILE_ID_HEADER, profile.id.encode()),
+                ]
+            await send(message)
+
+        self.profile = profile
+        profile.concurrent = self.in_flight - 1
+        profiler = cProfile.Profile()
+        start = perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.disable()
+            profile.duration = perf_counter() - start
+            profile.stats = pstats.Stats(profiler)
+            profile_store.add(profile)
+            self.profile = None
@@ -0,0 +1,119 @@
+import os
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fief_client import FiefUserInfo
+
+from exako.apps.diagnostic import memory, schema
+from exako.apps.diagnostic.profiler import profile_store
+from exako.auth import current_admin_user
+from exako.core import metrics
+from exako.core import schema as core_schema
+from exako.core.query_monitor import query_monitor
+
+diagnostic_router = APIRouter()
+
+
+@diagnostic_router.get(
+    '/memory',
+    response_model=schema.MemoryRead,
+    responses={
+        **core_schema.PERMISSION_DENIED,
+        status.HTTP_501_NOT_IMPLEMENTED: {
+            'description': 'O sistema operacional não expõe o uso de memória por processo.',
+            'content': {
+                'application/json': {
+                    'example': {'detail': 'memory diagnostics are not available.'}
+                }
+            },
+        },
+    },
+    summary='Consultar o uso de memória dos workers.',
+    description='Retorna a memória única (uss), proporcional (pss) e residente (rss) de cada processo do servidor, em bytes, para conferir o compartilhamento dos modelos entre os workers.',
+)
+def get_memory(user: Annotated[FiefUserInfo, Depends(current_admin_user)]):
+    if not memory.PROC_DIR.exists():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail='memory diagnostics are not available.',
+        )
+
+    processes = list()
+    for pid, role in memory.server_processes():
+        try:
+            usage = memory.process_memory(pid)
+        except (FileNotFoundError, ProcessLookupError):
+            continue  # worker exited while the report was built
+        processes.append({'pid': pid, 'role': role, **usage})
+    return {'current_pid': os.getpid(), 'processes': processes}
+
+
+@diagnostic_router.get(
+    '/metrics',
+    response_class=Response,
+    responses={
+        **core_schema.PERMISSION_DENIED,
+        status.HTTP_200_OK: {'content': {metrics.CONTENT_TYPE: {}}},
+    },
+    summary='Consultar as métricas de latência do worker.',
+    description='Retorna os histogramas de latência por rota, comandos do banco, requisições a outros serviços e transcrição de áudio no formato de texto do Prometheus. Cada worker mantém as próprias métricas.',
+)
+def get_metrics(user: Annotated[FiefUserInfo, Depends(current_admin_user)]):
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@diagnostic_router.get(
+    '/queries',
+    response_model=list[schema.QueryShapeRead],
+    responses={**core_schema.PERMISSION_DENIED},
+    summary='Consultar os comandos do banco que mais consomem tempo.',
+    description='Retorna os formatos de consulta, com os valores removidos, ordenados pelo tempo total gasto neste worker. Comandos acima do limite de lentidão guardam o plano de execução do explain.',
+)
+def list_queries(
+    user: Annotated[FiefUserInfo, Depends(current_admin_user)],
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    return query_monitor.top(limit)
+
+
+@diagnostic_router.get(
+    '/profiles',
+    response_model=list[schema.ProfileRead],
+    responses={**core_schema.PERMISSION_DENIED},
+    summary='Listar as requisições perfiladas.',
+    description='Requisições de administradores com o cabeçalho X-Profile são executadas com o cProfile e o id do perfil é retornado no cabeçalho X-Profile-Id. O cProfile acompanha todo o event loop, então concurrent informa quantas outras requisições foram executadas durante o perfil. Somente os últimos perfis de cada worker são mantidos.',
+)
+def list_profiles(user: Annotated[FiefUserInfo, Depends(current_admin_user)]):
+    return profile_store.list()
+
+
+@diagnostic_router.get(
+    '/profiles/{profile_id}',
+    response_class=Response,
+    responses={
+        **core_schema.PERMISSION_DENIED,
+        **core_schema.OBJECT_NOT_FOUND,
+        status.HTTP_200_OK: {
+            'content': {'text/plain': {}, 'application/octet-stream': {}}
+        },
+    },
+    summary='Consultar o perfil de uma requisição.',
+    description='Retorna as funções ordenadas pelo tempo acumulado com as funções chamadas por cada uma. Com format=pstats retorna o arquivo do pstats para abrir em ferramentas como o snakeviz.',
+)
+def get_profile(
+    user: Annotated[FiefUserInfo, Depends(current_admin_user)],
+    profile_id: str,
+    format: Literal['text', 'pstats'] = 'text',
+):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail='profile not found.')
+    if format == 'pstats':
+        return Response(
+            profile.dump(),
+            media_type='application/octet-stream',
+            headers={
+                'Content-Disposition': f'attachment; filename="{profile.id}.prof"'
+            },
+        )
+    return Response(profile.report(), media_type='text/plain')
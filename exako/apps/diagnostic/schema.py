@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+
+class ProcessMemory(BaseModel):
+    pid: int
+    role: Literal['master', 'worker']
+    rss: int
+    pss: int
+    uss: int
+    shared: int
+
+
+class MemoryRead(BaseModel):
+    current_pid: int
+    processes: list[ProcessMemory]
+
+
+class QueryShapeRead(BaseModel):
+    shape: dict[str, Any]
+    database: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow_count: int
+    explain: dict[str, Any] | None
+
+
+class ProfileRead(BaseModel):
+    id: str
+    method: str
+    path: str
+    status: int | None
+    duration: float
+    concurrent: int
+    created_at: datetime
@@ -5,38 +5,77 @@ from typing import Annotated, Any, Callable
 from uuid import UUID
 
 from beanie import PydanticObjectId
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fief_client import FiefUserInfo
 from pydantic import BaseModel, Field, create_model
 
 from exako.apps.exercise import models
+from exako.apps.exercise.jobs import SpeakJobQueue
+from exako.apps.exercise.schema import ExerciseResponseSpeak, SpeakJobCreated
+from exako.apps.exercise.statistic import exercise_statistic
+from exako.apps.exercise.view import ExerciseView, get_view_loader
 from exako.apps.exercise.voice import text
-from exako.apps.exercise.voice.transcriber import trascribe_to_text
-from exako.apps.history.models import ExerciseHistory
+from exako.apps.exercise.voice.transcriber import (
+    trascribe_stream,
+    trascribe_to_text,
+)
+from exako.apps.history.models import (
+    ExerciseHistory,
+    ExerciseReview,
+    ExerciseSeenFilter,
+)
 from exako.auth import current_user
 from exako.core import helper
 from exako.core import schema as core_schema
 from exako.core.constants import ExerciseType
+from exako.core.normalize import normalize_text
+from exako.core.tracing import span
+from exako.settings import settings
 
 
 class ExerciseBase(ABC):
     exercise_type: ExerciseType
+    exercise_model: type[models.Exercise]
+    # fields read from the exercise document by the build and check endpoints
+    build_fields: tuple[str, ...]
+    check_fields: tuple[str, ...]
 
-    async def __init__(
-        self,
-        exercise_id: PydanticObjectId,
-    ):
-        instance = await models.Exercise.find(
-            {
-                'id': exercise_id,
-                'type': self.exercise_type,
-            },
-            with_children=True,
-        ).first_or_none()
-        if instance is None:
-            raise HTTPException(status_code=404, detail='exercise not found.')
+    def __init__(self, instance: ExerciseView):
         self.instance = instance
 
+    @classmethod
+    async def load(
+        cls, exercise_id: PydanticObjectId, fields: tuple[str, ...]
+    ) -> 'ExerciseBase':
+        loader = get_view_loader(cls.exercise_model, fields)
+        with span('exercise.load', type=cls.exercise_type.name):
+            document = await models.Exercise.get_motor_collection().find_one(
+                {'_id': exercise_id, 'type': cls.exercise_type.value},
+                loader.projection,
+            )
+        if document is None:
+            raise HTTPException(status_code=404, detail='exercise not found.')
+        return cls(loader.load(document))
+
+    @classmethod
+    async def get(cls, exercise_id: PydanticObjectId) -> 'ExerciseBase':
+        return await cls.load(exercise_id, cls.check_fields)
+
+    @classmethod
+    async def get_for_build(cls, exercise_id: PydanticObjectId) -> 'ExerciseBase':
+        return await cls.load(exercise_id, cls.build_fields)
+
     @abstractmethod
     def build(self) -> dict: ...
 
@@ -58,13 +97,18 @@ class ExerciseBase(ABC):
             'correct': correct,
             'correct_answer': self.correct_answer,
         }
-        await ExerciseHistory(
-            exercise=self.instance,
-            user_id=user_id,
-            correct=correct,
-            response={**answer, **check_response},
-            request=exercise_request,
-        ).insert()
+        with span('history.insert'):
+            await ExerciseHistory(
+                exercise=self.instance.id,
+                user_id=user_id,
+                correct=correct,
+                response={**answer, **check_response},
+                request=exercise_request,
+            ).insert()
+        with span('history.review'):
+            await ExerciseSeenFilter.register(UUID(user_id), self.instance.id)
+            await ExerciseReview.review(UUID(user_id), self.instance, correct)
+            exercise_statistic.record(self.instance.id, correct)
         return check_response
 
     # fastapi endpoint methods
@@ -75,7 +119,7 @@ class ExerciseBase(ABC):
     ) -> tuple[Callable, dict]:
         async def build_endpoint(
             user: Annotated[FiefUserInfo, Depends(current_user)],
-            exercise_builder: Annotated[ExerciseBase, Depends(cls)],
+            exercise_builder: Annotated[ExerciseBase, Depends(cls.get_for_build)],
         ):
             return exercise_schema(**exercise_builder.build())
 
@@ -124,7 +168,7 @@ class ExerciseBase(ABC):
     ) -> tuple[Callable, dict]:
         async def check_endpoint(
             user: Annotated[FiefUserInfo, Depends(current_user)],
-            exercise_builder: Annotated[ExerciseBase, Depends(cls)],
+            exercise_builder: Annotated[ExerciseBase, Depends(cls.get)],
             answer: cls.generate_answer_schema(schema, **answer_fields),
         ):
             return await exercise_builder.check(
@@ -173,7 +217,9 @@ class ExerciseBase(ABC):
 
 class OrderSentenceExercise(ExerciseBase):
     exercise_type = ExerciseType.ORDER_SENTENCE
-    instance: type[models.OrderSentence]
+    exercise_model = models.OrderSentence
+    build_fields = ('sentence', 'distractors')
+    check_fields = ('sentence',)
 
     @property
     def distractors(self) -> list:
@@ -196,7 +242,9 @@ class OrderSentenceExercise(ExerciseBase):
 
 class ListenTermExercise(ExerciseBase):
     exercise_type = ExerciseType.LISTEN_TERM
-    instance: type[models.ListenTerm]
+    exercise_model = models.ListenTerm
+    build_fields = ('audio_url',)
+    check_fields = ('answer',)
 
     def build(self) -> dict:
         return {'audio_url': self.instance.audio_url}
@@ -206,14 +254,17 @@ class ListenTermExercise(ExerciseBase):
         return self.instance.answer
 
     def assert_answer(self, answer: dict) -> bool:
-        sentence = helper.normalize_text(answer['content'])
-        correct_answer = helper.normalize_text(self.correct_answer)
+        language = self.instance.language
+        sentence = normalize_text(answer['content'], language)
+        correct_answer = normalize_text(self.correct_answer, language)
         return sentence == correct_answer
 
 
 class ListenTermMChoiceExercise(ExerciseBase):
     exercise_type = ExerciseType.LISTEN_TERM_MCHOICE
-    instance: type[models.ListenTermMChoice]
+    exercise_model = models.ListenTermMChoice
+    build_fields = ('term_id', 'audio_url', 'distractors', 'content')
+    check_fields = ('term_id',)
 
     @property
     def distractors(self) -> dict:
@@ -236,7 +287,9 @@ class ListenTermMChoiceExercise(ExerciseBase):
 
 class ListenSentenceExercise(ExerciseBase):
     exercise_type = ExerciseType.LISTEN_SENTENCE
-    instance: type[models.ListenSentence]
+    exercise_model = models.ListenSentence
+    build_fields = ('audio_url',)
+    check_fields = ('answer',)
 
     def build(self) -> dict:
         return {'audio_url': self.instance.audio_url}
@@ -246,11 +299,46 @@ class ListenSentenceExercise(ExerciseBase):
         return self.instance.answer
 
     def assert_answer(self, answer: dict) -> bool:
-        sentence = helper.normalize_text(answer['content'])
-        correct_answer = helper.normalize_text(self.correct_answer)
+        language = self.instance.language
+        sentence = normalize_text(answer['content'], language)
+        correct_answer = normalize_text(self.correct_answer, language)
         return sentence == correct_answer
 
 
+SPEAK_CHECK_RESPONSES = {
+    status.HTTP_400_BAD_REQUEST: {
+        'content': {
+            'application/json': {
+                'examples': {
+                    'invalid_format': {
+                        'summary': 'InvalidAudioFormat',
+                        'value': {'detail': 'audio file must be WAV format PCM.'},
+                    },
+                    'could_not_trascribe': {
+                        'summary': 'CouldNotTrascribe',
+                        'value': {'detail': 'could not trascribe text.'},
+                    },
+                }
+            }
+        },
+    },
+    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
+        'content': {
+            'application/json': {'example': {'detail': 'audio_file is too big.'}}
+        },
+    },
+    status.HTTP_503_SERVICE_UNAVAILABLE: {
+        'content': {
+            'application/json': {
+                'example': {
+                    'detail': 'something went wrong in audio_file transcription.'
+                }
+            }
+        },
+    },
+}
+
+
 class SpeakExerciseBase(ExerciseBase):
     MAX_TEXT_DISTANCE = 3
 
@@ -260,10 +348,29 @@ class SpeakExerciseBase(ExerciseBase):
     ) -> tuple[Callable, dict]:
         async def check_endpoint(
             user: Annotated[FiefUserInfo, Depends(current_user)],
-            exercise_builder: Annotated[ExerciseBase, Depends(cls)],
+            exercise_builder: Annotated[ExerciseBase, Depends(cls.get)],
             answer: schema,
             audio: UploadFile,
+            async_mode: bool = Query(
+                default=False,
+                alias='async',
+                description='Corrigir em segundo plano e retornar o id da tarefa.',
+            ),
         ):
+            if async_mode:
+                job = await speak_job_queue.submit(
+                    models.SpeakJob(
+                        exercise_id=exercise_builder.instance.id,
+                        type=cls.exercise_type,
+                        user_id=user['sub'],
+                        audio=await audio.read(),
+                        request=answer.model_dump(),
+                    )
+                )
+                return JSONResponse(
+                    status_code=status.HTTP_202_ACCEPTED,
+                    content=jsonable_encoder(SpeakJobCreated(id=job.id)),
+                )
             return await exercise_builder.check(
                 user_id=user['sub'],
                 answer={'audio': await audio.read()},
@@ -274,60 +381,85 @@ class SpeakExerciseBase(ExerciseBase):
             'responses': {
                 **core_schema.NOT_AUTHENTICATED,
                 **core_schema.OBJECT_NOT_FOUND,
-                status.HTTP_400_BAD_REQUEST: {
-                    'content': {
-                        'application/json': {
-                            'examples': {
-                                'invalid_format': {
-                                    'summary': 'InvalidAudioFormat',
-                                    'value': {
-                                        'detail': 'audio file must be WAV format mono PCM.'
-                                    },
-                                },
-                                'could_not_trascribe': {
-                                    'summary': 'CouldNotTrascribe',
-                                    'value': {'detail': 'could not trascribe text.'},
-                                },
-                            }
-                        }
-                    },
+                status.HTTP_202_ACCEPTED: {
+                    'model': SpeakJobCreated,
+                    'description': 'Correção enfileirada quando async=true.',
                 },
-                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {
-                    'content': {
-                        'application/json': {
-                            'example': {'detail': 'audio_file is too big.'}
-                        }
-                    },
-                },
-                status.HTTP_503_SERVICE_UNAVAILABLE: {
+                **SPEAK_CHECK_RESPONSES,
+            },
+        }
+        return check_endpoint, path_options
+
+    @classmethod
+    def generate_stream_check_endpoint(
+        cls, schema: type[BaseModel]
+    ) -> tuple[Callable, dict]:
+        async def stream_check_endpoint(
+            request: Request,
+            user: Annotated[FiefUserInfo, Depends(current_user)],
+            exercise_builder: Annotated[ExerciseBase, Depends(cls.get)],
+            answer: Annotated[schema, Query()],
+        ):
+            with span('speech.transcribe', stream=True):
+                user_transcription = await trascribe_stream(
+                    request.stream(),
+                    exercise_builder.correct_answer.split(),
+                    exercise_builder.instance.language,
+                )
+            return await exercise_builder.check_transcription(
+                user_id=user['sub'],
+                user_transcription=user_transcription,
+                answer=dict(),
+                exercise_request=answer.model_dump(),
+            )
+
+        path_options = {
+            'responses': {
+                **core_schema.NOT_AUTHENTICATED,
+                **core_schema.OBJECT_NOT_FOUND,
+                **SPEAK_CHECK_RESPONSES,
+            },
+            'openapi_extra': {
+                'requestBody': {
+                    'required': True,
                     'content': {
-                        'application/json': {
-                            'example': {
-                                'detail': 'something went wrong in audio_file transcription.'
-                            }
-                        }
+                        'audio/wav': {'schema': {'type': 'string', 'format': 'binary'}}
                     },
                 },
             },
         }
-        return check_endpoint, path_options
+        return stream_check_endpoint, path_options
 
     @classmethod
-    def generate_exercise_response(cls):
-        class ExerciseResponseSpeak(BaseModel):
-            correct: bool
-            correct_answer: str = Field(examples=['i like pizza'])
-            user_transcription: str = Field(examples=['i bike pizza'])
-            text_diff: list[int] = Field(
-                examples=[[1]],
-                description='words index diff between correct_answer and user_transcription',
-            )
+    def as_endpoint(
+        cls,
+        *,
+        router: APIRouter,
+        path: str,
+        schema: type[BaseModel],
+        **answer_fields,
+    ):
+        super().as_endpoint(router=router, path=path, schema=schema, **answer_fields)
 
+        stream_check_endpoint, options = cls.generate_stream_check_endpoint(schema)
+        router.post(
+            path=f'{path}/stream',
+            response_model=cls.generate_exercise_response(),
+            name=f'check_stream_{helper.camel_to_snake(cls.__name__)}',
+            operation_id=f'check_stream_{cls.__name__}',
+            **options,
+        )(stream_check_endpoint)
+
+    @classmethod
+    def generate_exercise_response(cls):
         return ExerciseResponseSpeak
 
     def assert_answer(self, answer: dict) -> bool:
         return self.MAX_TEXT_DISTANCE >= text.text_distance(
-            self.correct_answer, answer['user_transcription']
+            self.correct_answer,
+            answer['user_transcription'],
+            self.instance.language,
+            max_distance=self.MAX_TEXT_DISTANCE,
         )
 
     async def check(
@@ -337,23 +469,41 @@ class SpeakExerciseBase(ExerciseBase):
         exercise_request: dict,
     ) -> dict:
         audio = answer.pop('audio')
-        user_transcription = trascribe_to_text(
-            audio,
-            self.correct_answer.split(),
-            self.instance.language,
+        with span('speech.transcribe', stream=False):
+            user_transcription = await run_in_threadpool(
+                trascribe_to_text,
+                audio,
+                self.correct_answer.split(),
+                self.instance.language,
+            )
+        return await self.check_transcription(
+            user_id, user_transcription, answer, exercise_request
         )
+
+    async def check_transcription(
+        self,
+        user_id: str,
+        user_transcription: str,
+        answer: dict,
+        exercise_request: dict,
+    ) -> dict:
         answer['user_transcription'] = user_transcription
         check_response = await super().check(user_id, answer, exercise_request)
         check_response['user_transcription'] = user_transcription
-        check_response['text_diff'] = text.text_diff(
-            self.correct_answer, user_transcription
-        )
+        with span('text.alignment'):
+            alignment = text.text_alignment(
+                self.correct_answer, user_transcription, self.instance.language
+            )
+            check_response['text_diff'] = text.alignment_indexes(alignment)
+        check_response['text_alignment'] = alignment
         return check_response
 
 
 class SpeakTermExercise(SpeakExerciseBase):
     exercise_type = ExerciseType.SPEAK_TERM
-    instance: type[models.SpeakTerm]
+    exercise_model = models.SpeakTerm
+    build_fields = ('audio_url', 'phonetic')
+    check_fields = ('answer',)
 
     def build(self) -> dict:
         return {
@@ -368,7 +518,9 @@ class SpeakTermExercise(SpeakExerciseBase):
 
 class SpeakSentenceExercise(SpeakExerciseBase):
     exercise_type = ExerciseType.SPEAK_SENTENCE
-    instance: type[models.SpeakSentence]
+    exercise_model = models.SpeakSentence
+    build_fields = ('audio_url', 'phonetic')
+    check_fields = ('answer',)
 
     def build(self) -> dict:
         return {
@@ -383,7 +535,9 @@ class SpeakSentenceExercise(SpeakExerciseBase):
 
 class TermSentenceMChoiceExercise(ExerciseBase):
     exercise_type = ExerciseType.TERM_SENTENCE_MCHOICE
-    instance: type[models.TermSentenceMChoice]
+    exercise_model = models.TermSentenceMChoice
+    build_fields = ('term_id', 'answer', 'distractors', 'sentence')
+    check_fields = ('term_id',)
 
     @property
     def distractors(self):
@@ -406,7 +560,9 @@ class TermSentenceMChoiceExercise(ExerciseBase):
 
 class TermDefinitionMChoiceExercise(ExerciseBase):
     exercise_type = ExerciseType.TERM_DEFINITION_MCHOICE
-    instance: type[models.TermDefinitionMChoice]
+    exercise_model = models.TermDefinitionMChoice
+    build_fields = ('term_definition_id', 'answer', 'distractors', 'content')
+    check_fields = ('term_definition_id',)
 
     @property
     def distractors(self):
@@ -429,7 +585,9 @@ class TermDefinitionMChoiceExercise(ExerciseBase):
 
 class TermImageMChoiceExercise(ExerciseBase):
     exercise_type = ExerciseType.TERM_IMAGE_MCHOICE
-    instance: type[models.TermImageMChoice]
+    exercise_model = models.TermImageMChoice
+    build_fields = ('term_id', 'image_url', 'distractors', 'audio_url')
+    check_fields = ('term_id',)
 
     @property
     def distractors(self):
@@ -452,7 +610,9 @@ class TermImageMChoiceExercise(ExerciseBase):
 
 class TermImageTextMChoiceExercise(ExerciseBase):
     exercise_type = ExerciseType.TERM_IMAGE_TEXT_MCHOICE
-    instance: type[models.TermImageTextMChoice]
+    exercise_model = models.TermImageTextMChoice
+    build_fields = ('term_id', 'answer', 'distractors', 'image_url')
+    check_fields = ('term_id',)
 
     @property
     def distractors(self):
@@ -475,7 +635,9 @@ class TermImageTextMChoiceExercise(ExerciseBase):
 
 class TermConnectionExercise(ExerciseBase):
     exercise_type = ExerciseType.TERM_CONNECTION
-    instance: type[models.TermConnection]
+    exercise_model = models.TermConnection
+    build_fields = ('connections', 'distractors', 'content')
+    check_fields = ('connections',)
 
     def build(self) -> dict:
         choices = dict()
@@ -491,3 +653,31 @@ class TermConnectionExercise(ExerciseBase):
 
     def assert_answer(self, answer: dict) -> bool:
         return all([choice in self.correct_answer for choice in answer['choices']])
+
+
+exercise_builder_map: dict[ExerciseType, type[ExerciseBase]] = {
+    ExerciseType.ORDER_SENTENCE: OrderSentenceExercise,
+    ExerciseType.LISTEN_TERM: ListenTermExercise,
+    ExerciseType.LISTEN_TERM_MCHOICE: ListenTermMChoiceExercise,
+    ExerciseType.LISTEN_SENTENCE: ListenSentenceExercise,
+    ExerciseType.SPEAK_TERM: SpeakTermExercise,
+    ExerciseType.SPEAK_SENTENCE: SpeakSentenceExercise,
+    ExerciseType.TERM_SENTENCE_MCHOICE: TermSentenceMChoiceExercise,
+    ExerciseType.TERM_DEFINITION_MCHOICE: TermDefinitionMChoiceExercise,
+    ExerciseType.TERM_IMAGE_MCHOICE: TermImageMChoiceExercise,
+    ExerciseType.TERM_IMAGE_TEXT_MCHOICE: TermImageTextMChoiceExercise,
+    ExerciseType.TERM_CONNECTION: TermConnectionExercise,
+}
+
+
+async def run_speak_job(job: models.SpeakJob) -> dict:
+    with span('speak.job', job_id=str(job.id), type=job.type.name):
+        exercise_builder = await exercise_builder_map[job.type].get(job.exercise_id)
+        return await exercise_builder.check(
+            user_id=str(job.user_id),
+            answer={'audio': job.audio},
+            exercise_request=job.request,
+        )
+
+
+speak_job_queue = SpeakJobQueue(run_speak_job, workers=settings.SPEAK_JOB_WORKERS)
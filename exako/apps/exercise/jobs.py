@@ -0,0 +1,185 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from beanie import PydanticObjectId, UpdateResponse
+from beanie.operators import And, Or, Set
+from fastapi import HTTPException, status
+
+from exako.apps.exercise.models import SpeakJob
+from exako.core.constants import JobStatus
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+
+
+class SpeakJobQueue:
+    def __init__(
+        self,
+        handler: Callable[[SpeakJob], Awaitable[dict]],
+        workers: int,
+        stale_after: timedelta = timedelta(minutes=5),
+        sweep_interval: timedelta = timedelta(minutes=1),
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.stale_after = stale_after
+        self.sweep_interval = sweep_interval
+        self.queue: asyncio.Queue | None = None
+        self.tasks: list[asyncio.Task] = list()
+        self.events: dict[PydanticObjectId, asyncio.Event] = dict()
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        # jobs left behind by a restart
+        await self._requeue(pending_before=datetime.now())
+        self.tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = list()
+
+    async def _requeue(self, pending_before: datetime):
+        # running jobs hold a lease renewed while they run, the ones not
+        # updated for a while belong to a process that died.
+        stale = datetime.now() - self.stale_after
+        jobs = await SpeakJob.find(
+            Or(
+                And(
+                    SpeakJob.status == JobStatus.PENDING,
+                    SpeakJob.updated_at < pending_before,
+                ),
+                And(
+                    SpeakJob.status == JobStatus.RUNNING,
+                    SpeakJob.updated_at < stale,
+                ),
+            )
+        ).to_list()
+        for job in jobs:
+            if job.status == JobStatus.RUNNING:
+                job = await SpeakJob.find_one(
+                    SpeakJob.id == job.id,
+                    SpeakJob.status == JobStatus.RUNNING,
+                    SpeakJob.updated_at < stale,
+                ).update(
+                    Set(
+                        {
+                            SpeakJob.status: JobStatus.PENDING,
+                            SpeakJob.updated_at: datetime.now(),
+                        }
+                    ),
+                    response_type=UpdateResponse.NEW_DOCUMENT,
+                )
+                if job is None:
+                    continue  # taken back by another process
+            self.queue.put_nowait(job.id)
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval.total_seconds())
+            try:
+                # pending jobs of other processes are left to them for a while
+                await self._requeue(pending_before=datetime.now() - self.stale_after)
+            except Exception:
+                logger.exception('could not requeue the stale speak jobs.')
+
+    async def _renew_lease(self, job_id: PydanticObjectId):
+        while True:
+            await asyncio.sleep(self.stale_after.total_seconds() / 3)
+            await SpeakJob.find_one(
+                SpeakJob.id == job_id,
+                SpeakJob.status == JobStatus.RUNNING,
+            ).update(Set({SpeakJob.updated_at: datetime.now()}))
+
+    async def submit(self, job: SpeakJob) -> SpeakJob:
+        await job.insert()
+        self.events[job.id] = asyncio.Event()
+        self.queue.put_nowait(job.id)
+        return job
+
+    async def _claim(self, job_id: PydanticObjectId) -> SpeakJob | None:
+        # several processes may requeue the same job, only one of them runs it
+        return await SpeakJob.find_one(
+            SpeakJob.id == job_id,
+            SpeakJob.status == JobStatus.PENDING,
+        ).update(
+            Set(
+                {
+                    SpeakJob.status: JobStatus.RUNNING,
+                    SpeakJob.updated_at: datetime.now(),
+                }
+            ),
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+
+    async def _run(self, job: SpeakJob):
+        lease = asyncio.create_task(self._renew_lease(job.id))
+        try:
+            job.response = await self.handler(job)
+            job.status = JobStatus.DONE
+        except HTTPException as error:
+            job.status = JobStatus.FAILED
+            job.error = {'status_code': error.status_code, 'detail': error.detail}
+        except Exception:
+            job.status = JobStatus.FAILED
+            job.error = {
+                'status_code': status.HTTP_503_SERVICE_UNAVAILABLE,
+                'detail': 'something went wrong in audio_file transcription.',
+            }
+        finally:
+            lease.cancel()
+        job.audio = None
+        job.updated_at = datetime.now()
+        await job.save()
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                job = await self._claim(job_id)
+                if job is not None:
+                    await self._run(job)
+            except Exception:
+                # the worker stays up, the lease sweep requeues the job
+                logger.exception('could not run the speak job %s.', job_id)
+            finally:
+                self.queue.task_done()
+                event = self.events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def wait(
+        self,
+        job_id: PydanticObjectId,
+        user_id: UUID,
+        timeout: float = 0,
+    ) -> SpeakJob | None:
+        event = self.events.get(job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except TimeoutError:
+                pass
+            return await SpeakJob.find_one(
+                SpeakJob.id == job_id, SpeakJob.user_id == user_id
+            )
+
+        # the job was submitted to another process
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            job = await SpeakJob.find_one(
+                SpeakJob.id == job_id, SpeakJob.user_id == user_id
+            )
+            if (
+                job is None
+                or job.status in (JobStatus.DONE, JobStatus.FAILED)
+                or asyncio.get_running_loop().time() >= deadline
+            ):
+                return job
+            await asyncio.sleep(POLL_INTERVAL)
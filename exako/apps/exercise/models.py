@@ -1,15 +1,31 @@
+from datetime import datetime
 from random import random
-from typing import Annotated
+from typing import Annotated, Any, Callable
 from uuid import UUID
 
-from beanie import Document, Indexed
+from beanie import Document, Indexed, PydanticObjectId
 from fastapi_pagination import Params
 from fief_client import FiefUserInfo
 from pydantic import Field
 from pymongo import ASCENDING, IndexModel
 
-from exako.core.constants import ExerciseType, Language, Level
-from exako.core.helper import fetch_card_terms
+from exako.apps.exercise.sampler import (
+    CardsetSampler,
+    RandomSampler,
+    ReviewSampler,
+    StratifiedSampler,
+    sample_sequence,
+    term_values,
+)
+from exako.core.constants import (
+    Difficulty,
+    ExerciseType,
+    JobStatus,
+    Language,
+    Level,
+)
+from exako.core.fields import CHOICE_MAP_ENCODERS, ChoiceMapField
+from exako.core.helper import fetch_cardset_terms
 
 
 class Exercise(Document):
@@ -17,49 +33,105 @@ class Exercise(Document):
     type: Annotated[ExerciseType, Indexed()]
     level: Level | None = None
     random_score: float = Field(default_factory=random)
+    attempts: int = 0
+    correct: int = 0
+    accuracy: float = 0.5
+    difficulty: Difficulty | None = None
 
+    @classmethod
     async def list(
-        self,
-        languages: list[Language],
-        types: list[ExerciseType],
-        levels: list[Level],
-        cardsets: list[int],
+        cls,
+        language: list[Language],
+        type: list[ExerciseType],
+        level: list[Level] | None,
+        difficulty: list[Difficulty] | None,
+        cardset: list[int] | None,
         seed: float,
         user: FiefUserInfo,
         params: Params,
-    ):
-        main_pipeline = [
-            {'$match': {'language': {'$in': languages}}},
-            {'$addFields': {'order_no': {'$mod': ['$random_score', seed]}}},
-        ]
-
-        if ExerciseType.RANDOM not in types:
-            main_pipeline.append({'$match': {'type': {'$in': types}}})
-
-        if levels:
-            main_pipeline.append({'$match': {'level': {'$in': levels}}})
-
-        if cardsets:
-            term_ids = await fetch_card_terms(user, cardsets, params)
+        exclude: Callable[[PydanticObjectId], bool] | None = None,
+        due: Callable[[dict], ReviewSampler] | None = None,
+    ) -> tuple[list[dict], int]:
+        match = {'language': {'$in': [item.value for item in language]}}
+        if ExerciseType.RANDOM not in type:
+            match['type'] = {'$in': [item.value for item in type]}
+        if level:
+            match['level'] = {'$in': [item.value for item in level]}
+        if difficulty:
+            match['difficulty'] = {'$in': [item.value for item in difficulty]}
+
+        collection = cls.get_motor_collection()
+        raw_params = params.to_raw_params()
+
+        # the due queue, the cardset exercises and the sampled ones are paged
+        # as one sequence, each listed in only one of them.
+        cardset_match = None
+        if cardset:
+            term_ids = await fetch_cardset_terms(user, cardset)
             if term_ids:
-                union_pipeline = [
-                    {'$match': {'term_id': {'$in': term_ids}}},
-                    {'$addFields': {'order_no': -1}},
-                ]
-                main_pipeline += [
-                    {'$unionWith': {'coll': 'exercise', 'pipeline': union_pipeline}}
-                ]
-
-        main_pipeline += [
-            {'$sort': {'order_no': ASCENDING}},
-            {'$unset': 'order_no'},
-        ]
-
-        return Exercise.aggregate(main_pipeline)
+                terms = term_values(term_ids)
+                cardset_match = {**match, 'term_id': {'$in': terms}}
+                match = {**match, 'term_id': {'$nin': terms}}
+
+        samplers = list()
+        if due is not None:
+            review_sampler = due(match if cardset_match is None else cardset_match)
+            due_ids = await review_sampler.exercise_ids()
+            if due_ids and cardset_match is not None:
+                cardset_match = {**cardset_match, '_id': {'$nin': due_ids}}
+            elif due_ids:
+                match = {**match, '_id': {'$nin': due_ids}}
+            samplers.append(review_sampler)
+        if cardset_match is not None:
+            samplers.append(CardsetSampler(collection, cardset_match))
+        if ExerciseType.RANDOM in type:
+            sampler = StratifiedSampler(
+                collection,
+                match,
+                seed,
+                types=[item for item in ExerciseType if item != ExerciseType.RANDOM],
+                exclude=exclude,
+            )
+        else:
+            sampler = RandomSampler(collection, match, seed, exclude=exclude)
+        samplers.append(sampler)
+        return await sample_sequence(samplers, raw_params.offset, raw_params.limit)
 
     class Settings:
         is_root = True
         name = 'exercises'
+        bson_encoders = CHOICE_MAP_ENCODERS
+        indexes = [
+            IndexModel(
+                [('language', ASCENDING), ('random_score', ASCENDING)],
+                name='exercise_random_index',
+            ),
+            IndexModel(
+                [
+                    ('language', ASCENDING),
+                    ('type', ASCENDING),
+                    ('random_score', ASCENDING),
+                ],
+                name='exercise_type_random_index',
+            ),
+            IndexModel(
+                [
+                    ('term_id', ASCENDING),
+                    ('type', ASCENDING),
+                    ('language', ASCENDING),
+                ],
+                name='exercise_term_index',
+            ),
+            IndexModel(
+                [
+                    ('language', ASCENDING),
+                    ('type', ASCENDING),
+                    ('difficulty', ASCENDING),
+                    ('random_score', ASCENDING),
+                ],
+                name='exercise_difficulty_random_index',
+            ),
+        ]
 
 
 class OrderSentence(Exercise):
@@ -97,10 +169,11 @@ class ListenTerm(Exercise):
 class ListenTermMChoice(Exercise):
     audio_url: str
     content: str
-    distractors: dict[UUID, str]
+    distractors: ChoiceMapField
     term_id: Annotated[UUID, Indexed()]
 
     class Settings:
+        bson_encoders = CHOICE_MAP_ENCODERS
         indexes = [
             IndexModel(
                 [('term_id', ASCENDING), ('type', ASCENDING)],
@@ -164,10 +237,11 @@ class SpeakSentence(Exercise):
 class TermSentenceMChoice(Exercise):
     sentence: str
     answer: str
-    distractors: dict[UUID, str]
+    distractors: ChoiceMapField
     term_id: Annotated[UUID, Indexed()]
 
     class Settings:
+        bson_encoders = CHOICE_MAP_ENCODERS
         indexes = [
             IndexModel(
                 [('term_id', ASCENDING), ('type', ASCENDING)],
@@ -181,11 +255,12 @@ class TermSentenceMChoice(Exercise):
 class TermDefinitionMChoice(Exercise):
     content: str
     answer: str
-    distractors: dict[UUID, str]
+    distractors: ChoiceMapField
     term_id: Annotated[UUID, Indexed()]
     term_definition_id: Annotated[UUID, Indexed()]
 
     class Settings:
+        bson_encoders = CHOICE_MAP_ENCODERS
         indexes = [
             IndexModel(
                 [
@@ -203,10 +278,11 @@ class TermDefinitionMChoice(Exercise):
 class TermImageMChoice(Exercise):
     image_url: str
     audio_url: str
-    distractors: dict[UUID, str]
+    distractors: ChoiceMapField
     term_id: Annotated[UUID, Indexed()]
 
     class Settings:
+        bson_encoders = CHOICE_MAP_ENCODERS
         indexes = [
             IndexModel(
                 [('term_id', ASCENDING), ('type', ASCENDING)],
@@ -221,9 +297,10 @@ class TermImageTextMChoice(Exercise):
     image_url: str
     answer: str
     term_id: Annotated[UUID, Indexed()]
-    distractors: dict[UUID, str]
+    distractors: ChoiceMapField
 
     class Settings:
+        bson_encoders = CHOICE_MAP_ENCODERS
         indexes = [
             IndexModel(
                 [('term_id', ASCENDING), ('type', ASCENDING)],
@@ -237,10 +314,11 @@ class TermImageTextMChoice(Exercise):
 class TermConnection(Exercise):
     content: str
     term_id: Annotated[UUID, Indexed()]
-    connections: dict[UUID, str]
-    distractors: dict[UUID, str]
+    connections: ChoiceMapField
+    distractors: ChoiceMapField
 
     class Settings:
+        bson_encoders = CHOICE_MAP_ENCODERS
         indexes = [
             IndexModel(
                 [('term_id', ASCENDING), ('type', ASCENDING)],
@@ -249,3 +327,30 @@ class TermConnection(Exercise):
                 partialFilterExpression={'type': ExerciseType.TERM_CONNECTION},
             ),
         ]
+
+
+class SpeakJob(Document):
+    exercise_id: PydanticObjectId
+    type: ExerciseType
+    user_id: UUID
+    status: JobStatus = JobStatus.PENDING
+    audio: bytes | None = None
+    request: dict[str, Any]
+    response: dict[str, Any] | None = None
+    error: dict[str, Any] | None = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        name = 'speak_jobs'
+        indexes = [
+            IndexModel(
+                [('status', ASCENDING), ('updated_at', ASCENDING)],
+                name='speak_job_status_index',
+            ),
+            IndexModel(
+                [('created_at', ASCENDING)],
+                expireAfterSeconds=24 * 60 * 60,
+                name='speak_job_expire_index',
+            ),
+        ]
@@ -1,19 +1,30 @@
+from functools import partial
 from random import random
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Query
-from fastapi_pagination import Params
-from fastapi_pagination.ext.beanie import paginate
-from fief_client import FiefAccessTokenInfo
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi_pagination import Params, create_page
+from fief_client import FiefAccessTokenInfo, FiefUserInfo
 from pydantic import Field
 
 from exako.apps.exercise import builder, schema
 from exako.apps.exercise.models import Exercise
+from exako.apps.history.models import ExerciseReview, ExerciseSeenFilter
 from exako.auth import current_user
+from exako.core import helper
 from exako.core import schema as core_schema
-from exako.core.constants import ExerciseType, Language, Level
+from exako.core.constants import (
+    Difficulty,
+    ExerciseType,
+    JobStatus,
+    Language,
+    Level,
+)
+from exako.core.metrics import operation_duration
 from exako.core.pagination import Page
+from exako.core.tracing import span
 
 exercise_router = APIRouter()
 
@@ -25,6 +36,7 @@ exercise_router = APIRouter()
     description='Endpoint para retornar exercícios sobre termos. Os exercícios serão montados com termos aleatórios, a menos que seja específicado o cardset_id.',
 )
 async def list_exercise(
+    request: Request,
     user: Annotated[FiefAccessTokenInfo, Depends(current_user)],
     language: Annotated[list[Language], Query(...)],
     params: Annotated[Params, Depends()],
@@ -32,25 +44,87 @@ async def list_exercise(
     level: list[Level] | None = Query(
         default=None, description='Filtar por dificuldade do termo.'
     ),
+    difficulty: list[Difficulty] | None = Query(
+        default=None,
+        description='Filtrar pela dificuldade medida nas respostas dos usuários.',
+    ),
     cardset: list[int] | None = Query(
         default=None, description='Filtrar por conjunto de cartas.'
     ),
     seed: float | None = Query(default_factory=random, le=1, ge=0),
+    unseen: bool = Query(
+        default=True, description='Evitar exercícios respondidos recentemente.'
+    ),
+    due: bool = Query(
+        default=False,
+        description='Priorizar exercícios com revisão pendente.',
+    ),
 ) -> Page[schema.ExerciseRead]:
-    return await paginate(
-        Exercise.list(
+    exclude = None
+    if unseen:
+        seen_filter = await ExerciseSeenFilter.get_filter(UUID(user['sub']))
+        if seen_filter is not None:
+            exclude = seen_filter.as_predicate()
+
+    review_sampler = None
+    if due:
+        review_sampler = partial(ExerciseReview.due, UUID(user['sub']))
+
+    with operation_duration.labels('exercise_list').time(), span('exercise.list'):
+        items, total = await Exercise.list(
             language=language,
             type=type,
             level=level,
+            difficulty=difficulty,
             cardset=cardset,
             seed=seed,
             user=user,
             params=params,
-        ),
+            exclude=exclude,
+            due=review_sampler,
+        )
+    return create_page(
+        [
+            schema.ExerciseRead(
+                type=item['type'],
+                url=str(
+                    request.url_for(
+                        helper.camel_to_snake(
+                            builder.exercise_builder_map[item['type']].__name__
+                        ),
+                        exercise_id=str(item['_id']),
+                    )
+                ),
+            )
+            for item in items
+        ],
+        total=total,
         params=params,
     )
 
 
+@exercise_router.get(
+    path='/speak-job/{job_id}',
+    response_model=schema.SpeakJobRead,
+    responses={**core_schema.NOT_AUTHENTICATED, **core_schema.OBJECT_NOT_FOUND},
+    summary='Consulta o resultado de uma correção de pronúncia assíncrona.',
+    description='Enquanto a tarefa estiver pendente o status é retornado sem resposta. O parâmetro wait mantém a requisição aberta até a tarefa terminar ou o tempo acabar.',
+)
+async def get_speak_job(
+    user: Annotated[FiefUserInfo, Depends(current_user)],
+    job_id: PydanticObjectId,
+    wait: float = Query(default=0, ge=0, le=30),
+):
+    job = await builder.speak_job_queue.wait(job_id, UUID(user['sub']), wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail='job not found.')
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(
+            status_code=job.error['status_code'], detail=job.error['detail']
+        )
+    return job
+
+
 builder.OrderSentenceExercise.as_endpoint(
     router=exercise_router,
     path='/order-sentence/{exercise_id}',
@@ -0,0 +1,312 @@
+import asyncio
+from contextlib import aclosing
+from datetime import datetime
+from random import Random
+from typing import Callable
+from uuid import UUID
+
+from beanie import PydanticObjectId
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+
+from exako.core.constants import ExerciseType
+
+# documents fetched per round trip while scanning past the excluded exercises
+SCAN_BATCH_SIZE = 500
+# with an exclude predicate only this start of the seed order is listed, the
+# predicate runs client side so deeper pages would scan the whole catalog.
+EXCLUDE_SCAN_LIMIT = 5000
+# due reviews listed at most, a longer queue is served as the first ones clear
+DUE_REVIEW_LIMIT = 200
+
+
+def merge_unique(items: list[dict], candidates: list[dict]) -> list[dict]:
+    selected = {item['_id'] for item in items}
+    items.extend(item for item in candidates if item['_id'] not in selected)
+    return items
+
+
+# pages the samplers as one sequence, each one starting where the previous
+# ends, so a single offset walks all of them without skipping exercises.
+async def sample_sequence(
+    samplers: list, offset: int, limit: int
+) -> tuple[list[dict], int]:
+    items, total = list(), 0
+    for sampler in samplers:
+        size = await sampler.count()
+        start = max(offset - total, 0)
+        if start < size and len(items) < limit:
+            merge_unique(
+                items,
+                await sampler.sample(start, min(size - start, limit - len(items))),
+            )
+        total += size
+    return items, total
+
+
+# reads exercises ordered by `random_score` starting at the seed and wrapping
+# around, so the same seed yields the same pages without sorting the collection.
+class RandomSampler:
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        match: dict,
+        seed: float,
+        exclude: Callable[[PydanticObjectId], bool] | None = None,
+        projection: dict | None = None,
+    ):
+        self.collection = collection
+        self.match = match
+        self.seed = seed
+        self.exclude = exclude
+        self.projection = projection or {'_id': 1, 'type': 1}
+
+    async def _find(self, query: dict, skip: int, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        cursor = (
+            self.collection.find(query, self.projection)
+            .sort('random_score', ASCENDING)
+            .skip(skip)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    async def _read(self, skip: int, limit: int) -> list[dict]:
+        head = {**self.match, 'random_score': {'$gte': self.seed}}
+        items = await self._find(head, skip, limit)
+        if len(items) < limit:
+            if items or skip == 0:
+                head_count = skip + len(items)
+            else:
+                head_count = await self.collection.count_documents(head)
+            tail = {**self.match, 'random_score': {'$lt': self.seed}}
+            items += await self._find(
+                tail, max(skip - head_count, 0), limit - len(items)
+            )
+        return items
+
+    async def _scan(self):
+        scanned = 0
+        for query in (
+            {**self.match, 'random_score': {'$gte': self.seed}},
+            {**self.match, 'random_score': {'$lt': self.seed}},
+        ):
+            cursor = (
+                self.collection.find(query, self.projection)
+                .sort('random_score', ASCENDING)
+                .limit(EXCLUDE_SCAN_LIMIT - scanned)
+                .batch_size(SCAN_BATCH_SIZE)
+            )
+            try:
+                async for item in cursor:
+                    scanned += 1
+                    yield item
+            finally:
+                await cursor.close()
+            if scanned >= EXCLUDE_SCAN_LIMIT:
+                return
+
+    async def _select(
+        self, excluded: bool, skip: int, limit: int
+    ) -> tuple[list[dict], int]:
+        items, matched = list(), 0
+        async with aclosing(self._scan()) as candidates:
+            async for candidate in candidates:
+                if self.exclude(candidate['_id']) != excluded:
+                    continue
+                matched += 1
+                if matched > skip:
+                    items.append(candidate)
+                    if len(items) == limit:
+                        break
+        return items, matched
+
+    async def count(self) -> int:
+        if self.exclude is None:
+            return await self.collection.count_documents(self.match)
+        return await self.collection.count_documents(
+            self.match, limit=EXCLUDE_SCAN_LIMIT
+        )
+
+    async def sample(self, offset: int, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        if self.exclude is None:
+            return await self._read(offset, limit)
+
+        # pages list the exercises not excluded first and the excluded ones
+        # after them, both in the seed order, so every exercise has one page.
+        # the scan reads up to the offset, at most EXCLUDE_SCAN_LIMIT.
+        items, accepted = await self._select(False, offset, limit)
+        if len(items) < limit:
+            excluded, _ = await self._select(
+                True, max(offset - accepted, 0), limit - len(items)
+            )
+            items += excluded
+        return items
+
+
+def interleave_plan(
+    sizes: list[int], offset: int, limit: int
+) -> tuple[list[int], list[int]]:
+    # positions of a page in the round robin of the strata, skipping the
+    # exhausted ones: where each stratum starts and the stratum of each item.
+    rounds, skipped = 0, 0
+    while True:
+        active = sum(size > rounds for size in sizes)
+        if active == 0 or skipped + active > offset:
+            break
+        skipped += active
+        rounds += 1
+
+    starts = [min(size, rounds) for size in sizes]
+    order = list()
+    while len(order) < limit:
+        active = [index for index, size in enumerate(sizes) if size > rounds]
+        if not active:
+            break
+        for index in active:
+            if len(order) == limit:
+                break
+            if skipped < offset:
+                starts[index] += 1
+                skipped += 1
+            else:
+                order.append(index)
+        rounds += 1
+    return starts, order
+
+
+# samples every exercise type from its own (language, type, random_score)
+# index range and interleaves them, so the page mix does not follow the
+# catalog proportions.
+class StratifiedSampler:
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        match: dict,
+        seed: float,
+        types: list[ExerciseType],
+        exclude: Callable[[PydanticObjectId], bool] | None = None,
+    ):
+        types = list(types)
+        Random(seed).shuffle(types)
+        self.strata = [
+            RandomSampler(
+                collection, {**match, 'type': type.value}, seed, exclude=exclude
+            )
+            for type in types
+        ]
+        self.sizes: list[int] | None = None
+
+    async def _sizes(self) -> list[int]:
+        if self.sizes is None:
+            self.sizes = list(
+                await asyncio.gather(*[stratum.count() for stratum in self.strata])
+            )
+        return self.sizes
+
+    async def count(self) -> int:
+        return sum(await self._sizes())
+
+    async def sample(self, offset: int, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        # every stratum is read from its own position in the interleaving,
+        # so the pages walk each type to its end without gaps.
+        starts, order = interleave_plan(await self._sizes(), offset, limit)
+        groups = await asyncio.gather(
+            *[
+                stratum.sample(start, order.count(index))
+                for index, (stratum, start) in enumerate(zip(self.strata, starts))
+            ]
+        )
+        groups = [iter(group) for group in groups]
+        items = [next(groups[index], None) for index in order]
+        return [item for item in items if item is not None]
+
+
+def term_values(term_ids: list[UUID | str]) -> list[Binary]:
+    return [Binary.from_uuid(UUID(str(term_id))) for term_id in term_ids]
+
+
+# reads the exercises of the user cardset terms through the
+# (term_id, type, language) index, applying the same listing filters.
+class CardsetSampler:
+    def __init__(self, collection: AsyncIOMotorCollection, match: dict):
+        self.collection = collection
+        self.match = match
+
+    async def count(self) -> int:
+        return await self.collection.count_documents(self.match)
+
+    async def sample(self, offset: int, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        cursor = (
+            self.collection.find(self.match, {'_id': 1, 'type': 1})
+            .sort(
+                [
+                    ('term_id', ASCENDING),
+                    ('type', ASCENDING),
+                    ('language', ASCENDING),
+                    ('_id', ASCENDING),
+                ]
+            )
+            .skip(offset)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+
+# the user's due reviews read in one range of the (user_id, due_at) index,
+# the longest overdue first, keeping those whose exercise matches the listing.
+class ReviewSampler:
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        exercises: AsyncIOMotorCollection,
+        user_id: UUID,
+        match: dict,
+    ):
+        self.collection = collection
+        self.exercises = exercises
+        self.match = match
+        self.query = {
+            'user_id': Binary.from_uuid(user_id),
+            'due_at': {'$lte': datetime.now()},
+        }
+        # type and language are stored on the review too
+        for key in ('type', 'language'):
+            if key in match:
+                self.query[key] = match[key]
+        self.items: list[dict] | None = None
+
+    async def _load(self) -> list[dict]:
+        if self.items is not None:
+            return self.items
+        cursor = (
+            self.collection.find(self.query, {'exercise_id': 1})
+            .sort([('due_at', ASCENDING), ('_id', ASCENDING)])
+            .limit(DUE_REVIEW_LIMIT)
+        )
+        ids = [review['exercise_id'] for review in await cursor.to_list(None)]
+        cursor = self.exercises.find(
+            {**self.match, '_id': {'$in': ids}}, {'_id': 1, 'type': 1}
+        )
+        found = {item['_id']: item for item in await cursor.to_list(None)}
+        self.items = [found[item] for item in ids if item in found]
+        return self.items
+
+    async def exercise_ids(self) -> list[PydanticObjectId]:
+        return [item['_id'] for item in await self._load()]
+
+    async def count(self) -> int:
+        return len(await self._load())
+
+    async def sample(self, offset: int, limit: int) -> list[dict]:
+        if limit <= 0:
+            return []
+        return (await self._load())[offset : offset + limit]
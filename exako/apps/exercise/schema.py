@@ -1,9 +1,10 @@
 from urllib.parse import urlparse
 from uuid import uuid4
 
+from beanie import PydanticObjectId
 from pydantic import BaseModel, Field
 
-from exako.core.constants import ExerciseType
+from exako.core.constants import EditOperation, ExerciseType, JobStatus
 
 
 def validate_audio_url(cls, audio_url: str) -> str:
@@ -145,3 +146,38 @@ class TextConnectionRead(BaseModel):
         examples=['casa'],
         description='Conteúdo relacionado as conexões.',
     )
+
+
+class WordEdit(BaseModel):
+    operation: EditOperation
+    correct_index: int | None = Field(
+        examples=[1], description='word index in correct_answer'
+    )
+    index: int | None = Field(
+        examples=[1], description='word index in user_transcription'
+    )
+
+
+class ExerciseResponseSpeak(BaseModel):
+    correct: bool
+    correct_answer: str = Field(examples=['i like pizza'])
+    user_transcription: str = Field(examples=['i bike pizza'])
+    text_diff: list[int] = Field(
+        examples=[[1]],
+        description='words index diff between correct_answer and user_transcription',
+    )
+    text_alignment: list[WordEdit] = Field(
+        examples=[[{'operation': 'substitute', 'correct_index': 1, 'index': 1}]],
+        description='word edits turning correct_answer into user_transcription',
+    )
+
+
+class SpeakJobCreated(BaseModel):
+    id: PydanticObjectId
+    status: JobStatus = JobStatus.PENDING
+
+
+class SpeakJobRead(BaseModel):
+    id: PydanticObjectId
+    status: JobStatus
+    response: ExerciseResponseSpeak | None = None
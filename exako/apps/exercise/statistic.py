@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import suppress
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from exako.apps.exercise.models import Exercise
+from exako.core.constants import Difficulty
+
+logger = logging.getLogger(__name__)
+
+# laplace smoothing, an exercise without attempts has 0.5 accuracy
+PRIOR_CORRECT = 1
+PRIOR_ATTEMPTS = 2
+# attempts needed before an exercise gets a difficulty band
+MIN_ATTEMPTS = 10
+
+
+# derived from the stored counters, so it is right after any $inc order
+def statistic_pipeline() -> list[dict]:
+    return [
+        {
+            '$set': {
+                'accuracy': {
+                    '$divide': [
+                        {'$add': [{'$ifNull': ['$correct', 0]}, PRIOR_CORRECT]},
+                        {'$add': [{'$ifNull': ['$attempts', 0]}, PRIOR_ATTEMPTS]},
+                    ]
+                }
+            }
+        },
+        {
+            '$set': {
+                'difficulty': {
+                    '$switch': {
+                        'branches': [
+                            {
+                                'case': {
+                                    '$lt': [{'$ifNull': ['$attempts', 0]}, MIN_ATTEMPTS]
+                                },
+                                'then': None,
+                            },
+                            {
+                                'case': {'$gte': ['$accuracy', 0.8]},
+                                'then': Difficulty.EASY.value,
+                            },
+                            {
+                                'case': {'$gte': ['$accuracy', 0.5]},
+                                'then': Difficulty.MEDIUM.value,
+                            },
+                        ],
+                        'default': Difficulty.HARD.value,
+                    }
+                }
+            }
+        },
+    ]
+
+
+# counters are kept in each worker until flushed, a crash or a SIGKILL loses
+# at most flush_interval seconds or flush_size exercises of them, a normal
+# shutdown flushes them in the lifespan.
+class ExerciseStatisticBuffer:
+    def __init__(self, flush_size: int = 200, flush_interval: float = 5):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = defaultdict(lambda: [0, 0])
+        self.full = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def record(self, exercise_id: PydanticObjectId, correct: bool):
+        # written by the flush task, the check request never waits for it
+        counters = self.pending[exercise_id]
+        counters[0] += 1
+        counters[1] += int(correct)
+        if len(self.pending) >= self.flush_size:
+            self.full.set()
+
+    def merge(self, counters: list[tuple[PydanticObjectId, list[int]]]):
+        for exercise_id, (attempts, correct) in counters:
+            pending = self.pending[exercise_id]
+            pending[0] += attempts
+            pending[1] += correct
+
+    async def flush(self):
+        pending, self.pending = self.pending, defaultdict(lambda: [0, 0])
+        if not pending:
+            return
+        counters = list(pending.items())
+        collection = Exercise.get_motor_collection()
+        # $inc commutes, the flushes of several workers may run at once
+        failed = set()
+        try:
+            await collection.bulk_write(
+                [
+                    UpdateOne(
+                        {'_id': exercise_id},
+                        {'$inc': {'attempts': attempts, 'correct': correct}},
+                    )
+                    for exercise_id, (attempts, correct) in counters
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as error:
+            failed = {item['index'] for item in error.details['writeErrors']}
+            self.merge([counters[index] for index in sorted(failed)])
+            logger.warning(
+                'could not write the statistics of %s exercises.', len(failed)
+            )
+        except asyncio.CancelledError:
+            self.merge(counters)  # written by the flush on shutdown
+            raise
+        except PyMongoError:
+            # kept for the next flush
+            self.merge(counters)
+            logger.exception(
+                'could not write the statistics of %s exercises.', len(counters)
+            )
+            return
+
+        written = [
+            exercise_id
+            for index, (exercise_id, _) in enumerate(counters)
+            if index not in failed
+        ]
+        if not written:
+            return
+        try:
+            await collection.update_many(
+                {'_id': {'$in': written}}, statistic_pipeline()
+            )
+        except PyMongoError:
+            # derived again from the counters on the next flush of them
+            logger.exception(
+                'could not update the accuracy of %s exercises.', len(written)
+            )
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.full.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self.full.clear()
+            await self.flush()
+
+    def start(self):
+        self.task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        await self.flush()
+
+
+exercise_statistic = ExerciseStatisticBuffer()
@@ -0,0 +1,57 @@
+from functools import cache
+from uuid import UUID
+
+from beanie import PydanticObjectId
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from exako.apps.exercise.models import Exercise
+from exako.core.fields import BinaryUUID
+
+VIEW_BASE_FIELDS = ('id', 'type', 'language')
+
+
+class ExerciseView:
+    __slots__ = VIEW_BASE_FIELDS
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+# reads only the projected fields of an exercise as a raw document and
+# validates them into a slots object, instead of hydrating the beanie document.
+class ExerciseViewLoader:
+    def __init__(self, model: type[Exercise], fields: tuple[str, ...]):
+        fields = VIEW_BASE_FIELDS + tuple(
+            field for field in fields if field not in VIEW_BASE_FIELDS
+        )
+        annotations = dict()
+        for field in fields:
+            if field == 'id':
+                annotations[field] = PydanticObjectId
+                continue
+            field_info = model.model_fields[field]
+            if field_info.annotation is UUID:
+                annotations[field] = BinaryUUID
+            else:
+                annotations[field] = field_info.rebuild_annotation()
+
+        self.projection = {'_id' if field == 'id' else field: 1 for field in fields}
+        self.adapter = TypeAdapter(TypedDict(f'{model.__name__}Fields', annotations))
+        self.view = type(
+            f'{model.__name__}View',
+            (ExerciseView,),
+            {'__slots__': fields[len(VIEW_BASE_FIELDS) :]},
+        )
+
+    def load(self, document: dict) -> ExerciseView:
+        document['id'] = document.pop('_id')
+        return self.view(**self.adapter.validate_python(document))
+
+
+@cache
+def get_view_loader(
+    model: type[Exercise], fields: tuple[str, ...]
+) -> ExerciseViewLoader:
+    return ExerciseViewLoader(model, fields)
@@ -0,0 +1,246 @@
+import io
+import sys
+import wave
+from array import array
+from struct import unpack_from
+
+MODEL_SAMPLE_RATE = 16000
+
+VAD_FRAME_DURATION = 0.03
+VAD_MIN_RMS = 400
+# kept around the detected speech so word onsets and endings are not clipped
+VAD_PADDING = 0.2
+
+SIGNED_8BIT_TABLE = bytes(value ^ 0x80 for value in range(256))
+
+WAV_HEADER_MAX_SIZE = 4096
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# data chunk size written by recorders that do not know the length upfront
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+class InvalidAudioError(ValueError): ...
+
+
+class AudioTooLongError(ValueError): ...
+
+
+class AudioParams:
+    __slots__ = ('channels', 'sample_width', 'rate', 'frames')
+
+    def __init__(self, channels: int, sample_width: int, rate: int, frames: int):
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.frames = frames
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.rate
+
+
+def read_wav(audio: bytes) -> tuple[AudioParams, bytes]:
+    try:
+        with wave.open(io.BytesIO(audio), 'rb') as wf:
+            if wf.getcomptype() != 'NONE':
+                raise InvalidAudioError('audio file must be WAV format PCM.')
+            params = AudioParams(
+                wf.getnchannels(),
+                wf.getsampwidth(),
+                wf.getframerate(),
+                wf.getnframes(),
+            )
+            return params, wf.readframes(params.frames)
+    except (wave.Error, EOFError):
+        raise InvalidAudioError('audio file must be WAV format PCM.')
+
+
+def parse_wav_header(buffer: bytes) -> tuple[AudioParams, int] | None:
+    # returns the params and the data offset, or None while the header is incomplete
+    invalid_format = InvalidAudioError('audio file must be WAV format PCM.')
+    if len(buffer) < 12:
+        return None
+    if buffer[:4] != b'RIFF' or buffer[8:12] != b'WAVE':
+        raise invalid_format
+
+    offset, fmt = 12, None
+    while True:
+        if offset > WAV_HEADER_MAX_SIZE:
+            raise invalid_format
+        if len(buffer) < offset + 8:
+            return None
+        chunk_id = buffer[offset : offset + 4]
+        (size,) = unpack_from('<I', buffer, offset + 4)
+        body = offset + 8
+
+        if chunk_id == b'fmt ':
+            if len(buffer) < body + 16:
+                return None
+            format_tag, channels, rate, _, block_align, bits = unpack_from(
+                '<HHIIHH', buffer, body
+            )
+            if (
+                format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE)
+                or channels == 0
+                or rate == 0
+                or block_align == 0
+            ):
+                raise invalid_format
+            fmt = (channels, (bits + 7) // 8, rate, block_align)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise invalid_format
+            channels, sample_width, rate, block_align = fmt
+            frames = 0 if size == WAV_UNKNOWN_SIZE else size // block_align
+            return AudioParams(channels, sample_width, rate, frames), body
+
+        offset = body + size + (size & 1)
+
+
+def to_pcm16(frames: bytes, sample_width: int) -> array:
+    # keeps the two most significant bytes of every little endian sample
+    if sample_width == 2:
+        pcm = bytes(frames)
+    elif sample_width == 1:
+        pcm = bytearray(len(frames) * 2)
+        pcm[1::2] = frames.translate(SIGNED_8BIT_TABLE)
+    elif sample_width in (3, 4):
+        pcm = bytearray(len(frames) // sample_width * 2)
+        pcm[0::2] = frames[sample_width - 2 :: sample_width]
+        pcm[1::2] = frames[sample_width - 1 :: sample_width]
+    else:
+        raise InvalidAudioError('audio file sample width is not supported.')
+
+    samples = array('h', pcm)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+
+def downmix(samples: array, channels: int) -> array:
+    if channels == 1:
+        return samples
+    return array(
+        'h',
+        (
+            sum(frame) // channels
+            for frame in zip(*(samples[i::channels] for i in range(channels)))
+        ),
+    )
+
+
+def resample(samples: array, rate: int, target_rate: int = MODEL_SAMPLE_RATE) -> array:
+    if rate == target_rate or len(samples) < 2:
+        return samples
+
+    step = rate / target_rate
+    last = len(samples) - 1
+    size = int(len(samples) / step)
+    result = array('h', bytes(size * 2))
+    for i in range(size):
+        position = i * step
+        index = int(position)
+        if index >= last:
+            result[i] = samples[last]
+            continue
+        fraction = position - index
+        current = samples[index]
+        result[i] = int(current + (samples[index + 1] - current) * fraction)
+    return result
+
+
+class Resampler:
+    # same output as resample over the whole clip when fed chunk by chunk,
+    # the position and the samples it still needs are kept between chunks.
+    __slots__ = (
+        'rate',
+        'target_rate',
+        'step',
+        'samples',
+        'start',
+        'received',
+        'produced',
+        'last',
+    )
+
+    def __init__(self, rate: int, target_rate: int = MODEL_SAMPLE_RATE):
+        self.rate = rate
+        self.target_rate = target_rate
+        self.step = rate / target_rate
+        self.samples = array('h')
+        self.start = 0  # index in the clip of the first sample kept
+        self.received = 0
+        self.produced = 0
+        self.last = 0
+
+    def feed(self, samples: array) -> array:
+        if self.rate == self.target_rate:
+            return samples
+        if not samples:
+            return array('h')
+        self.samples.extend(samples)
+        self.received += len(samples)
+        self.last = samples[-1]
+
+        result = array('h')
+        while True:
+            position = self.produced * self.step
+            index = int(position)
+            if index + 1 >= self.received:
+                break
+            current = self.samples[index - self.start]
+            following = self.samples[index + 1 - self.start]
+            result.append(int(current + (following - current) * (position - index)))
+            self.produced += 1
+
+        keep_from = min(int(self.produced * self.step), self.received) - self.start
+        del self.samples[:keep_from]
+        self.start += keep_from
+        return result
+
+    def finish(self) -> array:
+        if self.rate == self.target_rate:
+            return array('h')
+        if self.received < 2:
+            return self.samples
+        # the positions past the last sample repeat it
+        size = int(self.received / self.step)
+        return array('h', [self.last]) * (size - self.produced)
+
+
+def is_speech(samples: array, start: int, end: int) -> bool:
+    frame = samples[start:end]
+    if not frame:
+        return False
+    energy = sum(sample * sample for sample in frame) / len(frame)
+    return energy >= VAD_MIN_RMS * VAD_MIN_RMS
+
+
+def trim_silence(samples: array, rate: int = MODEL_SAMPLE_RATE) -> array:
+    # only silent frames at the edges are scanned, so the cost is
+    # proportional to the silence removed and not to the clip length.
+    frame_size = max(int(rate * VAD_FRAME_DURATION), 1)
+    padding = int(rate * VAD_PADDING)
+
+    start = 0
+    while start < len(samples) and not is_speech(samples, start, start + frame_size):
+        start += frame_size
+    if start >= len(samples):
+        return array('h')
+
+    end = len(samples)
+    while end > start and not is_speech(samples, end - frame_size, end):
+        end -= frame_size
+
+    return samples[max(start - padding, 0) : min(end + padding, len(samples))]
+
+
+def prepare_audio(params: AudioParams, frames: bytes) -> bytes:
+    samples = to_pcm16(frames, params.sample_width)
+    samples = downmix(samples, params.channels)
+    samples = resample(samples, params.rate)
+    samples = trim_silence(samples)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples.tobytes()
@@ -0,0 +1,129 @@
+import json
+import os
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+
+from exako.core.constants import Language
+from exako.settings import settings
+
+# writes between two walks of the directory to enforce its budget
+PRUNE_INTERVAL = 64
+
+
+class TranscriptionCache:
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        directory: Path | None = None,
+        max_disk_entries: int = 0,
+        max_disk_bytes: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.entries: OrderedDict[str, str] = OrderedDict()
+        self.size = 0
+        self.writes = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def key_from_digest(
+        audio_hash: str, vocabulary: list[str], language: Language
+    ) -> str:
+        vocabulary_hash = sha256(json.dumps(vocabulary).encode()).hexdigest()
+        return sha256(
+            f'{audio_hash}:{language.value}:{vocabulary_hash}'.encode()
+        ).hexdigest()
+
+    @classmethod
+    def key(cls, audio: bytes, vocabulary: list[str], language: Language) -> str:
+        return cls.key_from_digest(sha256(audio).hexdigest(), vocabulary, language)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _store(self, key: str, text: str):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = text
+        self.size += len(key) + len(text.encode())
+        while self.entries and (
+            len(self.entries) > self.max_entries or self.size > self.max_bytes
+        ):
+            old_key, old_text = self.entries.popitem(last=False)
+            self.size -= len(old_key) + len(old_text.encode())
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            text = self.entries.get(key)
+            if text is not None:
+                self.entries.move_to_end(key)
+                return text
+
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            text = path.read_text()
+            path.touch()  # the mtime orders the files for the eviction
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            self._store(key, text)
+        return text
+
+    def set(self, key: str, text: str):
+        with self.lock:
+            self._store(key, text)
+
+        if self.directory is None:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            'w', dir=path.parent, suffix='.tmp', delete=False
+        ) as temp_file:
+            temp_file.write(text)
+        os.replace(temp_file.name, path)
+
+        with self.lock:
+            self.writes += 1
+            prune = self.writes % PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        # shared by the workers, the least recently used files go first
+        files = list()
+        for path in self.directory.glob('*/*'):
+            if path.suffix == '.tmp':
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        size = sum(file_size for _, file_size, _ in files)
+        for count, (_, file_size, path) in enumerate(files):
+            remaining = len(files) - count
+            if remaining <= self.max_disk_entries and size <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= file_size
+
+
+transcription_cache = TranscriptionCache(
+    max_entries=settings.TRANSCRIPTION_CACHE_ENTRIES,
+    max_bytes=settings.TRANSCRIPTION_CACHE_BYTES,
+    directory=settings.TRANSCRIPTION_CACHE_DIR,
+    max_disk_entries=settings.TRANSCRIPTION_CACHE_DISK_ENTRIES,
+    max_disk_bytes=settings.TRANSCRIPTION_CACHE_DISK_BYTES,
+)
@@ -0,0 +1,91 @@
+import json
+import socket
+from pathlib import Path
+from time import monotonic
+
+from fastapi import HTTPException
+
+from exako.core.constants import Language
+from exako.settings import settings
+
+# every message is a 4 bytes big endian length followed by the payload. a
+# request is a json header frame ({language, vocabulary}) and an audio frame,
+# the response is a single json frame with either text or status_code/detail.
+FRAME_HEADER_SIZE = 4
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+# seconds the api process stops trying the worker after a connection failure
+UNAVAILABLE_BACKOFF = 5
+
+
+class SpeechWorkerProtocolError(Exception): ...
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(len(payload).to_bytes(FRAME_HEADER_SIZE, 'big'))
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        data = sock.recv(size - len(buffer))
+        if not data:
+            raise SpeechWorkerProtocolError('connection closed by speech worker.')
+        buffer += data
+    return bytes(buffer)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    size = int.from_bytes(recv_exactly(sock, FRAME_HEADER_SIZE), 'big')
+    if size > MAX_FRAME_SIZE:
+        raise SpeechWorkerProtocolError('frame is too big.')
+    return recv_exactly(sock, size)
+
+
+class SpeechWorkerClient:
+    def __init__(self, socket_path: Path | None, timeout: float = 30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.unavailable_until = 0
+
+    def transcribe(
+        self,
+        audio: bytes,
+        vocabulary: list[str],
+        language: Language,
+    ) -> str | None:
+        # returns None when the worker is not running, hangs or drops the
+        # connection, so the caller decodes in process
+        if self.socket_path is None or monotonic() < self.unavailable_until:
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            try:
+                sock.connect(str(self.socket_path))
+            except OSError:
+                self.unavailable_until = monotonic() + UNAVAILABLE_BACKOFF
+                return None
+
+            header = {'language': language.value, 'vocabulary': vocabulary}
+            try:
+                send_frame(sock, json.dumps(header).encode())
+                send_frame(sock, audio)
+                response = json.loads(recv_frame(sock))
+            except (OSError, SpeechWorkerProtocolError):
+                # the worker died, restarted or timed out during the request
+                self.unavailable_until = monotonic() + UNAVAILABLE_BACKOFF
+                return None
+        finally:
+            sock.close()
+
+        if 'text' not in response:
+            raise HTTPException(
+                status_code=response['status_code'], detail=response['detail']
+            )
+        return response['text']
+
+
+speech_worker = SpeechWorkerClient(settings.SPEECH_WORKER_SOCKET)
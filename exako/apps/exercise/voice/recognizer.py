@@ -0,0 +1,80 @@
+import json
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+
+from vosk import KaldiRecognizer, Model
+
+from exako.core.constants import Language
+from exako.settings import BASE_DIR, settings
+
+en_model_path = BASE_DIR / 'exako/apps/exercise/voice/models/en-model'
+
+language_model_map = {
+    Language.ENGLISH_USA: en_model_path,
+    Language.ENGLISH_UK: en_model_path,
+}
+
+
+class RecognizerPool:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.models: dict[Path, Model] = dict()
+        self.idle: OrderedDict[tuple, list[KaldiRecognizer]] = OrderedDict()
+        self.idle_count = 0
+        self.lock = Lock()
+        self.model_lock = Lock()
+
+    def get_model(self, language: Language) -> Model:
+        model_path = language_model_map.get(language)
+        if model_path is None:
+            raise ValueError(f'there is no speech model for {language.value}.')
+        with self.model_lock:
+            if model_path not in self.models:
+                self.models[model_path] = Model(model_path=str(model_path))
+            return self.models[model_path]
+
+    def preload(self):
+        for language in language_model_map:
+            self.get_model(language)
+
+    def _acquire(self, key: tuple) -> KaldiRecognizer | None:
+        with self.lock:
+            recognizers = self.idle.get(key)
+            if not recognizers:
+                return None
+            self.idle_count -= 1
+            recognizer = recognizers.pop()
+            if not recognizers:
+                del self.idle[key]
+            return recognizer
+
+    def _release(self, key: tuple, recognizer: KaldiRecognizer):
+        with self.lock:
+            self.idle.setdefault(key, []).append(recognizer)
+            self.idle.move_to_end(key)
+            self.idle_count += 1
+            while self.idle_count > self.max_size:
+                _, recognizers = next(iter(self.idle.items()))
+                recognizers.pop(0)
+                self.idle_count -= 1
+                if not recognizers:
+                    self.idle.popitem(last=False)
+
+    @contextmanager
+    def recognizer(self, language: Language, rate: int, vocabulary: list[str]):
+        # grammar compilation is the expensive part of building a recognizer,
+        # so idle ones are reused for the same (language, rate, vocabulary).
+        key = (language, rate, tuple(vocabulary))
+        recognizer = self._acquire(key)
+        if recognizer is None:
+            recognizer = KaldiRecognizer(
+                self.get_model(language), rate, json.dumps(vocabulary)
+            )
+        yield recognizer
+        recognizer.Reset()
+        self._release(key, recognizer)
+
+
+recognizer_pool = RecognizerPool(max_size=settings.RECOGNIZER_POOL_SIZE)
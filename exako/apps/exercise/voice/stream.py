@@ -0,0 +1,149 @@
+import json
+import sys
+from array import array
+from hashlib import sha256
+
+from exako.apps.exercise.voice.audio import (
+    MODEL_SAMPLE_RATE,
+    VAD_FRAME_DURATION,
+    VAD_PADDING,
+    WAV_HEADER_MAX_SIZE,
+    AudioParams,
+    AudioTooLongError,
+    InvalidAudioError,
+    Resampler,
+    downmix,
+    is_speech,
+    parse_wav_header,
+    to_pcm16,
+)
+from exako.apps.exercise.voice.cache import transcription_cache
+from exako.apps.exercise.voice.recognizer import recognizer_pool
+from exako.apps.exercise.voice.text import text_speak_time
+from exako.core.constants import Language
+
+# silence kept back while waiting to know if the speech continues
+MAX_PENDING_SILENCE = MODEL_SAMPLE_RATE
+
+
+class StreamDecoder:
+    def __init__(self, vocabulary: list[str], language: Language):
+        self.vocabulary = vocabulary
+        self.language = language
+        self.max_duration = text_speak_time(' '.join(vocabulary))
+        self.hash = sha256()
+        self.buffer = bytearray()
+        self.params: AudioParams | None = None
+        self.resampler: Resampler | None = None
+        self.received_frames = 0
+
+        self.vad_frame = int(MODEL_SAMPLE_RATE * VAD_FRAME_DURATION)
+        self.padding = int(MODEL_SAMPLE_RATE * VAD_PADDING)
+        self.samples = array('h')
+        self.pending = array('h')
+        self.speech_started = False
+
+        self.recognizer_context = recognizer_pool.recognizer(
+            language, MODEL_SAMPLE_RATE, vocabulary
+        )
+        self.recognizer = None
+
+    def _write(self, samples: array):
+        if not samples:
+            return
+        if sys.byteorder == 'big':
+            samples = array('h', samples)
+            samples.byteswap()
+        self.recognizer.AcceptWaveform(samples.tobytes())
+
+    def _accept_frame(self, frame: array):
+        if is_speech(frame, 0, len(frame)):
+            if self.speech_started:
+                self._write(self.pending)
+            else:
+                self._write(self.pending[-self.padding :])
+            self.pending = array('h')
+            self._write(frame)
+            self.speech_started = True
+            return
+
+        self.pending.extend(frame)
+        if not self.speech_started:
+            self.pending = self.pending[-self.padding :]
+        elif len(self.pending) > MAX_PENDING_SILENCE:
+            self._write(self.pending[: -self.padding])
+            self.pending = self.pending[-self.padding :]
+
+    def _accept(self, frames: bytes):
+        samples = to_pcm16(frames, self.params.sample_width)
+        samples = downmix(samples, self.params.channels)
+        self._accept_samples(self.resampler.feed(samples))
+
+    def _accept_samples(self, samples: array):
+        self.samples.extend(samples)
+        usable = len(self.samples) - len(self.samples) % self.vad_frame
+        for start in range(0, usable, self.vad_frame):
+            self._accept_frame(self.samples[start : start + self.vad_frame])
+        del self.samples[:usable]
+
+    def _read_header(self) -> bool:
+        header = parse_wav_header(bytes(self.buffer[:WAV_HEADER_MAX_SIZE]))
+        if header is None:
+            if len(self.buffer) >= WAV_HEADER_MAX_SIZE:
+                raise InvalidAudioError('audio file must be WAV format PCM.')
+            return False
+
+        self.params, data_offset = header
+        if self.params.duration > self.max_duration:
+            raise AudioTooLongError('audio_file is too big.')
+        del self.buffer[:data_offset]
+        self.resampler = Resampler(self.params.rate)
+        self.recognizer = self.recognizer_context.__enter__()
+        return True
+
+    def feed(self, chunk: bytes):
+        self.hash.update(chunk)
+        self.buffer += chunk
+        if self.params is None and not self._read_header():
+            return
+
+        frame_size = self.params.channels * self.params.sample_width
+        usable = len(self.buffer) - len(self.buffer) % frame_size
+        self.received_frames += usable // frame_size
+        if self.received_frames / self.params.rate > self.max_duration:
+            raise AudioTooLongError('audio_file is too big.')
+
+        frames = bytes(self.buffer[:usable])
+        del self.buffer[:usable]
+        self._accept(frames)
+
+    def finish(self) -> str:
+        if self.params is None:
+            raise InvalidAudioError('audio file must be WAV format PCM.')
+        self._accept_samples(self.resampler.finish())
+        if self.samples:
+            self._accept_frame(self.samples)
+            self.samples = array('h')
+        if not self.speech_started:
+            return ''
+        self._write(self.pending[: self.padding])
+
+        text = json.loads(self.recognizer.FinalResult()).get('text', '')
+        if text:
+            transcription_cache.set(
+                transcription_cache.key_from_digest(
+                    self.hash.hexdigest(), self.vocabulary, self.language
+                ),
+                text,
+            )
+        return text
+
+    def close(self, error: BaseException | None = None):
+        if self.recognizer is None:
+            return
+        # a recognizer left in an unknown state by an error is discarded
+        if error is None:
+            self.recognizer_context.__exit__(None, None, None)
+        else:
+            self.recognizer_context.__exit__(type(error), error, error.__traceback__)
+        self.recognizer = None
@@ -1,55 +1,116 @@
-from difflib import SequenceMatcher
 from math import ceil
+from typing import Iterator, Sequence
 
-from exako.core.helper import normalize_array_text, normalize_text
+from exako.core.constants import EditOperation, Language
+from exako.core.normalize import normalize_text, normalize_texts
 
 WORDS_PER_MINUTE = 40
 
 
-def text_distance(s1, s2):
-    s1 = normalize_text(s1)
-    s2 = normalize_text(s2)
-
-    m, n = len(s1), len(s2)
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-    for i in range(m + 1):
-        dp[i][0] = i
-    for j in range(n + 1):
-        dp[0][j] = j
-
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            cost = 0 if s1[i - 1] == s2[j - 1] else 1
-            dp[i][j] = min(
-                dp[i - 1][j] + 1,
-                dp[i][j - 1] + 1,
-                dp[i - 1][j - 1] + cost,
+def common_affix(s1: Sequence, s2: Sequence) -> tuple[int, int, int]:
+    # answers are mostly right, so the equal head and tail are skipped
+    # before filling the levenshtein rows
+    start, end1, end2 = 0, len(s1), len(s2)
+    while start < end1 and start < end2 and s1[start] == s2[start]:
+        start += 1
+    while end1 > start and end2 > start and s1[end1 - 1] == s2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+    return start, end1, end2
+
+
+def levenshtein_rows(s1: Sequence, s2: Sequence) -> Iterator[list[int]]:
+    previous = list(range(len(s2) + 1))
+    yield previous
+    for i, item in enumerate(s1, 1):
+        current = [i]
+        for j, other in enumerate(s2, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (item != other),
+                )
             )
-
-    return dp[m][n]
-
-
-def text_diff(s1: str, s2: str) -> list[int]:
-    s1_words = normalize_array_text(s1.split())
-    s2_words = normalize_array_text(s2.split())
-
-    diff_indexes = set()
-
-    matcher = SequenceMatcher(None, s1_words, s2_words)
-
-    all_indices = set(range(len(s2_words)))
-    matching_blocks = set()
-
-    for block in matcher.get_matching_blocks():
-        _, j, size = block
-        if size > 0:
-            for idx in range(j, j + size):
-                matching_blocks.add(idx)
-
-    diff_indexes = all_indices - matching_blocks
-
-    return list(diff_indexes)
+        yield current
+        previous = current
+
+
+def edit_distance(
+    s1: Sequence,
+    s2: Sequence,
+    max_distance: int | None = None,
+) -> int:
+    # with max_distance, anything over the bound is returned as max_distance + 1
+    start, end1, end2 = common_affix(s1, s2)
+    s1, s2 = s1[start:end1], s2[start:end2]
+    if max_distance is not None and abs(len(s1) - len(s2)) > max_distance:
+        return max_distance + 1
+
+    row = None
+    for row in levenshtein_rows(s1, s2):
+        if max_distance is not None and min(row) > max_distance:
+            return max_distance + 1
+    if max_distance is not None:
+        return min(row[-1], max_distance + 1)
+    return row[-1]
+
+
+def text_distance(
+    s1: str,
+    s2: str,
+    language: Language | None = None,
+    max_distance: int | None = None,
+) -> int:
+    return edit_distance(
+        normalize_text(s1, language), normalize_text(s2, language), max_distance
+    )
+
+
+def word_alignment(
+    s1_words: list[str], s2_words: list[str]
+) -> list[tuple[EditOperation, int | None, int | None]]:
+    # minimal edit script turning s1_words into s2_words, as (operation,
+    # s1 index, s2 index) ordered by position
+    start, end1, end2 = common_affix(s1_words, s2_words)
+    s1, s2 = s1_words[start:end1], s2_words[start:end2]
+    rows = list(levenshtein_rows(s1, s2))
+
+    script = list()
+    i, j = len(s1), len(s2)
+    while i or j:
+        cost = rows[i][j]
+        # on ties a shifted word is reported as insert/delete, not substitutions
+        if i and j and s1[i - 1] == s2[j - 1] and cost == rows[i - 1][j - 1]:
+            i, j = i - 1, j - 1
+        elif i and cost == rows[i - 1][j] + 1:
+            i -= 1
+            script.append((EditOperation.DELETE, start + i, None))
+        elif j and cost == rows[i][j - 1] + 1:
+            j -= 1
+            script.append((EditOperation.INSERT, None, start + j))
+        else:
+            i, j = i - 1, j - 1
+            script.append((EditOperation.SUBSTITUTE, start + i, start + j))
+    script.reverse()
+    return script
+
+
+def text_alignment(s1: str, s2: str, language: Language | None = None) -> list[dict]:
+    s1_words = normalize_texts(s1.split(), language)
+    s2_words = normalize_texts(s2.split(), language)
+    return [
+        {'operation': operation, 'correct_index': i, 'index': j}
+        for operation, i, j in word_alignment(s1_words, s2_words)
+    ]
+
+
+def alignment_indexes(alignment: list[dict]) -> list[int]:
+    return [edit['index'] for edit in alignment if edit['index'] is not None]
+
+
+def text_diff(s1: str, s2: str, language: Language | None = None) -> list[int]:
+    return alignment_indexes(text_alignment(s1, s2, language))
 
 
 def text_speak_time(text):
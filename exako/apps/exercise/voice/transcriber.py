@@ -1,68 +1,137 @@
 import json
-import wave
+from time import perf_counter
+from typing import AsyncIterator
 
 from fastapi import HTTPException, status
-from vosk import KaldiRecognizer, Model
+from fastapi.concurrency import run_in_threadpool
 
+from exako.apps.exercise.voice.audio import (
+    MODEL_SAMPLE_RATE,
+    AudioTooLongError,
+    InvalidAudioError,
+    prepare_audio,
+    read_wav,
+)
+from exako.apps.exercise.voice.cache import transcription_cache
+from exako.apps.exercise.voice.client import speech_worker
+from exako.apps.exercise.voice.recognizer import recognizer_pool
+from exako.apps.exercise.voice.stream import StreamDecoder
 from exako.apps.exercise.voice.text import text_speak_time
 from exako.core.constants import Language
-from exako.settings import BASE_DIR
+from exako.core.metrics import speech_decode_duration
+from exako.core.tracing import span
 
-en_model_path = BASE_DIR / 'exako/apps/exercise/voice/models/en-model'
+DECODE_CHUNK_SIZE = 8000
 
-language_model_map = {
-    Language.ENGLISH_USA: en_model_path,
-    Language.ENGLISH_UK: en_model_path,
-}
 
-
-def trascribe_to_text(
+def decode_audio(
     audio_file: bytes,
     vocabulary: list[str],
     language: Language,
-):
+) -> str:
     try:
-        with wave.open(audio_file, 'rb') as wf:
-            if (
-                wf.getnchannels() != 1
-                or wf.getsampwidth() != 2
-                or wf.getcomptype() != 'NONE'
-            ):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail='audio file must be WAV format mono PCM.',
-                )
+        params, frames = read_wav(audio_file)
+        if params.duration > text_speak_time(' '.join(vocabulary)):
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail='audio_file is too big.',
+            )
+        pcm = prepare_audio(params, frames)
+    except InvalidAudioError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error),
+        )
+    if not pcm:
+        return ''
 
-            audio_size = wf.getnframes() / wf.getframerate()
-            if audio_size > text_speak_time(' '.join(vocabulary)):
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail='audio_file is too big.',
-                )
+    with recognizer_pool.recognizer(
+        language, MODEL_SAMPLE_RATE, vocabulary
+    ) as recognizer:
+        for start in range(0, len(pcm), DECODE_CHUNK_SIZE):
+            recognizer.AcceptWaveform(pcm[start : start + DECODE_CHUNK_SIZE])
+        final_result = json.loads(recognizer.FinalResult())
+    return final_result.get('text', '')
 
-            model_path = language_model_map.get(language)
-            model = Model(model_path=model_path)
-            recognizer = KaldiRecognizer(
-                model,
-                wf.getframerate(),
-                json.dumps(vocabulary),
-            )
 
-            while True:
-                data = wf.readframes(4000)
-                if len(data) == 0:
-                    break
+def trascribe_to_text(
+    audio_file: bytes,
+    vocabulary: list[str],
+    language: Language,
+):
+    cache_key = transcription_cache.key(audio_file, vocabulary, language)
+    text = transcription_cache.get(cache_key)
+    if text is None:
+        try:
+            start = perf_counter()
+            with span('speech.decode', mode='worker'):
+                text = speech_worker.transcribe(audio_file, vocabulary, language)
+            if text is None:
+                with (
+                    speech_decode_duration.labels('local').time(),
+                    span('speech.decode', mode='local'),
+                ):
+                    text = decode_audio(audio_file, vocabulary, language)
+            else:
+                speech_decode_duration.labels('worker').observe(perf_counter() - start)
+        except HTTPException:
+            raise
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='something went wrong in audio_file transcription.',
+            )
 
-        final_result = json.loads(recognizer.FinalResult())
-        text = final_result.get('text', '')
         if text == '':
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail='could not trascribe text.',
             )
-        return text
-    except Exception:
+        transcription_cache.set(cache_key, text)
+    return text
+
+
+async def trascribe_stream(
+    stream: AsyncIterator[bytes],
+    vocabulary: list[str],
+    language: Language,
+) -> str:
+    error = None
+    decoder = StreamDecoder(vocabulary, language)
+    try:
+        async for chunk in stream:
+            if chunk:
+                await run_in_threadpool(decoder.feed, chunk)
+        # the audio was decoded while it arrived, finish is what the user waits
+        with (
+            speech_decode_duration.labels('stream').time(),
+            span('speech.decode', mode='stream'),
+        ):
+            text = await run_in_threadpool(decoder.finish)
+    except InvalidAudioError as exc:
+        error = exc
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        )
+    except AudioTooLongError as exc:
+        error = exc
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(exc),
+        )
+    except Exception as exc:
+        error = exc
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail='something went wrong in audio_file transcription.',
         )
+    finally:
+        decoder.close(error)
+
+    if text == '':
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='could not trascribe text.',
+        )
+    return text
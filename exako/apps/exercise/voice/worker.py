@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException, status
+
+from exako.apps.exercise.voice.client import (
+    FRAME_HEADER_SIZE,
+    MAX_FRAME_SIZE,
+    SpeechWorkerProtocolError,
+)
+from exako.apps.exercise.voice.recognizer import recognizer_pool
+from exako.apps.exercise.voice.transcriber import decode_audio
+from exako.core.constants import Language
+from exako.settings import settings
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    size = int.from_bytes(await reader.readexactly(FRAME_HEADER_SIZE), 'big')
+    if size > MAX_FRAME_SIZE:
+        raise SpeechWorkerProtocolError('frame is too big.')
+    return await reader.readexactly(size)
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(len(payload).to_bytes(FRAME_HEADER_SIZE, 'big'))
+    writer.write(payload)
+
+
+class SpeechWorkerServer:
+    def __init__(self, socket_path: Path, workers: int):
+        self.socket_path = socket_path
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def transcribe(self, header: dict, audio: bytes) -> dict:
+        try:
+            text = decode_audio(
+                audio, header['vocabulary'], Language(header['language'])
+            )
+            return {'text': text}
+        except HTTPException as error:
+            return {'status_code': error.status_code, 'detail': error.detail}
+        except Exception:
+            return {
+                'status_code': status.HTTP_503_SERVICE_UNAVAILABLE,
+                'detail': 'something went wrong in audio_file transcription.',
+            }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            header = json.loads(await read_frame(reader))
+            audio = await read_frame(reader)
+            response = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.transcribe, header, audio
+            )
+            write_frame(writer, json.dumps(response).encode())
+            await writer.drain()
+        except (asyncio.IncompleteReadError, SpeechWorkerProtocolError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        server = await asyncio.start_unix_server(
+            self.handle, path=str(self.socket_path)
+        )
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exako speech worker.')
+    parser.add_argument('--socket', type=Path, default=settings.SPEECH_WORKER_SOCKET)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if args.socket is None:
+        parser.error('--socket or SPEECH_WORKER_SOCKET is required.')
+
+    recognizer_pool.preload()
+
+    asyncio.run(SpeechWorkerServer(args.socket, args.workers).serve())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,19 @@
-from datetime import datetime
-from typing import Any
+import logging
+from datetime import datetime, timedelta
+from typing import Annotated, Any, Callable, ClassVar
 from uuid import UUID
 
-from beanie import Document, Link
+from beanie import Document, Indexed, Link, PydanticObjectId
 from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
 
 from exako.apps.exercise.models import Exercise
+from exako.apps.exercise.sampler import ReviewSampler
+from exako.core.bloom import BloomFilter
+from exako.core.constants import ExerciseType, Language
+
+logger = logging.getLogger(__name__)
 
 
 class ExerciseHistory(Document):
@@ -18,3 +26,183 @@ class ExerciseHistory(Document):
 
     class Settings:
         name = 'exercise_history'
+
+
+class ExerciseSeenFilter(Document):
+    user_id: Annotated[UUID, Indexed(unique=True)]
+    current: bytes | None = None
+    previous: bytes | None = None
+    current_count: int = 0
+
+    # exercises per generation, two generations are kept so the filter only
+    # remembers the last 500-1000 answered exercises in 2KiB per user.
+    GENERATION_SIZE: ClassVar[int] = 500
+    REGISTER_ATTEMPTS: ClassVar[int] = 5
+
+    @classmethod
+    async def get_filter(cls, user_id: UUID) -> 'ExerciseSeenFilter | None':
+        return await cls.find_one(cls.user_id == user_id)
+
+    @classmethod
+    async def register(cls, user_id: UUID, exercise_id: PydanticObjectId):
+        # the filter is written only if the count read is still stored, so
+        # concurrent checks of the same user retry instead of losing entries.
+        collection = cls.get_motor_collection()
+        for _ in range(cls.REGISTER_ATTEMPTS):
+            seen = await cls.get_filter(user_id)
+            if seen is None:
+                seen = cls(user_id=user_id)
+            current_count = seen.current_count
+            if seen.current_count >= cls.GENERATION_SIZE:
+                seen.previous = seen.current
+                seen.current = None
+                seen.current_count = 0
+
+            current = BloomFilter(seen.current)
+            current.add(str(exercise_id))
+            seen.current = current.to_bytes()
+            seen.current_count += 1
+
+            if seen.id is None:
+                try:
+                    await seen.insert()
+                    return
+                except DuplicateKeyError:
+                    continue  # concurrent first check of the same user
+            result = await collection.update_one(
+                {'_id': seen.id, 'current_count': current_count},
+                {
+                    '$set': {
+                        'current': seen.current,
+                        'previous': seen.previous,
+                        'current_count': seen.current_count,
+                    }
+                },
+            )
+            if result.matched_count:
+                return
+        logger.warning(
+            'exercise %s not registered in the seen filter of user %s after %s '
+            'concurrent updates.',
+            exercise_id,
+            user_id,
+            cls.REGISTER_ATTEMPTS,
+        )
+
+    def as_predicate(self) -> Callable[[PydanticObjectId], bool]:
+        generations = [
+            BloomFilter(generation)
+            for generation in (self.current, self.previous)
+            if generation is not None
+        ]
+        return lambda exercise_id: any(
+            str(exercise_id) in generation for generation in generations
+        )
+
+    class Settings:
+        name = 'exercise_seen_filter'
+
+
+class ExerciseReview(Document):
+    user_id: UUID
+    exercise_id: PydanticObjectId
+    type: ExerciseType
+    language: Language
+    repetitions: int = 0
+    interval: int = 0
+    ease: float = 2.5
+    due_at: datetime = Field(default_factory=datetime.now)
+
+    MIN_EASE: ClassVar[float] = 1.3
+    REVIEW_ATTEMPTS: ClassVar[int] = 5
+
+    def schedule(self, correct: bool):
+        # SM-2 with the answer quality derived only from the check outcome
+        quality = 4 if correct else 1
+        if correct:
+            if self.repetitions == 0:
+                self.interval = 1
+            elif self.repetitions == 1:
+                self.interval = 6
+            else:
+                self.interval = round(self.interval * self.ease)
+            self.repetitions += 1
+        else:
+            self.repetitions = 0
+            self.interval = 1
+
+        self.ease = max(
+            self.MIN_EASE,
+            self.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02),
+        )
+        self.due_at = datetime.now() + timedelta(days=self.interval)
+
+    @classmethod
+    async def review(cls, user_id: UUID, exercise: Exercise, correct: bool):
+        # scheduled from the stored review and written only if its due date
+        # did not change meanwhile, otherwise read again and retried.
+        collection = cls.get_motor_collection()
+        for _ in range(cls.REVIEW_ATTEMPTS):
+            review = await cls.find_one(
+                cls.user_id == user_id,
+                cls.exercise_id == exercise.id,
+            )
+            if review is None:
+                review = cls(
+                    user_id=user_id,
+                    exercise_id=exercise.id,
+                    type=exercise.type,
+                    language=exercise.language,
+                )
+                review.schedule(correct)
+                try:
+                    await review.insert()
+                    return
+                except DuplicateKeyError:
+                    continue  # concurrent first check of the same exercise
+
+            due_at = review.due_at
+            review.schedule(correct)
+            result = await collection.update_one(
+                {'_id': review.id, 'due_at': due_at},
+                {
+                    '$set': {
+                        'repetitions': review.repetitions,
+                        'interval': review.interval,
+                        'ease': review.ease,
+                        'due_at': review.due_at,
+                    }
+                },
+            )
+            if result.matched_count:
+                return
+        logger.warning(
+            'review of exercise %s for user %s not scheduled after %s '
+            'concurrent updates.',
+            exercise.id,
+            user_id,
+            cls.REVIEW_ATTEMPTS,
+        )
+
+    @classmethod
+    def due(cls, user_id: UUID, match: dict) -> ReviewSampler:
+        return ReviewSampler(
+            cls.get_motor_collection(),
+            Exercise.get_motor_collection(),
+            user_id,
+            match,
+        )
+
+    class Settings:
+        name = 'exercise_review'
+        indexes = [
+            IndexModel(
+                [('user_id', ASCENDING), ('due_at', ASCENDING)],
+                name='exercise_review_due_index',
+            ),
+            IndexModel(
+                [('user_id', ASCENDING), ('exercise_id', ASCENDING)],
+                unique=True,
+                name='exercise_review_unique_index',
+            ),
+        ]
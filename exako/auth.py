@@ -1,10 +1,22 @@
 from fastapi.security import OAuth2AuthorizationCodeBearer
-from fief_client import FiefAsync
+from fief_client import FiefAsync, FiefError
 from fief_client.integrations.fastapi import FiefAuth
 
+from exako.core.tracing import span
 from exako.settings import settings
 
-fief = FiefAsync(
+
+class TracedFiefAsync(FiefAsync):
+    async def validate_access_token(self, *args, **kwargs):
+        with span('auth.validate_token'):
+            return await super().validate_access_token(*args, **kwargs)
+
+    async def userinfo(self, access_token: str):
+        with span('auth.userinfo', kind='client'):
+            return await super().userinfo(access_token)
+
+
+fief = TracedFiefAsync(
     settings.FIEF_DOMAIN,
     settings.FIEF_CLIENT_ID,
     settings.FIEF_CLIENT_SCRET,
@@ -18,7 +30,19 @@ scheme = OAuth2AuthorizationCodeBearer(
 )
 
 
+ADMIN_PERMISSIONS = ['fief:admin']
+
 auth = FiefAuth(fief, scheme)
 
 current_user = auth.current_user()
-current_admin_user = auth.current_user(permissions=['fief:admin'])
+current_admin_user = auth.current_user(permissions=ADMIN_PERMISSIONS)
+
+
+async def is_admin_token(access_token: str) -> bool:
+    try:
+        await fief.validate_access_token(
+            access_token, required_permissions=ADMIN_PERMISSIONS
+        )
+    except FiefError:
+        return False
+    return True
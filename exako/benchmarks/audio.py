@@ -0,0 +1,29 @@
+import io
+import math
+import wave
+from array import array
+
+
+def generate_wav(*, rate=16000, channels=1, sample_width=2, silence=0.5, tone=1.0):
+    silent_frames = [0] * int(rate * silence)
+    tone_frames = [
+        int(10000 * math.sin(2 * math.pi * 440 * i / rate))
+        for i in range(int(rate * tone))
+    ]
+    samples = silent_frames + tone_frames + silent_frames
+    pcm = array('h', [sample for sample in samples for _ in range(channels)])
+    frames = pcm.tobytes()
+    if sample_width == 1:
+        frames = bytes((sample >> 8) + 128 for sample in pcm)
+    elif sample_width == 4:
+        frames = b''.join(
+            b'\x00\x00' + frames[i : i + 2] for i in range(0, len(frames), 2)
+        )
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(frames)
+    return buffer.getvalue()
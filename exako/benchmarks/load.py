@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from collections import defaultdict
+from datetime import datetime
+from random import Random
+from time import perf_counter
+from unittest.mock import patch
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from asgi_lifespan import LifespanManager
+from fastapi import Request
+from httpx import ASGITransport, AsyncClient
+
+from exako.apps.exercise.builder import exercise_builder_map
+from exako.auth import current_admin_user, current_user
+from exako.benchmarks.audio import generate_wav
+from exako.benchmarks.seed import FACTORIES, BatchWriter, Distribution, seed_exercises
+from exako.benchmarks.speak import percentile, use_stub_recognizer
+from exako.core.constants import ExerciseType, Language
+from exako.main import app, database_client
+from exako.settings import settings
+from exako.tests.factories import exercise as factories
+
+SEED = 42
+LOAD_DATABASE = 'exako_load'
+USER_HEADER = 'x-load-user'
+SPEAK_TYPES = frozenset({ExerciseType.SPEAK_TERM, ExerciseType.SPEAK_SENTENCE})
+CHOICE_TYPES = frozenset({
+    ExerciseType.LISTEN_TERM_MCHOICE,
+    ExerciseType.TERM_SENTENCE_MCHOICE,
+    ExerciseType.TERM_DEFINITION_MCHOICE,
+    ExerciseType.TERM_IMAGE_MCHOICE,
+    ExerciseType.TERM_IMAGE_TEXT_MCHOICE,
+})  # fmt: skip
+# shorter than the time to speak the one word answers of the factories
+SPEAK_AUDIO = generate_wav(silence=0.25, tone=0.5)
+
+
+def load_user(request: Request) -> dict:
+    # every virtual user has its own seen filter and review schedule
+    return {'sub': request.headers[USER_HEADER], 'access_token': ''}
+
+
+async def seed_catalog(
+    size: int, batch_size: int, languages: list[Language], random: Random
+) -> int:
+    factories.faker.seed_instance(random.random())
+    writer = BatchWriter()
+    await seed_exercises(
+        writer,
+        size,
+        batch_size,
+        random,
+        Distribution.uniform(FACTORIES),
+        Distribution.uniform(languages),
+        Distribution.uniform([None]),
+        datetime.now(),
+    )
+    await writer.close()
+    return size
+
+
+def answer_for(exercise_type: ExerciseType, exercise: dict, random: Random) -> dict:
+    if exercise_type == ExerciseType.ORDER_SENTENCE:
+        sentence = list(exercise['sentence'])
+        random.shuffle(sentence)
+        return {'sentence': sentence}
+    if exercise_type in CHOICE_TYPES:
+        return {'term_id': random.choice(list(exercise['choices']))}
+    if exercise_type == ExerciseType.TERM_CONNECTION:
+        return {'choices': random.sample(list(exercise['choices']), 4)}
+    return {'content': factories.faker.word()}
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(
+        self, client: AsyncClient, route: str, method: str, url: str, **kwargs
+    ):
+        start = perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[route].append(perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def report(self, elapsed: float) -> list[dict]:
+        results = list()
+        for route, latencies in sorted(self.latencies.items()):
+            results.append(
+                {
+                    'name': route,
+                    'requests': len(latencies),
+                    'errors': self.errors[route],
+                    'throughput_rps': len(latencies) / elapsed,
+                    'mean_ms': sum(latencies) / len(latencies) * 1000,
+                    'p50_ms': percentile(latencies, 50) * 1000,
+                    'p90_ms': percentile(latencies, 90) * 1000,
+                    'p99_ms': percentile(latencies, 99) * 1000,
+                    'max_ms': max(latencies) * 1000,
+                }
+            )
+        return results
+
+
+async def virtual_user(
+    client: AsyncClient, stats: LoadStats, args, deadline: float, random: Random
+):
+    headers = {USER_HEADER: str(uuid4())}
+    params = {
+        'language': [language.value for language in args.languages],
+        'size': args.page_size,
+    }
+
+    while perf_counter() < deadline:
+        response = await stats.request(
+            client, 'list_exercise', 'GET', '/exercise/', params=params, headers=headers
+        )
+        if response.status_code != 200 or not response.json()['items']:
+            continue
+
+        item = random.choice(response.json()['items'])
+        exercise_type = ExerciseType(item['type'])
+        name = exercise_builder_map[exercise_type].__name__
+        path = urlsplit(item['url']).path
+        response = await stats.request(client, name, 'GET', path, headers=headers)
+        if response.status_code != 200:
+            continue
+
+        exercise = response.json()
+        if exercise_type in SPEAK_TYPES:
+            await stats.request(
+                client,
+                f'check_stream_{name}',
+                'POST',
+                f'{path}/stream',
+                params=exercise,
+                content=SPEAK_AUDIO,
+                headers={**headers, 'content-type': 'audio/wav'},
+            )
+            continue
+        await stats.request(
+            client,
+            f'check_{name}',
+            'POST',
+            path,
+            json={
+                **exercise,
+                'seconds_to_answer': random.randint(1, 60),
+                'answer': answer_for(exercise_type, exercise, random),
+            },
+            headers=headers,
+        )
+
+
+async def run(args) -> dict:
+    random = Random(args.seed)
+    with (
+        patch.object(settings, 'DATABASE_NAME', args.database),
+        patch.object(settings, 'DATABASE_CREATE_INDEXES', True),
+    ):
+        async with LifespanManager(app):
+            app.dependency_overrides[current_user] = load_user
+            app.dependency_overrides[current_admin_user] = load_user
+            try:
+                start = perf_counter()
+                catalog_size = await seed_catalog(
+                    args.catalog_size, args.batch_size, args.languages, random
+                )
+                seed_seconds = perf_counter() - start
+
+                stats = LoadStats()
+                async with AsyncClient(
+                    transport=ASGITransport(app=app), base_url='http://testserver'
+                ) as client:
+                    start = perf_counter()
+                    deadline = start + args.duration
+                    await asyncio.gather(
+                        *[
+                            virtual_user(
+                                client,
+                                stats,
+                                args,
+                                deadline,
+                                Random(random.random()),
+                            )
+                            for _ in range(args.users)
+                        ]
+                    )
+                    elapsed = perf_counter() - start
+            finally:
+                app.dependency_overrides.clear()
+                if not args.keep:
+                    await database_client.drop_database(args.database)
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stub': args.stub,
+            'seed': args.seed,
+            'users': args.users,
+            'duration': elapsed,
+            'catalog_size': catalog_size,
+            'seed_seconds': seed_seconds,
+        },
+        'routes': stats.report(elapsed),
+    }
+
+
+def print_summary(report: dict, file=sys.stderr):
+    print(
+        f'{"route":<42} {"reqs":>7} {"errs":>5} {"rps":>8} '
+        f'{"p50":>8} {"p90":>8} {"p99":>8}',
+        file=file,
+    )
+    for route in report['routes']:
+        print(
+            f'{route["name"]:<42} {route["requests"]:>7} {route["errors"]:>5} '
+            f'{route["throughput_rps"]:>8.1f} {route["p50_ms"]:>8.2f} '
+            f'{route["p90_ms"]:>8.2f} {route["p99_ms"]:>8.2f}',
+            file=file,
+        )
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    baseline_routes = {route['name']: route for route in baseline.get('routes', [])}
+    regressions = list()
+    for route in current['routes']:
+        previous = baseline_routes.get(route['name'])
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if route[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f'{route["name"]} {metric}: '
+                    f'{previous[metric]:.3f} -> {route[metric]:.3f}'
+                )
+        if route['throughput_rps'] < previous['throughput_rps'] * (1 - threshold):
+            regressions.append(
+                f'{route["name"]} throughput_rps: '
+                f'{previous["throughput_rps"]:.1f} -> {route["throughput_rps"]:.1f}'
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load test of the list, build and check flows.'
+    )
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--catalog-size', type=int, default=10_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument(
+        '--languages', type=Language, nargs='+', default=[Language.ENGLISH_USA]
+    )
+    parser.add_argument('--database', default=LOAD_DATABASE)
+    parser.add_argument('--keep', action='store_true', help='keep the database')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--stub', action='store_true', help='skip the vosk models')
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    parser.add_argument('--compare', type=argparse.FileType('r'))
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.database == settings.DATABASE_NAME and not args.keep:
+        parser.error('refusing to drop the configured database, use --keep.')
+    if args.stub:
+        use_stub_recognizer()
+
+    report = asyncio.run(run(args))
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+    print_summary(report)
+
+    if args.compare is not None:
+        regressions = compare(report, json.load(args.compare), args.threshold)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
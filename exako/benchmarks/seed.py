@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import random
+import sys
+from datetime import date, datetime, timedelta
+from enum import Enum
+from itertools import accumulate
+from time import perf_counter
+from uuid import UUID
+
+from beanie import Document, PydanticObjectId
+
+from exako.apps.computed.models import ExerciseComputed
+from exako.apps.exercise.models import Exercise
+from exako.apps.history.models import ExerciseHistory
+from exako.core.constants import ExerciseType, Language, Level
+from exako.core.database import DatabaseInitializer, document_models, init_database
+from exako.main import database_client
+from exako.settings import settings
+from exako.tests.factories import exercise as factories
+
+SEED = 42
+BATCH_SIZE = 1000
+CONCURRENCY = 4
+HISTORY_DAYS = 180
+# exercises the history rows point to, a reservoir sample of the inserted ones
+HISTORY_EXERCISES = 100_000
+NO_LEVEL = 'none'
+FACTORIES = {
+    factory.model_fields['type'].default: factory
+    for factory in (
+        factories.OrderSentenceFactory,
+        factories.ListenTermFactory,
+        factories.ListenTermMChoiceFactory,
+        factories.ListenSentenceFactory,
+        factories.SpeakTermFactory,
+        factories.SpeakSentenceFactory,
+        factories.TermSentenceMChoiceFactory,
+        factories.TermDefinitionMChoiceFactory,
+        factories.TermImageMChoiceFactory,
+        factories.TermImageTextMChoiceFactory,
+        factories.TermConnectionFactory,
+    )
+}
+
+
+def parse_member(enum: type[Enum], name: str):
+    if enum is Level and name.lower() == NO_LEVEL:
+        return None
+    for member in enum:
+        if name.upper() == member.name or name.lower() == str(member.value).lower():
+            return member
+    raise ValueError(f'unknown {enum.__name__.lower()} {name}.')
+
+
+def parse_distribution(enum: type[Enum], values: list[str]) -> dict:
+    # NAME=weight or value=weight, a missing weight counts as 1
+    weights = dict()
+    for value in values:
+        name, _, weight = value.partition('=')
+        try:
+            weights[parse_member(enum, name)] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f'invalid {enum.__name__.lower()} weight {value}.')
+    if sum(weights.values()) <= 0 or min(weights.values()) < 0:
+        raise ValueError(f'{enum.__name__.lower()} weights must be positive.')
+    return weights
+
+
+class Distribution:
+    __slots__ = ('values', 'cum_weights')
+
+    def __init__(self, weights: dict):
+        self.values = list(weights)
+        self.cum_weights = list(accumulate(weights.values()))
+
+    @classmethod
+    def uniform(cls, values) -> 'Distribution':
+        return cls(dict.fromkeys(values, 1))
+
+    def sample(self, generator: random.Random, size: int) -> list:
+        return generator.choices(self.values, cum_weights=self.cum_weights, k=size)
+
+
+def seed_generators(seed: int) -> random.Random:
+    # the exercise random_score uses the module random and the factories faker
+    random.seed(seed)
+    factories.faker.seed_instance(seed)
+    return random.Random(seed)
+
+
+def object_id(generator: random.Random, created_at: datetime) -> PydanticObjectId:
+    # the timestamp bytes come from created_at, the remaining follow the seed
+    timestamp = int(created_at.timestamp()).to_bytes(4, 'big')
+    return PydanticObjectId(timestamp + generator.randbytes(8))
+
+
+def build_exercises(
+    size: int,
+    generator: random.Random,
+    types: Distribution,
+    languages: Distribution,
+    levels: Distribution,
+    until: datetime,
+) -> list[Document]:
+    return [
+        FACTORIES[exercise_type].build(
+            id=object_id(generator, until), language=language, level=level
+        )
+        for exercise_type, language, level in zip(
+            types.sample(generator, size),
+            languages.sample(generator, size),
+            levels.sample(generator, size),
+        )
+    ]
+
+
+def build_computed(
+    size: int,
+    generator: random.Random,
+    types: Distribution,
+    languages: Distribution,
+    until: datetime,
+) -> list[Document]:
+    documents = list()
+    for exercise_type, language in zip(
+        types.sample(generator, size), languages.sample(generator, size)
+    ):
+        factory = FACTORIES[exercise_type]
+        fields = factory.computed.model_fields
+        data = factory(insert_mongo=False, language=language).model_dump(
+            exclude_none=True
+        )
+        data = {name: value for name, value in data.items() if name in fields}
+        # a partial misses at least one of the fields the pipeline fills
+        optional = [
+            name for name in data if name != 'id' and not fields[name].is_required()
+        ]
+        for name in generator.sample(optional, generator.randint(1, len(optional))):
+            del data[name]
+        documents.append(factory.computed(id=object_id(generator, until), **data))
+    return documents
+
+
+def build_history(
+    size: int,
+    generator: random.Random,
+    exercise_ids: list[PydanticObjectId],
+    users: list[UUID],
+    until: datetime,
+    days: int = HISTORY_DAYS,
+) -> list[Document]:
+    documents = list()
+    for _ in range(size):
+        correct = generator.random() < 0.5
+        created_at = until - timedelta(seconds=generator.uniform(0, days * 86400))
+        documents.append(
+            ExerciseHistory(
+                id=object_id(generator, created_at),
+                exercise=generator.choice(exercise_ids),
+                user_id=generator.choice(users),
+                correct=correct,
+                created_at=created_at,
+                response={'correct': correct},
+                request={'seconds_to_answer': generator.randint(1, 120)},
+            )
+        )
+    return documents
+
+
+class BatchWriter:
+    def __init__(self, concurrency: int = CONCURRENCY):
+        self.concurrency = concurrency
+        self.pending: set[asyncio.Task] = set()
+        self.inserted = 0
+
+    async def write(self, model: type[Document], documents: list[Document]):
+        # generation goes on while up to concurrency batches are in flight
+        while len(self.pending) >= self.concurrency:
+            done, self.pending = await asyncio.wait(
+                self.pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                task.result()
+        self.pending.add(
+            asyncio.create_task(model.insert_many(documents, ordered=False))
+        )
+        self.inserted += len(documents)
+
+    async def close(self):
+        if self.pending:
+            await asyncio.gather(*self.pending)
+        self.pending = set()
+
+
+def reservoir_add(
+    sample: list, seen: int, values: list, generator: random.Random, size: int
+):
+    for index, value in enumerate(values, start=seen):
+        if len(sample) < size:
+            sample.append(value)
+            continue
+        position = generator.randrange(index + 1)
+        if position < size:
+            sample[position] = value
+
+
+def report(name: str, count: int, total: int, start: float):
+    rate = count / max(perf_counter() - start, 1e-9)
+    print(f'{name}: {count}/{total} ({rate:.0f}/s)', file=sys.stderr)
+
+
+async def seed_exercises(
+    writer: BatchWriter,
+    size: int,
+    batch_size: int,
+    generator: random.Random,
+    types: Distribution,
+    languages: Distribution,
+    levels: Distribution,
+    until: datetime,
+    sample_size: int = HISTORY_EXERCISES,
+) -> list[PydanticObjectId]:
+    sample = list()
+    start = perf_counter()
+    for offset in range(0, size, batch_size):
+        documents = build_exercises(
+            min(batch_size, size - offset), generator, types, languages, levels, until
+        )
+        reservoir_add(
+            sample,
+            offset,
+            [document.id for document in documents],
+            generator,
+            sample_size,
+        )
+        await writer.write(Exercise, documents)
+        report('exercises', offset + len(documents), size, start)
+    return sample
+
+
+async def seed_computed(
+    writer: BatchWriter,
+    size: int,
+    batch_size: int,
+    generator: random.Random,
+    types: Distribution,
+    languages: Distribution,
+    until: datetime,
+):
+    start = perf_counter()
+    for offset in range(0, size, batch_size):
+        documents = build_computed(
+            min(batch_size, size - offset), generator, types, languages, until
+        )
+        await writer.write(ExerciseComputed, documents)
+        report('computed', offset + len(documents), size, start)
+
+
+async def seed_history(
+    writer: BatchWriter,
+    size: int,
+    batch_size: int,
+    generator: random.Random,
+    exercise_ids: list[PydanticObjectId],
+    users: list[UUID],
+    until: datetime,
+):
+    start = perf_counter()
+    for offset in range(0, size, batch_size):
+        documents = build_history(
+            min(batch_size, size - offset), generator, exercise_ids, users, until
+        )
+        await writer.write(ExerciseHistory, documents)
+        report('history', offset + len(documents), size, start)
+
+
+def seed_users(generator: random.Random, size: int) -> list[UUID]:
+    return [UUID(int=generator.getrandbits(128), version=4) for _ in range(size)]
+
+
+async def run(args):
+    generator = seed_generators(args.seed)
+    until = datetime.combine(args.until, datetime.min.time())
+    database = database_client[args.database]
+    if args.drop:
+        await database_client.drop_database(args.database)
+    # the indexes are built once at the end, cheaper than on every insert
+    await DatabaseInitializer(
+        database=database, document_models=document_models(), create_indexes=False
+    )
+
+    writer = BatchWriter(args.concurrency)
+    exercise_ids = await seed_exercises(
+        writer,
+        args.exercises,
+        args.batch_size,
+        generator,
+        args.types,
+        args.languages,
+        args.levels,
+        until,
+    )
+    await seed_computed(
+        writer,
+        args.computed,
+        args.batch_size,
+        generator,
+        args.types,
+        args.languages,
+        until,
+    )
+    if args.history and exercise_ids:
+        await seed_history(
+            writer,
+            args.history,
+            args.batch_size,
+            generator,
+            exercise_ids,
+            seed_users(generator, args.users),
+            until,
+        )
+    await writer.close()
+
+    if not args.skip_indexes:
+        await init_database(database, create_indexes=True)
+    print(f'{writer.inserted} documents inserted.', file=sys.stderr)
+
+
+def distribution_argument(enum: type[Enum], value: str | None, default) -> Distribution:
+    if value is None:
+        return Distribution.uniform(default)
+    return Distribution(parse_distribution(enum, value.split(',')))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Insert generated exercises, computed partials and history.',
+        epilog='distributions are comma separated NAME=weight pairs, '
+        'e.g. --languages en-us=8,pt-br=2 --levels none=1,A1=2.',
+    )
+    parser.add_argument('--exercises', type=int, default=100_000)
+    parser.add_argument('--computed', type=int, default=10_000)
+    parser.add_argument('--history', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--types', default=None)
+    parser.add_argument('--languages', default=None)
+    parser.add_argument('--levels', default=None)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument(
+        '--until',
+        type=date.fromisoformat,
+        default=date.today(),
+        help='ids and history dates are generated before this day.',
+    )
+    parser.add_argument('--database', default=settings.DATABASE_NAME)
+    parser.add_argument('--drop', action='store_true', help='drop the database first')
+    parser.add_argument('--skip-indexes', action='store_true')
+    args = parser.parse_args()
+
+    if args.drop and args.database == settings.DATABASE_NAME:
+        parser.error('refusing to drop the configured database, use --database.')
+    if args.batch_size < 1 or args.concurrency < 1 or args.users < 1:
+        parser.error('batch size, concurrency and users must be positive.')
+    try:
+        args.types = distribution_argument(ExerciseType, args.types, FACTORIES)
+        args.languages = distribution_argument(Language, args.languages, Language)
+        args.levels = distribution_argument(Level, args.levels, [None, *Level])
+    except ValueError as error:
+        parser.error(str(error))
+    if set(args.types.values) - set(FACTORIES):
+        parser.error('only the exercise types with a factory can be seeded.')
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import sys
+import tracemalloc
+from datetime import datetime
+from math import ceil
+from random import Random
+from time import perf_counter
+
+from vosk import Model
+
+from exako.apps.diagnostic.memory import PROC_DIR, process_memory
+from exako.apps.exercise.voice import recognizer as recognizer_module
+from exako.apps.exercise.voice.recognizer import language_model_map, recognizer_pool
+from exako.apps.exercise.voice.stream import StreamDecoder
+from exako.apps.exercise.voice.text import (
+    WORDS_PER_MINUTE,
+    text_diff,
+    text_distance,
+    text_speak_time,
+)
+from exako.apps.exercise.voice.transcriber import decode_audio
+from exako.benchmarks.audio import generate_wav
+from exako.core.constants import Language
+
+SEED = 42
+WORDS = [
+    'the', 'quick', 'brown', 'fox', 'jumps', 'over', 'lazy', 'dog', 'while',
+    'children', 'are', 'playing', 'outside', 'with', 'their', 'friends',
+]  # fmt: skip
+STREAM_CHUNK_SIZE = 4096
+
+
+class StubRecognizer:
+    # measures everything around the model when the models are not installed
+    def __init__(self, model, rate, grammar):
+        self.grammar = json.loads(grammar)
+
+    def AcceptWaveform(self, data):
+        return False
+
+    def FinalResult(self):
+        return json.dumps({'text': ' '.join(self.grammar)})
+
+    def Reset(self): ...
+
+
+def use_stub_recognizer():
+    recognizer_module.KaldiRecognizer = StubRecognizer
+    recognizer_pool.get_model = lambda language: None
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(ceil(q / 100 * len(ordered)) - 1, len(ordered) - 1)]
+
+
+def rss_bytes() -> int | None:
+    # smaps_rollup also counts the kaldi allocations tracemalloc does not see
+    if not PROC_DIR.exists():
+        return None
+    return process_memory(os.getpid())['rss']
+
+
+def measure(function, *args, repeat: int) -> dict:
+    function(*args)  # warm up recognizers and caches
+
+    latencies = list()
+    for _ in range(repeat):
+        start = perf_counter()
+        function(*args)
+        latencies.append(perf_counter() - start)
+
+    gc.collect()
+    rss_before = rss_bytes()
+    function(*args)
+    rss_after = rss_bytes()
+
+    gc.collect()
+    tracemalloc.start()
+    function(*args)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'iterations': repeat,
+        'mean_ms': sum(latencies) / repeat * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'python_peak_bytes': python_peak,
+        'rss_bytes': rss_after,
+        'rss_growth_bytes': None if rss_after is None else rss_after - rss_before,
+        'total_seconds': sum(latencies),
+    }
+
+
+def sentence(random: Random, size: int) -> str:
+    return ' '.join(random.choice(WORDS) for _ in range(size))
+
+
+def vocabulary_for(duration: float) -> list[str]:
+    # decode_audio rejects audio longer than the time to speak the vocabulary
+    size = ceil(duration * WORDS_PER_MINUTE / 60) + 1
+    return [WORDS[i % len(WORDS)] for i in range(size)]
+
+
+def decode_stream(audio: bytes, vocabulary: list[str], language: Language):
+    decoder = StreamDecoder(vocabulary, language)
+    try:
+        for start in range(0, len(audio), STREAM_CHUNK_SIZE):
+            decoder.feed(audio[start : start + STREAM_CHUNK_SIZE])
+        return decoder.finish()
+    finally:
+        decoder.close()
+
+
+def benchmark_model_load(language: Language) -> dict:
+    model_path = language_model_map[language]
+    start = perf_counter()
+    model = Model(model_path=str(model_path))
+    elapsed = perf_counter() - start
+    recognizer_pool.models[model_path] = model
+    return {'language': language.value, 'seconds': elapsed}
+
+
+def benchmark_decode(args) -> list[dict]:
+    results = list()
+    for duration in args.durations:
+        for rate in args.rates:
+            for channels in args.channels:
+                audio = generate_wav(rate=rate, channels=channels, tone=duration)
+                audio_seconds = duration + 1  # generate_wav pads both sides
+                vocabulary = vocabulary_for(audio_seconds)
+                for mode, function in (
+                    ('decode', decode_audio),
+                    ('stream', decode_stream),
+                ):
+                    result = measure(
+                        function,
+                        audio,
+                        vocabulary,
+                        args.language,
+                        repeat=args.repeat,
+                    )
+                    realtime_factor = (
+                        audio_seconds * args.repeat / result.pop('total_seconds')
+                    )
+                    results.append(
+                        {
+                            'name': f'{mode}-{duration:g}s-{rate}hz-{channels}ch',
+                            'mode': mode,
+                            'duration': audio_seconds,
+                            'rate': rate,
+                            'channels': channels,
+                            'audio_bytes': len(audio),
+                            'realtime_factor': realtime_factor,
+                            **result,
+                        }
+                    )
+    return results
+
+
+def benchmark_text(args) -> list[dict]:
+    random = Random(SEED)
+    results = list()
+    for size in args.words:
+        expected = sentence(random, size)
+        spoken = sentence(random, size)
+        for name, function, function_args in (
+            ('text_distance', text_distance, (expected, spoken)),
+            ('text_diff', text_diff, (expected, spoken)),
+            ('text_speak_time', text_speak_time, (expected,)),
+        ):
+            result = measure(function, *function_args, repeat=args.repeat)
+            result.pop('total_seconds')
+            results.append({'name': f'{name}-{size}w', 'words': size, **result})
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    baseline_results = {
+        result['name']: result
+        for result in baseline.get('decode', []) + baseline.get('text', [])
+    }
+    regressions = list()
+    for result in current['decode'] + current['text']:
+        previous = baseline_results.get(result['name'])
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f'{result["name"]} {metric}: '
+                    f'{previous[metric]:.3f} -> {result[metric]:.3f}'
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Speak grading benchmarks.')
+    parser.add_argument('--stub', action='store_true', help='skip the vosk models')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--language', type=Language, default=Language.ENGLISH_USA)
+    parser.add_argument('--durations', type=float, nargs='+', default=[1, 5, 15])
+    parser.add_argument('--rates', type=int, nargs='+', default=[8000, 16000, 44100])
+    parser.add_argument('--channels', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--words', type=int, nargs='+', default=[5, 20, 100])
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    parser.add_argument('--compare', type=argparse.FileType('r'))
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    model_load = None
+    if args.stub:
+        use_stub_recognizer()
+    else:
+        model_load = benchmark_model_load(args.language)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stub': args.stub,
+            'repeat': args.repeat,
+        },
+        'model_load': model_load,
+        'decode': benchmark_decode(args),
+        'text': benchmark_text(args),
+    }
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report['meta']['max_rss_bytes'] = (
+        max_rss if sys.platform == 'darwin' else max_rss * 1024
+    )
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+    if args.compare is not None:
+        regressions = compare(report, json.load(args.compare), args.threshold)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
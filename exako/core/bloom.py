@@ -0,0 +1,27 @@
+from hashlib import blake2b
+
+
+class BloomFilter:
+    def __init__(self, data: bytes | None = None, size: int = 8192, hashes: int = 7):
+        self.bits = bytearray(data) if data else bytearray(size // 8)
+        self.size = len(self.bits) * 8
+        self.hashes = hashes
+
+    def _positions(self, item: str):
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
@@ -25,6 +25,25 @@ class Level(Enum):
     MASTER = 'C2'
 
 
+class Difficulty(str, Enum):
+    EASY = 'easy'
+    MEDIUM = 'medium'
+    HARD = 'hard'
+
+
+class JobStatus(str, Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class EditOperation(str, Enum):
+    SUBSTITUTE = 'substitute'
+    INSERT = 'insert'
+    DELETE = 'delete'
+
+
 class Language(str, Enum):
     ARABIC = 'ar'
     CHINESE_SIMPLIFIED = 'zh-cn'
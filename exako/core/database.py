@@ -0,0 +1,200 @@
+import json
+import logging
+from collections.abc import Mapping
+from hashlib import sha256
+
+from beanie import Document
+from beanie.odm.utils.init import Initializer
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import IndexModel, ReadPreference, WriteConcern
+
+from exako.core.helper import camel_to_snake, register_documents
+from exako.core.metrics import MetricsCommandListener
+from exako.core.query_monitor import query_monitor
+from exako.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# options that define an index, the server reports others such as the version
+INDEX_OPTIONS = ('unique', 'sparse', 'partialFilterExpression', 'expireAfterSeconds')
+
+
+def get_read_preference(name: str):
+    return getattr(ReadPreference, camel_to_snake(name).upper())
+
+
+def client_options() -> dict:
+    options = {
+        'uuidRepresentation': 'standard',
+        'minPoolSize': settings.DATABASE_MIN_POOL_SIZE,
+        'maxPoolSize': settings.DATABASE_MAX_POOL_SIZE,
+        'readPreference': settings.DATABASE_READ_PREFERENCE,
+        'event_listeners': [MetricsCommandListener(), query_monitor],
+    }
+    if settings.DATABASE_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options['waitQueueTimeoutMS'] = settings.DATABASE_WAIT_QUEUE_TIMEOUT_MS
+    if settings.DATABASE_COMPRESSORS:
+        options['compressors'] = ','.join(settings.DATABASE_COMPRESSORS)
+    if settings.DATABASE_WRITE_CONCERN is not None:
+        options['w'] = settings.DATABASE_WRITE_CONCERN
+    return options
+
+
+def configure_collection(
+    document: type[Document],
+    read_preference: str | None = None,
+    write_concern: int | str | None = None,
+):
+    # must run after init_beanie, which sets the collection of the documents
+    options = dict()
+    if read_preference is not None:
+        options['read_preference'] = get_read_preference(read_preference)
+    if write_concern is not None:
+        options['write_concern'] = WriteConcern(w=write_concern)
+    if options:
+        document_settings = document.get_settings()
+        document_settings.motor_collection = (
+            document_settings.motor_collection.with_options(**options)
+        )
+
+
+def document_models() -> list[type[Document]]:
+    return [
+        *register_documents('exako.apps.exercise'),
+        *register_documents('exako.apps.computed'),
+        *register_documents('exako.apps.history'),
+    ]
+
+
+class MissingIndexError(RuntimeError): ...
+
+
+class DatabaseInitializer(Initializer):
+    # the only hook into beanie's initializer, it has no option to skip the
+    # index commands. the expected set is built by expected_indexes instead.
+    def __init__(self, *args, create_indexes: bool = True, **kwargs):
+        self.create_indexes = create_indexes
+        super().__init__(*args, **kwargs)
+
+    async def init_indexes(self, cls, allow_index_dropping: bool = False):
+        if self.create_indexes:
+            await super().init_indexes(cls, allow_index_dropping)
+
+
+def field_indexes(document: type[Document]) -> list[IndexModel]:
+    indexes = list()
+    for name, field in document.model_fields.items():
+        # Indexed() stores (direction, options) on the annotation metadata
+        indexed = next(
+            (item._indexed for item in field.metadata if hasattr(item, '_indexed')),
+            getattr(field.annotation, '_indexed', None),
+        )
+        if indexed is not None:
+            direction, options = indexed
+            indexes.append(IndexModel([(field.alias or name, direction)], **options))
+    return indexes
+
+
+def expected_indexes(documents: list[type[Document]]) -> dict[str, dict[str, str]]:
+    # must run after init_beanie, which sets the collection of the child
+    # documents. like beanie, the Settings indexes replace the Indexed ones
+    # declared on the same keys.
+    indexes = dict()
+    for document in documents:
+        declared = dict()
+        settings_class = getattr(document, 'Settings', None)
+        for index in [
+            *field_indexes(document),
+            *getattr(settings_class, 'indexes', []),
+        ]:
+            if not isinstance(index, IndexModel):
+                index = IndexModel(index)
+            declared[tuple(sorted(index.document['key'].items()))] = index
+        collection = indexes.setdefault(document.get_collection_name(), dict())
+        for index in declared.values():
+            collection[index.document['name']] = index_spec(index.document)
+    return indexes
+
+
+def index_spec(index: Mapping) -> str:
+    key = index['key']
+    if isinstance(key, Mapping):
+        key = key.items()
+    spec = {
+        # the server may report the directions as doubles
+        'key': [
+            [field, int(direction) if isinstance(direction, float) else direction]
+            for field, direction in key
+        ],
+        **{option: index[option] for option in INDEX_OPTIONS if option in index},
+    }
+    return json.dumps(spec, sort_keys=True, default=str)
+
+
+def index_hash(specs: dict[str, str]) -> str:
+    return sha256(json.dumps(sorted(specs.items())).encode()).hexdigest()
+
+
+async def current_indexes(collection: AsyncIOMotorCollection) -> dict[str, str]:
+    information = await collection.index_information()
+    return {
+        name: index_spec(index) for name, index in information.items() if name != '_id_'
+    }
+
+
+async def verify_indexes(
+    database: AsyncIOMotorDatabase,
+    indexes: dict[str, dict[str, str]],
+    require_unique: bool = False,
+) -> bool:
+    verified, missing_unique = True, list()
+    for name, expected in indexes.items():
+        current = await current_indexes(database[name])
+        if index_hash(current) == index_hash(expected):
+            continue
+
+        verified = False
+        missing = sorted(expected.keys() - current.keys())
+        logger.warning(
+            'index drift on %s: missing %s, changed %s, unexpected %s. '
+            'run `python -m exako.manage create-indexes` to apply them.',
+            name,
+            missing,
+            sorted(
+                index
+                for index in expected.keys() & current.keys()
+                if expected[index] != current[index]
+            ),
+            sorted(current.keys() - expected.keys()),
+        )
+        missing_unique += [
+            f'{name}.{index}'
+            for index in missing
+            if json.loads(expected[index]).get('unique')
+        ]
+    # the duplicate key handling relies on them, serving without is unsafe
+    if require_unique and missing_unique:
+        raise MissingIndexError(
+            f'unique indexes {", ".join(missing_unique)} are missing, '
+            'run `python -m exako.manage create-indexes` before starting.'
+        )
+    return verified
+
+
+async def init_database(
+    database: AsyncIOMotorDatabase,
+    create_indexes: bool,
+    allow_index_dropping: bool = False,
+):
+    # creating the indexes issues commands for every document class, so
+    # normal startups only compare the index set, a missing unique index fails.
+    await DatabaseInitializer(
+        database=database,
+        document_models=document_models(),
+        allow_index_dropping=allow_index_dropping,
+        create_indexes=create_indexes,
+    )
+    if not create_indexes:
+        await verify_indexes(
+            database, expected_indexes(document_models()), require_unique=True
+        )
@@ -0,0 +1,39 @@
+from typing import Annotated, Any
+from uuid import UUID
+
+from bson import Binary
+from pydantic import AfterValidator, BeforeValidator
+
+
+def binary_to_uuid(value: Any) -> Any:
+    if isinstance(value, Binary):
+        return value.as_uuid()
+    return value
+
+
+BinaryUUID = Annotated[UUID, BeforeValidator(binary_to_uuid)]
+
+
+class ChoiceMap(dict):
+    # bson keys must be strings, so choices are stored as an array of
+    # {id: BinData(4), text} instead of a document keyed by the uuid string.
+    def to_bson(self) -> list[dict]:
+        return [
+            {'id': Binary.from_uuid(choice_id), 'text': text}
+            for choice_id, text in self.items()
+        ]
+
+
+def parse_choices(value: Any) -> Any:
+    if isinstance(value, list):
+        return {binary_to_uuid(choice['id']): choice['text'] for choice in value}
+    return value
+
+
+ChoiceMapField = Annotated[
+    dict[UUID, str],
+    BeforeValidator(parse_choices),
+    AfterValidator(ChoiceMap),
+]
+
+CHOICE_MAP_ENCODERS = {ChoiceMap: ChoiceMap.to_bson}
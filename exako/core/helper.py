@@ -1,8 +1,8 @@
 import importlib
 import inspect
 import re
+from itertools import count
 from random import sample, shuffle
-from string import punctuation
 from uuid import UUID
 
 from beanie import Document
@@ -10,8 +10,14 @@ from fastapi_pagination import Params
 from fief_client import FiefAccessTokenInfo
 from httpx import AsyncClient
 
+from exako.core.metrics import http_client_duration
+from exako.core.tracing import span, tracer
 from exako.settings import settings
 
+CARD_PAGE_SIZE = 100
+# terms of the cardsets a listing is planned over, the rest are left out
+MAX_CARDSET_TERMS = 1000
+
 
 def shuffle_dict(dict_):
     dict_ = list(dict_.items())
@@ -29,20 +35,14 @@ def camel_to_snake(name):
     return pattern.sub('_', name).lower()
 
 
-def normalize_text(text):
-    return text.lower().translate(str.maketrans('', '', punctuation)).strip()
-
-
-def normalize_array_text(array):
-    return [normalize_text(item) for item in array]
-
-
 def register_documents(app_path: str, module_name: str = 'models'):
     module = importlib.import_module(f'{app_path}.{module_name}')
     return [
         cls
         for _, cls in inspect.getmembers(module, inspect.isclass)
-        if issubclass(cls, Document) and cls != Document
+        if issubclass(cls, Document)
+        and cls != Document
+        and cls.__module__ == module.__name__
     ]
 
 
@@ -54,10 +54,30 @@ async def fetch_card_terms(
     result = list()
     cardset_param = ''.join([f'&cardset_id={cardset}' for cardset in cardsets])
     async with AsyncClient() as client:
-        response = await client.get(
-            settings.API_DOMAIN
-            + f'/cardset/cards?page={params.page}&size={params.size}{cardset_param}',
-            headers={'Authorization': f'Bearer {user_info["access_token"]}'},
-        )
+        with (
+            http_client_duration.labels('fetch_card_terms').time(),
+            span('http.fetch_card_terms', kind='client', cardsets=len(cardsets)),
+        ):
+            response = await client.get(
+                settings.API_DOMAIN
+                + f'/cardset/cards?page={params.page}&size={params.size}{cardset_param}',
+                headers={
+                    'Authorization': f'Bearer {user_info["access_token"]}',
+                    **tracer.propagation_headers(),
+                },
+            )
         result.extend([item['id'] for item in response.json()['items']])
     return result
+
+
+async def fetch_cardset_terms(
+    user_info: FiefAccessTokenInfo, cardsets: list[int]
+) -> list[UUID]:
+    result = list()
+    for page in count(1):
+        items = await fetch_card_terms(
+            user_info, cardsets, Params(page=page, size=CARD_PAGE_SIZE)
+        )
+        result.extend(items)
+        if len(items) < CARD_PAGE_SIZE or len(result) >= MAX_CARDSET_TERMS:
+            return result[:MAX_CARDSET_TERMS]
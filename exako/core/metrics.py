@@ -0,0 +1,190 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+from pymongo import monitoring
+
+# upper bounds in seconds, from a cached read to a long transcription
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)  # fmt: skip
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: 'Histogram'):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(perf_counter() - self.start)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'lock')
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        # mongo commands and decodes are observed from the threadpool
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> Timer:
+        return Timer(self)
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self.lock:
+            return list(self.counts), self.sum
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+class HistogramFamily:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labels_names = labels
+        self.buckets = buckets
+        self.children: dict[tuple[str, ...], Histogram] = dict()
+
+    def labels(self, *values: str) -> Histogram:
+        histogram = self.children.get(values)
+        if histogram is None:
+            histogram = self.children.setdefault(values, Histogram(self.buckets))
+        return histogram
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        bounds = [f'{bound:g}' for bound in self.buckets] + ['+Inf']
+        for values, histogram in sorted(self.children.items()):
+            labels = ','.join(
+                f'{name}="{escape(value)}"'
+                for name, value in zip(self.labels_names, values)
+            )
+            prefix = f'{labels},' if labels else ''
+            suffix = f'{{{labels}}}' if labels else ''
+            counts, total = histogram.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{suffix} {total!r}')
+            lines.append(f'{self.name}_count{suffix} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families: dict[str, HistogramFamily] = dict()
+
+    def histogram(
+        self, name: str, description: str, labels: tuple[str, ...] = ()
+    ) -> HistogramFamily:
+        family = HistogramFamily(name, description, labels)
+        self.families[name] = family
+        return family
+
+    def render(self) -> str:
+        lines = list()
+        for family in self.families.values():
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    'exako_http_request_duration_seconds',
+    'Time to answer a request, by route operation id.',
+    ('route', 'method', 'status'),
+)
+mongo_command_duration = registry.histogram(
+    'exako_mongo_command_duration_seconds',
+    'Time of the mongo commands as reported by the driver.',
+    ('command', 'status'),
+)
+http_client_duration = registry.histogram(
+    'exako_http_client_duration_seconds',
+    'Time of the requests made to other services.',
+    ('operation',),
+)
+operation_duration = registry.histogram(
+    'exako_operation_duration_seconds',
+    'Time of the internal operations of a request.',
+    ('operation',),
+)
+speech_decode_duration = registry.histogram(
+    'exako_speech_decode_duration_seconds',
+    'Time to transcribe an audio, by where it was decoded.',
+    ('mode',),
+)
+
+
+def route_name(route) -> str:
+    if route is None:
+        return 'unmatched'  # keeps 404 scans out of the label values
+    return getattr(route, 'operation_id', None) or route.name
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router stores the matched route in the shared scope
+            request_duration.labels(
+                route_name(scope.get('route')), scope['method'], str(status_code)
+            ).observe(perf_counter() - start)
+
+
+class MetricsCommandListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_duration.labels(event.command_name, 'succeeded').observe(
+            event.duration_micros / 1_000_000
+        )
+
+    def failed(self, event):
+        mongo_command_duration.labels(event.command_name, 'failed').observe(
+            event.duration_micros / 1_000_000
+        )
@@ -0,0 +1,69 @@
+from uuid import UUID
+
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, UpdateOne
+
+from exako.core.fields import ChoiceMap
+
+MIGRATION_BATCH_SIZE = 1000
+
+CHOICE_MAP_FIELDS = ('distractors', 'connections')
+UUID_FIELDS = ('term_id', 'term_example_id', 'term_definition_id')
+
+
+def choice_map_query() -> dict:
+    # choice maps still stored as documents and uuids stored as strings
+    return {
+        '$or': [
+            *(
+                {'$expr': {'$eq': [{'$type': f'${field}'}, 'object']}}
+                for field in CHOICE_MAP_FIELDS
+            ),
+            *({field: {'$type': 'string'}} for field in UUID_FIELDS),
+        ]
+    }
+
+
+def migrate_document(document: dict) -> dict:
+    update = dict()
+    for field in CHOICE_MAP_FIELDS:
+        value = document.get(field)
+        if isinstance(value, dict):
+            choices = ChoiceMap({UUID(key): text for key, text in value.items()})
+            update[field] = choices.to_bson()
+    for field in UUID_FIELDS:
+        value = document.get(field)
+        if isinstance(value, str):
+            update[field] = Binary.from_uuid(UUID(value))
+    return update
+
+
+async def migrate_choice_maps(
+    collection: AsyncIOMotorCollection,
+    batch_size: int = MIGRATION_BATCH_SIZE,
+) -> int:
+    projection = dict.fromkeys(CHOICE_MAP_FIELDS + UUID_FIELDS, 1)
+    migrated, last_id = 0, None
+    while True:
+        query = choice_map_query()
+        if last_id is not None:
+            query = {'$and': [query, {'_id': {'$gt': last_id}}]}
+        documents = await (
+            collection.find(query, projection)
+            .sort('_id', ASCENDING)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not documents:
+            return migrated
+
+        requests = [
+            UpdateOne({'_id': document['_id']}, {'$set': update})
+            for document in documents
+            if (update := migrate_document(document))
+        ]
+        if requests:
+            await collection.bulk_write(requests, ordered=False)
+        migrated += len(requests)
+        last_id = documents[-1]['_id']
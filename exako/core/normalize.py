@@ -0,0 +1,58 @@
+import unicodedata
+from functools import lru_cache
+from string import punctuation
+from typing import Iterable
+
+from exako.core.constants import Language
+
+NORMALIZE_CACHE_SIZE = 8192
+
+# languages where learners are not expected to type diacritics (cafe, naive)
+ACCENT_INSENSITIVE_LANGUAGES = frozenset({Language.ENGLISH_USA, Language.ENGLISH_UK})
+
+# applied before casefold, which only knows the default unicode mapping
+CASE_TABLES = {
+    Language.TURKISH: str.maketrans({'I': 'ı', 'İ': 'i'}),
+}
+
+
+class CategoryTable(dict):
+    # str.translate table removing every code point of the given unicode
+    # categories, filled as characters show up instead of for the whole range.
+    def __init__(self, categories: tuple[str, ...]):
+        super().__init__()
+        self.categories = categories
+        for codepoint in range(128):
+            self[codepoint]
+        for char in punctuation:
+            self[ord(char)] = None
+
+    def __missing__(self, codepoint: int) -> int | None:
+        category = unicodedata.category(chr(codepoint))
+        value = None if category.startswith(self.categories) else codepoint
+        self[codepoint] = value
+        return value
+
+
+PUNCTUATION_TABLE = CategoryTable(('P',))
+PUNCTUATION_ACCENT_TABLE = CategoryTable(('P', 'Mn'))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text: str, language: Language | None = None) -> str:
+    case_table = CASE_TABLES.get(language)
+    if case_table is not None:
+        text = text.translate(case_table)
+    text = text.casefold()
+
+    if language in ACCENT_INSENSITIVE_LANGUAGES:
+        text = unicodedata.normalize('NFD', text)
+        return text.translate(PUNCTUATION_ACCENT_TABLE).strip()
+    text = unicodedata.normalize('NFC', text)
+    return text.translate(PUNCTUATION_TABLE).strip()
+
+
+def normalize_texts(
+    texts: Iterable[str], language: Language | None = None
+) -> list[str]:
+    return [normalize_text(text, language) for text in texts]
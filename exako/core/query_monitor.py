@@ -0,0 +1,244 @@
+import asyncio
+import json
+import logging
+import threading
+from collections.abc import Mapping
+from time import monotonic
+
+from bson import json_util
+from pymongo import monitoring
+
+from exako.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# added by the driver or specific to one execution, not part of the query
+IGNORED_FIELDS = frozenset({
+    'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber',
+    'autocommit', 'startTransaction', 'readConcern', 'writeConcern',
+    'cursor', 'batchSize', 'ordered', 'maxTimeMS', 'comment', 'apiVersion',
+})  # fmt: skip
+# batched statements, the shape of the first one stands for the batch
+PAYLOAD_FIELDS = frozenset({'documents', 'updates', 'deletes'})
+EXPLAINABLE_COMMANDS = frozenset({
+    'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify',
+})  # fmt: skip
+EXPLAIN_IGNORED_FIELDS = frozenset({
+    'ok', 'operationTime', '$clusterTime', 'command', 'serverInfo',
+    'serverParameters',
+})  # fmt: skip
+# commands whose reply never arrives are dropped oldest first past this size
+MAX_PENDING = 10_000
+
+
+def shape_value(value, mapping=dict, sequence=list):
+    if isinstance(value, Mapping):
+        return mapping(
+            (key, shape_value(item, mapping, sequence)) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        # lists of literals such as $in collapse, pipelines and $and keep items
+        shapes = sequence(
+            shape_value(item, mapping, sequence)
+            for item in value
+            if isinstance(item, (Mapping, list, tuple))
+        )
+        return shapes or '?'
+    return '?'
+
+
+def query_shape(command_name: str, command: Mapping, mapping=dict, sequence=list):
+    target = command.get(command_name)
+    shape = [(command_name, target if isinstance(target, str) else '?')]
+    for key, value in command.items():
+        if key == command_name or key in IGNORED_FIELDS:
+            continue
+        if key in PAYLOAD_FIELDS:
+            value = value[:1]
+        # getMore names the collection apart from the command
+        if key != 'collection':
+            value = shape_value(value, mapping, sequence)
+        shape.append((key, value))
+    return mapping(shape)
+
+
+def query_key(command_name: str, command: Mapping) -> tuple:
+    # the shape as nested tuples, hashable without serializing it. it starts
+    # with the command name and collection, the dict shape is only built for
+    # shapes not seen yet.
+    return query_shape(command_name, command, mapping=tuple, sequence=tuple)
+
+
+def explain_command(command: Mapping) -> dict:
+    explained = dict()
+    for key, value in command.items():
+        if key in IGNORED_FIELDS:
+            continue
+        if key in PAYLOAD_FIELDS:
+            value = value[:1]  # explain accepts a single statement
+        explained[key] = value
+    return {'explain': explained, 'verbosity': 'queryPlanner'}
+
+
+class QueryStats:
+    __slots__ = (
+        'shape',
+        'database',
+        'count',
+        'total_ms',
+        'max_ms',
+        'slow_count',
+        'explain',
+        'explained_at',
+        'score',
+        'scored_at',
+    )
+
+    def __init__(self, shape: dict, database: str):
+        self.shape = shape
+        self.database = database
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_count = 0
+        self.explain: dict | None = None
+        self.explained_at: float | None = None
+        # total time with a decay, a shape busy long ago becomes evictable
+        self.score = 0.0
+        self.scored_at = monotonic()
+
+    def decayed(self, now: float) -> float:
+        elapsed = now - self.scored_at
+        return self.score * 0.5 ** (elapsed / settings.QUERY_MONITOR_HALF_LIFE)
+
+    def add(self, duration_ms: float, now: float):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.score = self.decayed(now) + duration_ms
+        self.scored_at = now
+
+    def as_dict(self) -> dict:
+        return {
+            'shape': self.shape,
+            'database': self.database,
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'mean_ms': self.total_ms / self.count,
+            'max_ms': self.max_ms,
+            'slow_count': self.slow_count,
+            'explain': self.explain,
+        }
+
+
+class QueryMonitor(monitoring.CommandListener):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.shapes: dict[tuple, QueryStats] = dict()
+        # commands waiting for their reply, only the started event has them
+        self.pending: dict[tuple, Mapping] = dict()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.client = None
+        self.tasks: set[asyncio.Task] = set()
+
+    def start(self, client):
+        # explains are sent from the loop, the events come from driver threads
+        self.loop = asyncio.get_running_loop()
+        self.client = client
+
+    def stop(self):
+        self.loop = None
+        self.client = None
+
+    def started(self, event):
+        if event.command_name == 'explain' or not event.command:
+            return  # our own explains and redacted commands
+        # the shape is computed once the reply arrives, off the send path
+        with self.lock:
+            if len(self.pending) >= MAX_PENDING:
+                del self.pending[next(iter(self.pending))]
+            self.pending[event.connection_id, event.request_id] = event.command
+
+    def succeeded(self, event):
+        self.finish(event)
+
+    def failed(self, event):
+        self.finish(event)
+
+    def finish(self, event):
+        duration_ms = event.duration_micros / 1000
+        slow = duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS
+        now = monotonic()
+
+        with self.lock:
+            command = self.pending.pop((event.connection_id, event.request_id), None)
+        if command is None:
+            return
+        key = query_key(event.command_name, command)
+
+        with self.lock:
+            stats = self.shapes.get(key)
+            if stats is None:
+                if len(self.shapes) >= settings.QUERY_MONITOR_MAX_SHAPES:
+                    cheapest = min(
+                        self.shapes, key=lambda name: self.shapes[name].decayed(now)
+                    )
+                    del self.shapes[cheapest]
+                shape = query_shape(event.command_name, command)
+                stats = self.shapes[key] = QueryStats(shape, event.database_name)
+            stats.add(duration_ms, now)
+            if not slow:
+                return
+            stats.slow_count += 1
+            should_explain = event.command_name in EXPLAINABLE_COMMANDS and (
+                stats.explained_at is None
+                or now - stats.explained_at >= settings.SLOW_QUERY_EXPLAIN_INTERVAL
+            )
+            if should_explain:
+                stats.explained_at = now
+
+        logger.warning(
+            'slow %s on %s took %.1fms: %s',
+            event.command_name,
+            event.database_name,
+            duration_ms,
+            json.dumps(stats.shape, default=str),
+        )
+        loop = self.loop
+        if should_explain and loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(
+                self.schedule_explain, stats, event.database_name, command
+            )
+
+    def schedule_explain(self, stats: QueryStats, database: str, command: Mapping):
+        task = asyncio.create_task(self.explain(stats, database, command))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def explain(self, stats: QueryStats, database: str, command: Mapping):
+        if self.client is None:
+            return
+        try:
+            result = await self.client[database].command(explain_command(command))
+        except Exception:
+            logger.exception('could not explain the slow query %s.', stats.shape)
+            return
+        stats.explain = json.loads(
+            json_util.dumps(
+                {
+                    key: value
+                    for key, value in result.items()
+                    if key not in EXPLAIN_IGNORED_FIELDS
+                }
+            )
+        )
+
+    def top(self, limit: int) -> list[dict]:
+        with self.lock:
+            shapes = sorted(
+                self.shapes.values(), key=lambda stats: stats.total_ms, reverse=True
+            )
+            return [stats.as_dict() for stats in shapes[:limit]]
+
+
+query_monitor = QueryMonitor()
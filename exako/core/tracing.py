@@ -0,0 +1,338 @@
+import asyncio
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from random import getrandbits
+
+from httpx import AsyncClient
+
+from exako.core.metrics import route_name
+from exako.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = 'traceparent'
+TRACEPARENT_HEADER_KEY = TRACEPARENT_HEADER.encode()
+# spans kept while the exporter is slow or not running, the rest are dropped
+MAX_PENDING_SPANS = 10_000
+OTLP_SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+OTLP_STATUS_ERROR = 2
+
+
+class Span:
+    __slots__ = (
+        'name',
+        'kind',
+        'trace_id',
+        'span_id',
+        'parent_id',
+        'start_ns',
+        'end_ns',
+        'attributes',
+        'error',
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: str = 'internal',
+        trace_id: str | None = None,
+        parent_id: str | None = None,
+        attributes: dict | None = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id or f'{getrandbits(128):032x}'
+        self.span_id = f'{getrandbits(64):016x}'
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes or dict()
+        self.error: str | None = None
+
+    @property
+    def traceparent(self) -> str:
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def as_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start': datetime.fromtimestamp(
+                self.start_ns / 1e9, timezone.utc
+            ).isoformat(),
+            'duration_ms': (self.end_ns - self.start_ns) / 1e6,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+current_span: ContextVar[Span | None] = ContextVar('current_span', default=None)
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+    # w3c trace context: version-trace_id-parent_id-flags
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+class JSONExporter:
+    def __init__(self, stream=None, path: Path | None = None):
+        self.stream = stream or sys.stdout
+        self.path = path
+        self.file = None
+        # a cancelled export keeps writing in its thread
+        self.lock = threading.Lock()
+
+    def open(self):
+        # opened by each worker, a handle from before the fork would be shared
+        if self.path is not None:
+            self.stream = self.file = self.path.open('a')
+
+    def write(self, spans: list[Span]):
+        with self.lock:
+            for span in spans:
+                self.stream.write(json.dumps(span.as_dict(), default=str) + '\n')
+            self.stream.flush()
+
+    async def export(self, spans: list[Span]):
+        await asyncio.to_thread(self.write, spans)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    async def aclose(self):
+        await asyncio.to_thread(self.close)
+
+
+def otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_span(span: Span) -> dict:
+    encoded = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': OTLP_SPAN_KINDS[span.kind],
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': [
+            {'key': key, 'value': otlp_value(value)}
+            for key, value in span.attributes.items()
+        ],
+    }
+    if span.parent_id is not None:
+        encoded['parentSpanId'] = span.parent_id
+    if span.error is not None:
+        encoded['status'] = {'code': OTLP_STATUS_ERROR, 'message': span.error}
+    return encoded
+
+
+class OTLPExporter:
+    # otlp over http with the json encoding, avoids the opentelemetry sdk
+    def __init__(self, endpoint: str, service_name: str):
+        self.endpoint = endpoint
+        self.resource = {
+            'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': service_name}}
+            ]
+        }
+        self.client: AsyncClient | None = None
+
+    def open(self):
+        self.client = AsyncClient(timeout=10)
+
+    def payload(self, spans: list[Span]) -> dict:
+        return {
+            'resourceSpans': [
+                {
+                    'resource': self.resource,
+                    'scopeSpans': [
+                        {
+                            'scope': {'name': 'exako'},
+                            'spans': [otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    async def export(self, spans: list[Span]):
+        response = await self.client.post(self.endpoint, json=self.payload(spans))
+        response.raise_for_status()
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+class Tracer:
+    def __init__(self):
+        self.exporter: JSONExporter | OTLPExporter | None = None
+        self.pending: list[Span] = list()
+        # spans also end in the threadpool, where the decodes run
+        self.lock = threading.Lock()
+        self.task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, exporter: JSONExporter | OTLPExporter | None):
+        self.exporter = exporter
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = 'internal',
+        traceparent: str | None = None,
+        **attributes,
+    ):
+        if self.exporter is None:
+            yield None
+            return
+
+        parent = current_span.get()
+        remote = parse_traceparent(traceparent) if parent is None else None
+        if parent is not None:
+            span = Span(name, kind, parent.trace_id, parent.span_id, attributes)
+        elif remote is not None:
+            span = Span(name, kind, *remote, attributes)
+        else:
+            span = Span(name, kind, attributes=attributes)
+
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.error = repr(error)
+            raise
+        finally:
+            current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.finish(span)
+
+    def finish(self, span: Span):
+        with self.lock:
+            if len(self.pending) < MAX_PENDING_SPANS:
+                self.pending.append(span)
+
+    def propagation_headers(self) -> dict[str, str]:
+        span = current_span.get()
+        if span is None:
+            return dict()
+        return {TRACEPARENT_HEADER: span.traceparent}
+
+    async def flush(self):
+        with self.lock:
+            spans, self.pending = self.pending, list()
+        if spans and self.exporter is not None:
+            try:
+                await self.exporter.export(spans)
+            except Exception:
+                logger.exception('could not export %s spans.', len(spans))
+
+    async def _export_loop(self):
+        while True:
+            await asyncio.sleep(settings.TRACING_EXPORT_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        if self.exporter is not None:
+            self.exporter.open()
+            self.task = asyncio.create_task(self._export_loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+        await self.flush()
+        if self.exporter is not None:
+            await self.exporter.aclose()
+
+
+def get_exporter() -> JSONExporter | OTLPExporter | None:
+    if settings.TRACING_EXPORTER == 'json':
+        return JSONExporter(path=settings.TRACING_FILE)
+    if settings.TRACING_EXPORTER == 'otlp':
+        return OTLPExporter(
+            settings.TRACING_OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME
+        )
+    return None
+
+
+tracer = Tracer()
+tracer.configure(get_exporter())
+span = tracer.span
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not tracer.enabled:
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        traceparent = None
+        for key, value in scope['headers']:
+            if key == TRACEPARENT_HEADER_KEY:
+                traceparent = value.decode('latin-1')
+
+        with span(
+            'http.request',
+            kind='server',
+            traceparent=traceparent,
+            method=scope['method'],
+            path=scope['path'],
+        ) as request_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = route_name(scope.get('route'))
+                request_span.name = f'{scope["method"]} {route}'
+                request_span.attributes['route'] = route
+                request_span.attributes['status'] = status_code
+                if status_code >= 500 and request_span.error is None:
+                    request_span.error = f'status {status_code}'
@@ -1,6 +1,5 @@
 from contextlib import asynccontextmanager
 
-from beanie import init_beanie
 from fastapi import FastAPI
 from fastapi.encoders import jsonable_encoder
 from fastapi_pagination import add_pagination
@@ -9,27 +8,55 @@ from pydantic import ValidationError
 from starlette.responses import JSONResponse
 
 from exako.apps.computed.router import computed_router
+from exako.apps.diagnostic.profiler import ProfilerMiddleware
+from exako.apps.diagnostic.router import diagnostic_router
+from exako.apps.exercise.builder import speak_job_queue
+from exako.apps.exercise.models import Exercise
 from exako.apps.exercise.router import exercise_router
+from exako.apps.exercise.statistic import exercise_statistic
+from exako.apps.history.models import (
+    ExerciseHistory,
+    ExerciseReview,
+    ExerciseSeenFilter,
+)
 from exako.apps.history.router import history_router
-from exako.core.helper import register_documents
+from exako.core.database import (
+    client_options,
+    configure_collection,
+    init_database,
+)
+from exako.core.metrics import MetricsMiddleware
+from exako.core.query_monitor import query_monitor
+from exako.core.tracing import TracingMiddleware, tracer
 from exako.settings import settings
 
-database_client = AsyncIOMotorClient(settings.DATABASE)
+database_client = AsyncIOMotorClient(settings.DATABASE, **client_options())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_beanie(
-        database=database_client[settings.DATABASE_NAME],
-        document_models=[
-            *register_documents('exako.apps.exercise'),
-            *register_documents('exako.apps.computed'),
-        ],
+    await init_database(
+        database_client[settings.DATABASE_NAME],
+        create_indexes=settings.DATABASE_CREATE_INDEXES,
     )
+    configure_collection(Exercise, read_preference=settings.EXERCISE_READ_PREFERENCE)
+    for document in (ExerciseHistory, ExerciseSeenFilter, ExerciseReview):
+        configure_collection(document, write_concern=settings.HISTORY_WRITE_CONCERN)
+    query_monitor.start(database_client)
+    tracer.start()
+    await speak_job_queue.start()
+    exercise_statistic.start()
     yield
+    await speak_job_queue.stop()
+    await exercise_statistic.stop()
+    query_monitor.stop()
+    await tracer.stop()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(TracingMiddleware)
 
 add_pagination(app)
 
@@ -40,6 +67,7 @@ app.include_router(
 app.include_router(
     history_router, prefix='/exercise/history', tags=['exercise history']
 )
+app.include_router(diagnostic_router, prefix='/diagnostic', tags=['diagnostic'])
 
 
 @app.exception_handler(ValidationError)
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import sys
+
+from exako.apps.computed.models import ExerciseComputed
+from exako.apps.exercise.models import Exercise
+from exako.core.database import (
+    DatabaseInitializer,
+    document_models,
+    expected_indexes,
+    init_database,
+    verify_indexes,
+)
+from exako.core.migrations import MIGRATION_BATCH_SIZE, migrate_choice_maps
+from exako.main import database_client
+from exako.settings import settings
+
+
+async def create_indexes(args):
+    database = database_client[settings.DATABASE_NAME]
+    await init_database(database, create_indexes=True, allow_index_dropping=args.drop)
+    print('indexes created.')
+
+
+async def check_indexes(args):
+    database = database_client[settings.DATABASE_NAME]
+    await DatabaseInitializer(
+        database=database, document_models=document_models(), create_indexes=False
+    )
+    if not await verify_indexes(database, expected_indexes(document_models())):
+        sys.exit(1)
+    print('indexes are up to date.')
+
+
+async def migrate_choices(args):
+    database = database_client[settings.DATABASE_NAME]
+    for name in (Exercise.Settings.name, ExerciseComputed.Settings.name):
+        migrated = await migrate_choice_maps(database[name], args.batch_size)
+        print(f'{name}: {migrated} documents migrated.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exako management commands.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    indexes_parser = commands.add_parser(
+        'create-indexes', help='create the indexes declared by the documents.'
+    )
+    indexes_parser.add_argument(
+        '--drop', action='store_true', help='drop indexes no longer declared.'
+    )
+    indexes_parser.set_defaults(handler=create_indexes)
+
+    check_parser = commands.add_parser(
+        'check-indexes', help='exit with an error when the indexes drifted.'
+    )
+    check_parser.set_defaults(handler=check_indexes)
+
+    migrate_parser = commands.add_parser(
+        'migrate-choices',
+        help='store choice maps as {id, text} arrays and uuids as binary.',
+    )
+    migrate_parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE)
+    migrate_parser.set_defaults(handler=migrate_choices)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+# pid of the launcher, exported before the workers are forked so they can
+# find their siblings. a module global would stay unset in the copy of this
+# module imported by the app, `python -m` runs the launcher as __main__.
+PARENT_PID_ENV = 'EXAKO_PREFORK_PARENT_PID'
+
+RESPAWN_DELAY = 1
+
+
+def get_parent_pid() -> int | None:
+    value = os.environ.get(PARENT_PID_ENV)
+    return int(value) if value else None
+
+
+def load_app():
+    # everything imported or loaded here is shared copy-on-write by the workers
+    from exako.apps.exercise.voice.recognizer import recognizer_pool
+    from exako.main import app
+
+    recognizer_pool.preload()
+    # objects tracked by the gc are moved to a permanent generation, so the
+    # collections in the workers do not touch (and copy) the parent pages.
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+class PreforkServer:
+    def __init__(self, app, host: str, port: int, workers: int):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.children: set[int] = set()
+        self.should_exit = False
+        self.sock: socket.socket | None = None
+
+    def bind(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return
+
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        status = 0
+        try:
+            config = uvicorn.Config(self.app, lifespan='on')
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            status = 1
+        finally:
+            os._exit(status)
+
+    def shutdown(self, signum, frame):
+        self.should_exit = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        os.environ[PARENT_PID_ENV] = str(os.getpid())
+
+        self.bind()
+        signal.signal(signal.SIGINT, self.shutdown)
+        signal.signal(signal.SIGTERM, self.shutdown)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            pid, _ = os.wait()
+            self.children.discard(pid)
+            if self.should_exit:
+                continue
+            # a worker crashing at startup would otherwise be respawned in a loop
+            time.sleep(RESPAWN_DELAY)
+            if not self.should_exit:
+                self.spawn()
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exako pre-fork server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    PreforkServer(load_app(), args.host, args.port, args.workers).run()
+
+
+if __name__ == '__main__':
+    main()
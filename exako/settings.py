@@ -1,13 +1,46 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import MongoDsn
 from pydantic_settings import BaseSettings
 
+ReadPreferenceName = Literal[
+    'primary',
+    'primaryPreferred',
+    'secondary',
+    'secondaryPreferred',
+    'nearest',
+]
+
 
 class Settings(BaseSettings):
     DATABASE_HOST: str
     DATABASE_PORT: int
     DATABASE_NAME: str
+    DATABASE_MIN_POOL_SIZE: int = 0
+    DATABASE_MAX_POOL_SIZE: int = 100
+    DATABASE_WAIT_QUEUE_TIMEOUT_MS: int | None = None
+    DATABASE_COMPRESSORS: list[Literal['zstd', 'snappy', 'zlib']] = ['zstd']
+    DATABASE_READ_PREFERENCE: ReadPreferenceName = 'primary'
+    DATABASE_WRITE_CONCERN: int | str | None = None
+    EXERCISE_READ_PREFERENCE: ReadPreferenceName | None = None
+    HISTORY_WRITE_CONCERN: int | str | None = 1
+    # indexes are applied by `python -m exako.manage create-indexes`, the
+    # startup fails without the unique ones (see the deploy notes in README.md)
+    DATABASE_CREATE_INDEXES: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100
+    # an explain per query shape at most once in this many seconds
+    SLOW_QUERY_EXPLAIN_INTERVAL: float = 300
+    QUERY_MONITOR_MAX_SHAPES: int = 500
+    # seconds for the time of a shape to halve when choosing one to evict
+    QUERY_MONITOR_HALF_LIFE: float = 600
+
+    TRACING_EXPORTER: Literal['json', 'otlp'] | None = None
+    # json spans are appended to this file, or written to stdout
+    TRACING_FILE: Path | None = None
+    TRACING_OTLP_ENDPOINT: str = 'http://localhost:4318/v1/traces'
+    TRACING_SERVICE_NAME: str = 'exako'
+    TRACING_EXPORT_INTERVAL: float = 5
 
     FIEF_CLIENT_ID: str
     FIEF_CLIENT_SCRET: str
@@ -15,6 +48,16 @@ class Settings(BaseSettings):
 
     API_DOMAIN: str
 
+    TRANSCRIPTION_CACHE_ENTRIES: int = 4096
+    TRANSCRIPTION_CACHE_BYTES: int = 4 * 1024 * 1024
+    TRANSCRIPTION_CACHE_DIR: Path | None = None
+    TRANSCRIPTION_CACHE_DISK_ENTRIES: int = 100_000
+    TRANSCRIPTION_CACHE_DISK_BYTES: int = 256 * 1024 * 1024
+
+    RECOGNIZER_POOL_SIZE: int = 64
+    SPEAK_JOB_WORKERS: int = 4
+    SPEECH_WORKER_SOCKET: Path | None = None
+
     @property
     def DATABASE(self):
         return str(
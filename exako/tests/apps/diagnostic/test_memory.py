@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+from exako import prefork
+from exako.apps.diagnostic import memory
+
+SMAPS_ROLLUP = """00400000-7ffc0000 ---p 00000000 00:00 0    [rollup]
+Rss:               10240 kB
+Pss:                4096 kB
+Shared_Clean:       6144 kB
+Shared_Dirty:          0 kB
+Private_Clean:      1024 kB
+Private_Dirty:      3072 kB
+Swap:                  0 kB
+"""
+
+
+def test_parse_smaps():
+    assert memory.parse_smaps(SMAPS_ROLLUP) == {
+        'rss': 10240 * 1024,
+        'pss': 4096 * 1024,
+        'shared': 6144 * 1024,
+        'uss': 4096 * 1024,
+    }
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='reads /proc')
+def test_process_memory():
+    usage = memory.process_memory(os.getpid())
+    assert usage['rss'] > 0
+    assert usage['uss'] <= usage['rss']
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='reads /proc')
+def test_server_processes_without_prefork(monkeypatch):
+    monkeypatch.delenv(prefork.PARENT_PID_ENV, raising=False)
+    assert memory.server_processes() == [(os.getpid(), 'worker')]
+
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='reads /proc')
+def test_server_processes_with_prefork(monkeypatch):
+    monkeypatch.setenv(prefork.PARENT_PID_ENV, str(os.getppid()))
+    processes = memory.server_processes()
+    assert processes[0] == (os.getppid(), 'master')
+    assert (os.getpid(), 'worker') in processes
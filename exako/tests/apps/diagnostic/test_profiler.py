@@ -0,0 +1,122 @@
+import asyncio
+import marshal
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from exako.apps.diagnostic import profiler
+
+pytestmark = pytest.mark.asyncio
+
+ADMIN_HEADERS = {'Authorization': 'Bearer admin', 'X-Profile': '1'}
+
+
+def profiled_function():
+    return sum(range(1000))
+
+
+@pytest.fixture
+def middleware(monkeypatch):
+    monkeypatch.setattr(profiler, 'profile_store', profiler.ProfileStore(size=2))
+    monkeypatch.setattr(
+        profiler,
+        'is_admin_token',
+        AsyncMock(side_effect=lambda token: token == 'admin'),
+    )
+
+    app = FastAPI()
+    app.state.release = asyncio.Event()
+    app.state.release.set()
+
+    @app.get('/items')
+    async def list_items():
+        await app.state.release.wait()
+        return {'total': profiled_function()}
+
+    return profiler.ProfilerMiddleware(app)
+
+
+@pytest_asyncio.fixture
+async def client(middleware):
+    async with AsyncClient(
+        transport=ASGITransport(app=middleware), base_url='http://testserver'
+    ) as client:
+        yield client
+
+
+async def test_without_header(client):
+    response = await client.get('/items', headers={'Authorization': 'Bearer admin'})
+
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert profiler.profile_store.list() == []
+    profiler.is_admin_token.assert_not_called()
+
+
+async def test_ignores_header_without_admin(client):
+    response = await client.get(
+        '/items', headers={'Authorization': 'Bearer user', 'X-Profile': '1'}
+    )
+
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert profiler.profile_store.list() == []
+
+
+async def test_profile_request(client):
+    response = await client.get('/items', headers=ADMIN_HEADERS)
+
+    assert response.status_code == 200
+    assert response.json() == {'total': 499500}
+    profile = profiler.profile_store.get(response.headers['X-Profile-Id'])
+    assert (profile.method, profile.path, profile.status) == ('GET', '/items', 200)
+    assert profile.concurrent == 0
+    assert profile.report() == profile.report()
+    assert 'profiled_function' in profile.report()
+    assert any(
+        function[2] == 'profiled_function' for function in marshal.loads(profile.dump())
+    )
+
+
+async def test_store_keeps_latest_profiles(client):
+    ids = [
+        (await client.get('/items', headers=ADMIN_HEADERS)).headers['X-Profile-Id']
+        for _ in range(3)
+    ]
+
+    assert [profile.id for profile in profiler.profile_store.list()] == [
+        ids[2],
+        ids[1],
+    ]
+
+
+async def test_one_profile_at_a_time(client, middleware):
+    middleware.profile = profiler.RequestProfile('GET', '/items')
+
+    response = await client.get('/items', headers=ADMIN_HEADERS)
+
+    assert response.status_code == 409
+
+
+async def test_counts_concurrent_requests(client, middleware):
+    middleware.app.state.release.clear()
+    before = asyncio.create_task(client.get('/items'))
+    while not middleware.in_flight:
+        await asyncio.sleep(0)
+    profiled = asyncio.create_task(client.get('/items', headers=ADMIN_HEADERS))
+    while middleware.profile is None:
+        await asyncio.sleep(0)
+    during = asyncio.create_task(client.get('/items'))
+    while middleware.in_flight < 3:
+        await asyncio.sleep(0)
+    middleware.app.state.release.set()
+
+    response = await profiled
+    await asyncio.gather(before, during)
+
+    profile = profiler.profile_store.get(response.headers['X-Profile-Id'])
+    assert profile.concurrent == 2
+    assert profile.report().startswith('2 other requests ran during this profile')
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+from beanie import PydanticObjectId
+from pymongo.errors import AutoReconnect
+
+from exako.apps.exercise.jobs import SpeakJobQueue
+from exako.apps.exercise.models import SpeakJob
+from exako.core.constants import ExerciseType, JobStatus
+
+pytestmark = pytest.mark.asyncio
+
+
+def speak_job(**fields) -> SpeakJob:
+    return SpeakJob(
+        exercise_id=PydanticObjectId(),
+        type=ExerciseType.SPEAK_TERM,
+        user_id=uuid4(),
+        audio=b'audio',
+        request={'language': 'en-us'},
+        **fields,
+    )
+
+
+async def wait_status(job_id: PydanticObjectId, timeout: float = 5) -> SpeakJob:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await SpeakJob.get(job_id)
+        if job.status in (JobStatus.DONE, JobStatus.FAILED):
+            return job
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.05)
+
+
+async def test_submit_runs_the_job(client):
+    handler = AsyncMock(return_value={'correct': True})
+    queue = SpeakJobQueue(handler, workers=1)
+    await queue.start()
+
+    job = await queue.submit(speak_job())
+    result = await queue.wait(job.id, job.user_id, timeout=5)
+    await queue.stop()
+
+    assert result.status == JobStatus.DONE
+    assert result.response == {'correct': True}
+    assert result.audio is None
+    handler.assert_awaited_once()
+
+
+async def test_job_is_claimed_once(client):
+    job = await speak_job().insert()
+    first = SpeakJobQueue(AsyncMock(), workers=1)
+    second = SpeakJobQueue(AsyncMock(), workers=1)
+
+    claimed = await asyncio.gather(first._claim(job.id), second._claim(job.id))
+
+    assert [item is not None for item in claimed].count(True) == 1
+    assert (await SpeakJob.get(job.id)).status == JobStatus.RUNNING
+
+
+async def test_failing_handler_marks_the_job_failed(client):
+    queue = SpeakJobQueue(AsyncMock(side_effect=RuntimeError('boom')), workers=1)
+    await queue.start()
+
+    job = await queue.submit(speak_job())
+    result = await queue.wait(job.id, job.user_id, timeout=5)
+    await queue.stop()
+
+    assert result.status == JobStatus.FAILED
+    assert result.error['status_code'] == 503
+
+
+async def test_stale_lease_is_requeued(client):
+    handler = AsyncMock(return_value={'correct': False})
+    queue = SpeakJobQueue(
+        handler,
+        workers=1,
+        stale_after=timedelta(minutes=5),
+        sweep_interval=timedelta(milliseconds=50),
+    )
+    await queue.start()
+
+    job = await speak_job(
+        status=JobStatus.RUNNING,
+        updated_at=datetime.now() - timedelta(minutes=10),
+    ).insert()
+    result = await wait_status(job.id)
+    await queue.stop()
+
+    assert result.status == JobStatus.DONE
+    assert result.response == {'correct': False}
+
+
+async def test_worker_survives_a_database_error():
+    queue = SpeakJobQueue(AsyncMock(), workers=1)
+    job_ids = [PydanticObjectId(), PydanticObjectId()]
+
+    with (
+        patch.object(queue, '_requeue', AsyncMock()),
+        patch.object(queue, '_claim', AsyncMock(side_effect=[AutoReconnect(), 'job'])),
+        patch.object(queue, '_run', AsyncMock()) as run,
+    ):
+        await queue.start()
+        for job_id in job_ids:
+            queue.queue.put_nowait(job_id)
+        await asyncio.wait_for(queue.queue.join(), 1)
+        await queue.stop()
+
+    run.assert_awaited_once_with('job')
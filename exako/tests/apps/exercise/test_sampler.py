@@ -0,0 +1,316 @@
+from datetime import datetime, timedelta
+from random import Random
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+from bson import Binary
+from fastapi_pagination import Params
+from pymongo import ASCENDING
+
+from exako.apps.exercise import models
+from exako.apps.exercise import sampler as sampler_module
+from exako.apps.exercise.models import Exercise
+from exako.apps.exercise.sampler import (
+    CardsetSampler,
+    RandomSampler,
+    ReviewSampler,
+    StratifiedSampler,
+    interleave_plan,
+    sample_sequence,
+    term_values,
+)
+from exako.core.constants import ExerciseType, Language
+
+
+def matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        value = document.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        if '$in' in condition and value not in condition['$in']:
+            return False
+        if '$nin' in condition and value in condition['$nin']:
+            return False
+        if '$lte' in condition and not value <= condition['$lte']:
+            return False
+        if '$gte' in condition and not value >= condition['$gte']:
+            return False
+        if '$lt' in condition and not value < condition['$lt']:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+        self.skipped = 0
+        self.limited = None
+
+    def sort(self, key, direction=ASCENDING):
+        keys = [(key, direction)] if isinstance(key, str) else key
+        for key, direction in reversed(keys):
+            self.documents = sorted(
+                self.documents,
+                key=lambda document: document[key],
+                reverse=direction < 0,
+            )
+        return self
+
+    def skip(self, skipped):
+        self.skipped = skipped
+        return self
+
+    def limit(self, limited):
+        self.limited = limited
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def items(self) -> list[dict]:
+        items = self.documents[self.skipped :]
+        return items if self.limited is None else items[: self.limited]
+
+    async def to_list(self, length):
+        return self.items()[:length]
+
+    async def iterate(self):
+        for item in self.items():
+            yield item
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def close(self):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        return FakeCursor([item for item in self.documents if matches(item, query)])
+
+    async def count_documents(self, query, limit=None):
+        total = sum(matches(item, query) for item in self.documents)
+        return total if limit is None else min(total, limit)
+
+
+def catalog(size: int, types: tuple[int, ...] = (1,)) -> list[dict]:
+    random = Random(0)
+    return [
+        {
+            '_id': index,
+            'type': types[index % len(types)],
+            'language': 'en-us',
+            'random_score': random.random(),
+        }
+        for index in range(size)
+    ]
+
+
+async def read_pages(sampler, limit: int) -> list[dict]:
+    total = await sampler.count()
+    items = list()
+    for offset in range(0, total, limit):
+        page = await sampler.sample(offset, limit)
+        assert len(page) == min(limit, total - offset)
+        items += page
+    return items
+
+
+@pytest.mark.asyncio
+async def test_random_sampler_pages_cover_the_catalog():
+    sampler = RandomSampler(FakeCollection(catalog(30)), {}, seed=0.5)
+
+    items = await read_pages(sampler, 7)
+
+    assert sorted(item['_id'] for item in items) == list(range(30))
+
+
+@pytest.mark.asyncio
+async def test_random_sampler_lists_excluded_exercises_last():
+    excluded = set(range(0, 30, 3))
+    sampler = RandomSampler(
+        FakeCollection(catalog(30)),
+        {},
+        seed=0.5,
+        exclude=lambda exercise_id: exercise_id in excluded,
+    )
+
+    items = await read_pages(sampler, 7)
+
+    assert sorted(item['_id'] for item in items) == list(range(30))
+    assert {item['_id'] for item in items[-len(excluded) :]} == excluded
+
+
+@pytest.mark.asyncio
+async def test_random_sampler_caps_the_excluded_scan():
+    documents = catalog(30)
+    sampler = RandomSampler(
+        FakeCollection(documents),
+        {},
+        seed=0.5,
+        exclude=lambda exercise_id: exercise_id % 2 == 0,
+    )
+    seed_order = sorted(
+        documents,
+        key=lambda item: (item['random_score'] < 0.5, item['random_score']),
+    )
+
+    with patch.object(sampler_module, 'EXCLUDE_SCAN_LIMIT', 20):
+        items = await read_pages(sampler, 7)
+
+    assert len(items) == 20
+    assert {item['_id'] for item in items} == {item['_id'] for item in seed_order[:20]}
+
+
+@pytest.mark.asyncio
+async def test_sample_sequence_keeps_one_cursor():
+    documents = catalog(30)
+    due = RandomSampler(FakeCollection(documents[:8]), {}, seed=0.5)
+    sampler = RandomSampler(FakeCollection(documents[8:]), {}, seed=0.5)
+
+    items, offset = list(), 0
+    while True:
+        page, total = await sample_sequence([due, sampler], offset, 7)
+        if not page:
+            break
+        items += page
+        offset += 7
+
+    assert total == 30
+    assert [item['_id'] for item in items[:8]] == [
+        item['_id'] for item in await due.sample(0, 8)
+    ]
+    assert sorted(item['_id'] for item in items) == list(range(30))
+
+
+def test_interleave_plan_skips_exhausted_strata():
+    assert interleave_plan([3, 1, 2], 0, 6) == ([0, 0, 0], [0, 1, 2, 0, 2, 0])
+    assert interleave_plan([3, 1, 2], 4, 2) == ([2, 1, 1], [2, 0])
+    assert interleave_plan([3, 1, 2], 6, 2) == ([3, 1, 2], [])
+
+
+@pytest.mark.asyncio
+async def test_stratified_sampler_pages_cover_every_type():
+    types = [
+        ExerciseType.LISTEN_TERM,
+        ExerciseType.SPEAK_TERM,
+        ExerciseType.ORDER_SENTENCE,
+    ]
+    documents = catalog(40, types=(2, 2, 2, 2, 5, 1))
+    sampler = StratifiedSampler(FakeCollection(documents), {}, seed=0.5, types=types)
+
+    items = await read_pages(sampler, 6)
+
+    assert await sampler.count() == 40
+    assert sorted(item['_id'] for item in items) == list(range(40))
+    assert {item['type'] for item in items[:3]} == {1, 2, 5}
+
+
+@pytest.mark.asyncio
+async def test_review_sampler_reads_the_due_range():
+    user_id, other_user = uuid4(), uuid4()
+    exercises = catalog(10)
+    for exercise in exercises:
+        exercise['level'] = 'a1' if exercise['_id'] % 3 else 'b1'
+    now = datetime.now()
+    reviews = [
+        {
+            '_id': index,
+            'user_id': Binary.from_uuid(user_id),
+            'exercise_id': exercise_id,
+            'type': 1,
+            'language': 'en-us',
+            'due_at': now - timedelta(days=10 - index),
+        }
+        for index, exercise_id in enumerate([5, 2, 3, 9, 4, 1])
+    ]
+    reviews[-1]['due_at'] = now + timedelta(days=1)
+    reviews.append({**reviews[0], '_id': 10, 'user_id': Binary.from_uuid(other_user)})
+    sampler = ReviewSampler(
+        FakeCollection(reviews),
+        FakeCollection(exercises),
+        user_id,
+        {'language': {'$in': ['en-us']}, 'level': {'$in': ['a1']}},
+    )
+
+    with patch.object(sampler_module, 'DUE_REVIEW_LIMIT', 4):
+        items = await read_pages(sampler, 2)
+
+    assert [item['_id'] for item in items] == [5, 2]
+    assert await sampler.exercise_ids() == [5, 2]
+
+
+def cardset_catalog() -> tuple[list[dict], list]:
+    terms = [uuid4() for _ in range(5)]
+    documents = catalog(20)
+    for index, document in enumerate(documents[:10]):
+        document['term_id'] = term_values([terms[index % 5]])[0]
+    return documents, terms
+
+
+@pytest.mark.asyncio
+async def test_cardset_sampler_pages_by_term():
+    documents, terms = cardset_catalog()
+    sampler = CardsetSampler(
+        FakeCollection(documents), {'term_id': {'$in': term_values(terms[:2])}}
+    )
+
+    items = await read_pages(sampler, 3)
+
+    assert await sampler.count() == 4
+    assert [item['_id'] for item in items] == sorted(
+        [0, 5, 1, 6], key=lambda index: documents[index]['term_id']
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_pages_due_cardset_and_random_once():
+    documents, terms = cardset_catalog()
+    user_id = uuid4()
+    reviews = [
+        {
+            '_id': index,
+            'user_id': Binary.from_uuid(user_id),
+            'exercise_id': exercise_id,
+            'type': 1,
+            'language': 'en-us',
+            'due_at': datetime.now() - timedelta(days=1),
+        }
+        for index, exercise_id in enumerate([12, 5])
+    ]
+    collection = FakeCollection(documents)
+
+    async def read_list(page: int) -> tuple[list[dict], int]:
+        return await Exercise.list(
+            language=[Language.ENGLISH_USA],
+            type=[ExerciseType.RANDOM],
+            level=None,
+            difficulty=None,
+            cardset=[1],
+            seed=0.5,
+            user={},
+            params=Params(page=page, size=4),
+            due=lambda match: ReviewSampler(
+                FakeCollection(reviews), collection, user_id, match
+            ),
+        )
+
+    with (
+        patch.object(Exercise, 'get_motor_collection', return_value=collection),
+        patch.object(models, 'fetch_cardset_terms', AsyncMock(return_value=terms[:3])),
+    ):
+        pages = [await read_list(page) for page in range(1, 7)]
+
+    items = [item['_id'] for page, _ in pages for item in page]
+    assert {total for _, total in pages} == {20}
+    assert sorted(items) == list(range(20))
+    # the due cardset exercise, then the other cardset ones by term
+    assert items[0] == 5
+    assert set(items[1:6]) == {0, 1, 2, 6, 7}
@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from beanie import PydanticObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from exako.apps.exercise.models import Exercise
+from exako.apps.exercise.statistic import ExerciseStatisticBuffer
+
+
+def collection(**kwargs):
+    return patch.object(
+        Exercise,
+        'get_motor_collection',
+        return_value=MagicMock(bulk_write=AsyncMock(**kwargs), update_many=AsyncMock()),
+    )
+
+
+@pytest.mark.asyncio
+async def test_flush_failure_keeps_the_counters():
+    buffer = ExerciseStatisticBuffer()
+    exercise_id = PydanticObjectId()
+    buffer.record(exercise_id, True)
+
+    with collection(side_effect=AutoReconnect()):
+        await buffer.flush()
+    buffer.record(exercise_id, False)
+
+    assert buffer.pending[exercise_id] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_flush_keeps_only_the_failed_writes():
+    buffer = ExerciseStatisticBuffer()
+    written, failed = PydanticObjectId(), PydanticObjectId()
+    buffer.record(written, True)
+    buffer.record(failed, True)
+    error = BulkWriteError({'writeErrors': [{'index': 1}]})
+
+    with collection(side_effect=error) as get_collection:
+        await buffer.flush()
+
+    assert dict(buffer.pending) == {failed: [1, 1]}
+    get_collection.return_value.update_many.assert_awaited_once()
+    query = get_collection.return_value.update_many.await_args.args[0]
+    assert query == {'_id': {'$in': [written]}}
+
+
+@pytest.mark.asyncio
+async def test_flush_increments_the_counters():
+    buffer = ExerciseStatisticBuffer()
+    exercise_id = PydanticObjectId()
+    buffer.record(exercise_id, True)
+    buffer.record(exercise_id, False)
+
+    with collection() as get_collection:
+        await buffer.flush()
+
+    (operation,) = get_collection.return_value.bulk_write.await_args.args[0]
+    assert operation._doc == {'$inc': {'attempts': 2, 'correct': 1}}
+    get_collection.return_value.update_many.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_flush_task_writes_without_traffic():
+    buffer = ExerciseStatisticBuffer(flush_interval=0.01)
+    buffer.record(PydanticObjectId(), True)
+
+    with collection() as get_collection:
+        buffer.start()
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+
+    get_collection.return_value.bulk_write.assert_awaited_once()
+    assert not buffer.pending
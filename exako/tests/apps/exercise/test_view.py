@@ -0,0 +1,62 @@
+from uuid import uuid4
+
+import pytest
+from bson import Binary, ObjectId
+from pydantic import ValidationError
+
+from exako.apps.exercise import models
+from exako.apps.exercise.builder import exercise_builder_map
+from exako.apps.exercise.view import ExerciseView, get_view_loader
+from exako.core.constants import ExerciseType, Language
+
+
+def test_view_loader_projection():
+    loader = get_view_loader(models.SpeakTerm, ('audio_url', 'phonetic'))
+    assert loader.projection == {
+        '_id': 1,
+        'type': 1,
+        'language': 1,
+        'audio_url': 1,
+        'phonetic': 1,
+    }
+    assert get_view_loader(models.SpeakTerm, ('audio_url', 'phonetic')) is loader
+
+
+def test_view_loader_load():
+    term_id, distractor_id = uuid4(), uuid4()
+    document = {
+        '_id': ObjectId(),
+        'type': ExerciseType.LISTEN_TERM_MCHOICE.value,
+        'language': 'en-us',
+        'term_id': Binary.from_uuid(term_id),
+        'distractors': {str(distractor_id): 'http://audio'},
+    }
+    loader = get_view_loader(models.ListenTermMChoice, ('term_id', 'distractors'))
+    view = loader.load(dict(document))
+
+    assert isinstance(view, ExerciseView)
+    assert view.id == document['_id']
+    assert view.type == ExerciseType.LISTEN_TERM_MCHOICE
+    assert view.language == Language.ENGLISH_USA
+    assert view.term_id == term_id
+    assert view.distractors == {distractor_id: 'http://audio'}
+    assert not hasattr(view, '__dict__')
+
+
+def test_view_loader_invalid_document():
+    loader = get_view_loader(models.SpeakTerm, ('answer',))
+    with pytest.raises(ValidationError):
+        loader.load(
+            {
+                '_id': ObjectId(),
+                'type': ExerciseType.SPEAK_TERM.value,
+                'language': 'en-us',
+            }
+        )
+
+
+@pytest.mark.parametrize('builder', exercise_builder_map.values())
+def test_builder_fields_exist(builder):
+    for fields in (builder.build_fields, builder.check_fields):
+        loader = get_view_loader(builder.exercise_model, fields)
+        assert set(fields) <= set(loader.projection)
@@ -0,0 +1,48 @@
+from array import array
+from random import Random
+
+import pytest
+
+from exako.apps.exercise.voice import audio
+from exako.benchmarks.audio import generate_wav
+
+
+@pytest.mark.parametrize('sample_width', [1, 2, 4])
+@pytest.mark.parametrize('channels', [1, 2])
+@pytest.mark.parametrize('rate', [8000, 16000, 44100])
+def test_prepare_audio(rate, channels, sample_width):
+    params, frames = audio.read_wav(
+        generate_wav(rate=rate, channels=channels, sample_width=sample_width)
+    )
+
+    pcm = audio.prepare_audio(params, frames)
+
+    duration = len(pcm) / 2 / audio.MODEL_SAMPLE_RATE
+    assert 1.0 <= duration <= 1.0 + 2 * audio.VAD_PADDING + 0.1
+
+
+def test_trim_silence_only_silence():
+    samples = array('h', bytes(audio.MODEL_SAMPLE_RATE * 2))
+
+    assert len(audio.trim_silence(samples)) == 0
+
+
+def test_read_wav_invalid_audio():
+    with pytest.raises(audio.InvalidAudioError):
+        audio.read_wav(b'not a wav file')
+
+
+@pytest.mark.parametrize('rate', [8000, 16000, 22050, 44100, 48000])
+def test_resampler_chunks_match_whole_clip(rate):
+    random = Random(rate)
+    samples = array('h', [random.randint(-20000, 20000) for _ in range(rate // 10)])
+    resampler = audio.Resampler(rate)
+
+    streamed, start = array('h'), 0
+    while start < len(samples):
+        size = random.randint(1, 997)
+        streamed += resampler.feed(samples[start : start + size])
+        start += size
+    streamed += resampler.finish()
+
+    assert streamed == audio.resample(samples, rate)
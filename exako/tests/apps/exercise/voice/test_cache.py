@@ -0,0 +1,81 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from exako.apps.exercise.voice import cache as cache_module
+from exako.apps.exercise.voice.cache import TranscriptionCache
+from exako.core.constants import Language
+
+
+def test_cache_key_depends_on_language_and_vocabulary():
+    key = TranscriptionCache.key(b'audio', ['i', 'like'], Language.ENGLISH_USA)
+
+    assert key == TranscriptionCache.key(b'audio', ['i', 'like'], Language.ENGLISH_USA)
+    assert key != TranscriptionCache.key(b'audio', ['i', 'like'], Language.ENGLISH_UK)
+    assert key != TranscriptionCache.key(b'audio', ['i'], Language.ENGLISH_USA)
+    assert key != TranscriptionCache.key(b'other', ['i', 'like'], Language.ENGLISH_USA)
+
+
+def test_cache_evicts_least_recently_used_entry():
+    cache = TranscriptionCache(max_entries=2, max_bytes=1024)
+    cache.set('a', 'first')
+    cache.set('b', 'second')
+    cache.get('a')
+
+    cache.set('c', 'third')
+
+    assert cache.get('a') == 'first'
+    assert cache.get('b') is None
+    assert cache.get('c') == 'third'
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = TranscriptionCache(max_entries=100, max_bytes=20)
+    cache.set('a', 'x' * 10)
+    cache.set('b', 'x' * 10)
+
+    assert cache.get('a') is None
+    assert cache.size <= 20
+
+
+def test_cache_disk_tier(tmp_path):
+    TranscriptionCache(max_entries=1, max_bytes=1024, directory=tmp_path).set(
+        'abc', 'i like pizza'
+    )
+
+    cache = TranscriptionCache(max_entries=1, max_bytes=1024, directory=tmp_path)
+
+    assert cache.get('abc') == 'i like pizza'
+
+
+def test_cache_disk_tier_is_bounded(tmp_path):
+    cache = TranscriptionCache(
+        max_entries=1,
+        max_bytes=1024,
+        directory=tmp_path,
+        max_disk_entries=2,
+        max_disk_bytes=1024,
+    )
+    for index, key in enumerate(('aa1', 'bb2', 'cc3')):
+        cache.set(key, 'text')
+        os.utime(cache._path(key), (index, index))
+    cache.get('aa1')  # on disk only, read again as the newest
+    with patch.object(cache_module, 'PRUNE_INTERVAL', 1):
+        cache.set('dd4', 'text')
+
+    assert sorted(path.name for path in tmp_path.glob('*/*')) == ['aa1', 'dd4']
+
+    cache.max_disk_bytes = 4
+    cache.prune()
+    assert [path.name for path in tmp_path.glob('*/*')] == ['dd4']
+
+
+def test_cache_concurrent_disk_writes(tmp_path):
+    cache = TranscriptionCache(max_entries=1, max_bytes=1024, directory=tmp_path)
+    texts = [f'text {index}' for index in range(16)]
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda text: cache.set('abc', text), texts))
+
+    assert cache._path('abc').read_text() in texts
+    assert list(tmp_path.glob('*/*.tmp')) == []
@@ -0,0 +1,51 @@
+import pytest
+
+from exako.apps.exercise.voice import recognizer as recognizer_module
+from exako.apps.exercise.voice.recognizer import RecognizerPool
+from exako.core.constants import Language
+
+
+class FakeRecognizer:
+    def __init__(self, model, rate, grammar):
+        self.grammar = grammar
+        self.resets = 0
+
+    def Reset(self):
+        self.resets += 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(recognizer_module, 'KaldiRecognizer', FakeRecognizer)
+    pool = RecognizerPool(max_size=2)
+    monkeypatch.setattr(pool, 'get_model', lambda language: None)
+    return pool
+
+
+def test_recognizer_pool_reuses_recognizer(pool):
+    with pool.recognizer(Language.ENGLISH_USA, 16000, ['i', 'like']) as first:
+        pass
+    with pool.recognizer(Language.ENGLISH_USA, 16000, ['i', 'like']) as second:
+        pass
+
+    assert first is second
+    assert second.resets == 2
+
+
+def test_recognizer_pool_evicts_least_recently_used(pool):
+    for vocabulary in (['a'], ['b'], ['c']):
+        with pool.recognizer(Language.ENGLISH_USA, 16000, vocabulary):
+            pass
+
+    assert list(pool.idle) == [
+        (Language.ENGLISH_USA, 16000, ('b',)),
+        (Language.ENGLISH_USA, 16000, ('c',)),
+    ]
+
+
+def test_recognizer_pool_discards_recognizer_on_error(pool):
+    with pytest.raises(RuntimeError):
+        with pool.recognizer(Language.ENGLISH_USA, 16000, ['a']):
+            raise RuntimeError
+
+    assert pool.idle_count == 0
@@ -0,0 +1,70 @@
+import pytest
+
+from exako.apps.exercise.voice import audio
+from exako.apps.exercise.voice import recognizer as recognizer_module
+from exako.apps.exercise.voice import stream as stream_module
+from exako.apps.exercise.voice.recognizer import RecognizerPool
+from exako.apps.exercise.voice.stream import StreamDecoder
+from exako.benchmarks.audio import generate_wav
+from exako.core.constants import Language
+
+
+class FakeRecognizer:
+    def __init__(self, model, rate, grammar):
+        self.received = 0
+
+    def AcceptWaveform(self, data):
+        self.received += len(data)
+
+    def FinalResult(self):
+        return '{"text": "hello"}'
+
+    def Reset(self):
+        self.received = 0
+
+
+@pytest.fixture(autouse=True)
+def fake_recognizer(monkeypatch):
+    monkeypatch.setattr(recognizer_module, 'KaldiRecognizer', FakeRecognizer)
+    pool = RecognizerPool(max_size=2)
+    monkeypatch.setattr(pool, 'get_model', lambda language: None)
+    monkeypatch.setattr(stream_module, 'recognizer_pool', pool)
+
+
+def feed_chunks(decoder, data, size=1000):
+    for start in range(0, len(data), size):
+        decoder.feed(data[start : start + size])
+
+
+@pytest.mark.parametrize('rate', [8000, 16000, 44100])
+@pytest.mark.parametrize('channels', [1, 2])
+def test_stream_decoder_skips_silence(rate, channels):
+    decoder = StreamDecoder(['hello'] * 10, Language.ENGLISH_USA)
+
+    feed_chunks(decoder, generate_wav(rate=rate, channels=channels))
+    recognizer = decoder.recognizer
+
+    assert decoder.finish() == 'hello'
+    duration = recognizer.received / 2 / audio.MODEL_SAMPLE_RATE
+    assert 1.0 <= duration <= 1.0 + 2 * audio.VAD_PADDING + 0.1
+    decoder.close()
+
+
+def test_stream_decoder_rejects_invalid_header():
+    decoder = StreamDecoder(['hello'], Language.ENGLISH_USA)
+
+    with pytest.raises(audio.InvalidAudioError):
+        decoder.feed(b'RIFF\x00\x00\x00\x00MP3 ' + bytes(100))
+
+
+def test_stream_decoder_rejects_long_audio_from_header():
+    wav = generate_wav(silence=2, tone=2)
+    decoder = StreamDecoder(['hello'], Language.ENGLISH_USA)
+
+    with pytest.raises(audio.AudioTooLongError):
+        decoder.feed(wav[:100])
+    assert decoder.recognizer is None
+
+
+def test_parse_wav_header_incomplete():
+    assert audio.parse_wav_header(generate_wav()[:20]) is None
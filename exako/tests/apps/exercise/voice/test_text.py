@@ -0,0 +1,51 @@
+import pytest
+
+from exako.apps.exercise.voice.text import (
+    edit_distance,
+    text_alignment,
+    text_diff,
+    text_distance,
+)
+from exako.core.constants import EditOperation, Language
+
+
+@pytest.mark.parametrize(
+    's1, s2, expected',
+    [
+        ('kitten', 'sitting', 3),
+        ('', 'abc', 3),
+        ('same', 'same', 0),
+        ('flaw', 'lawn', 2),
+    ],
+)
+def test_edit_distance(s1, s2, expected):
+    assert edit_distance(s1, s2) == expected
+
+
+def test_edit_distance_bounded():
+    assert edit_distance('kitten', 'sitting', max_distance=1) == 2
+    assert edit_distance('a', 'abcdef', max_distance=2) == 3
+    assert edit_distance('kitten', 'sitting', max_distance=3) == 3
+
+
+def test_text_distance_normalizes():
+    assert text_distance('I like pizza!', 'i like pizza') == 0
+    assert text_distance('Café', 'cafe', Language.ENGLISH_USA) == 0
+
+
+def test_text_alignment_substitute():
+    assert text_alignment('I like pizza', 'I bike pizza') == [
+        {'operation': EditOperation.SUBSTITUTE, 'correct_index': 1, 'index': 1}
+    ]
+
+
+def test_text_alignment_insert_and_delete():
+    assert text_alignment('I like pizza', 'I really like') == [
+        {'operation': EditOperation.INSERT, 'correct_index': None, 'index': 1},
+        {'operation': EditOperation.DELETE, 'correct_index': 2, 'index': None},
+    ]
+
+
+def test_text_diff_is_ordered():
+    assert text_diff('one two three four', 'uno two tres four five') == [0, 2, 4]
+    assert text_diff('I like pizza', 'I like pizza.') == []
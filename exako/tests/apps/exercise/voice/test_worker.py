@@ -0,0 +1,109 @@
+import asyncio
+import socket
+import threading
+from contextlib import suppress
+from time import monotonic, sleep
+
+import pytest
+from fastapi import HTTPException
+
+from exako.apps.exercise.voice import worker as worker_module
+from exako.apps.exercise.voice.client import SpeechWorkerClient
+from exako.apps.exercise.voice.worker import SpeechWorkerServer
+from exako.core.constants import Language
+
+SERVER_START_TIMEOUT = 5
+
+
+def fake_decode_audio(audio, vocabulary, language):
+    if not audio:
+        raise HTTPException(status_code=400, detail='could not trascribe text.')
+    return ' '.join(vocabulary)
+
+
+@pytest.fixture
+def socket_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(worker_module, 'decode_audio', fake_decode_audio)
+    path = tmp_path / 'speech.sock'
+    server = SpeechWorkerServer(path, workers=1)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server.serve())
+
+    def run():
+        with suppress(asyncio.CancelledError):
+            loop.run_until_complete(task)
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    deadline = monotonic() + SERVER_START_TIMEOUT
+    while not path.exists():
+        assert monotonic() < deadline, 'speech worker did not start.'
+        sleep(0.01)
+    yield path
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+
+
+def test_worker_transcribe(socket_path):
+    client = SpeechWorkerClient(socket_path)
+    text = client.transcribe(b'audio', ['hello', 'world'], Language.ENGLISH_USA)
+    assert text == 'hello world'
+
+
+def test_worker_error_response(socket_path):
+    client = SpeechWorkerClient(socket_path)
+    with pytest.raises(HTTPException) as error:
+        client.transcribe(b'', ['hello'], Language.ENGLISH_USA)
+    assert error.value.status_code == 400
+    assert error.value.detail == 'could not trascribe text.'
+
+
+def test_worker_unavailable(tmp_path):
+    client = SpeechWorkerClient(tmp_path / 'missing.sock')
+    assert client.transcribe(b'audio', ['hello'], Language.ENGLISH_USA) is None
+    assert client.unavailable_until > 0
+
+
+def test_worker_disconnect_falls_back(tmp_path):
+    path = tmp_path / 'closing.sock'
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen(1)
+
+    def accept_and_close():
+        connection, _ = server.accept()
+        connection.close()
+
+    thread = threading.Thread(target=accept_and_close, daemon=True)
+    thread.start()
+    client = SpeechWorkerClient(path, timeout=5)
+
+    assert client.transcribe(b'audio', ['hello'], Language.ENGLISH_USA) is None
+    assert client.unavailable_until > 0
+    thread.join()
+    server.close()
+
+
+def test_worker_timeout_falls_back(tmp_path):
+    path = tmp_path / 'hung.sock'
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen(1)
+    released = threading.Event()
+
+    def accept_and_hang():
+        connection, _ = server.accept()
+        released.wait()
+        connection.close()
+
+    thread = threading.Thread(target=accept_and_hang, daemon=True)
+    thread.start()
+    client = SpeechWorkerClient(path, timeout=0.1)
+
+    assert client.transcribe(b'audio', ['hello'], Language.ENGLISH_USA) is None
+    assert client.unavailable_until > 0
+    assert client.transcribe(b'audio', ['hello'], Language.ENGLISH_USA) is None
+    released.set()
+    thread.join()
+    server.close()
@@ -0,0 +1,191 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from beanie import PydanticObjectId
+
+from exako.apps.history.models import ExerciseReview, ExerciseSeenFilter
+from exako.core.bloom import BloomFilter
+from exako.core.constants import ExerciseType, Language
+from exako.core.database import DatabaseInitializer, document_models
+
+
+@pytest_asyncio.fixture
+async def documents():
+    database = MagicMock()
+    database.command = AsyncMock(return_value={'version': '7.0.0'})
+    await DatabaseInitializer(
+        database=database, document_models=document_models(), create_indexes=False
+    )
+
+
+class FakeFilterCollection:
+    def __init__(self, stored: dict):
+        self.stored = stored
+
+    async def find(self, user_id):
+        state = dict(self.stored)
+        await asyncio.sleep(0)  # lets the other register read the same state
+        return ExerciseSeenFilter(**state)
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(0)
+        matched = (
+            query['_id'] == self.stored['id']
+            and query['current_count'] == self.stored['current_count']
+        )
+        if matched:
+            self.stored.update(update['$set'])
+        return Mock(matched_count=int(matched))
+
+
+def fake_filter(stored: dict):
+    collection = FakeFilterCollection(stored)
+    return (
+        patch.object(ExerciseSeenFilter, 'get_filter', side_effect=collection.find),
+        patch.object(
+            ExerciseSeenFilter, 'get_motor_collection', return_value=collection
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_registers_across_a_rotation(documents):
+    full = BloomFilter()
+    full.add('old')
+    stored = {
+        'id': PydanticObjectId(),
+        'user_id': uuid4(),
+        'current': full.to_bytes(),
+        'previous': None,
+        'current_count': ExerciseSeenFilter.GENERATION_SIZE,
+    }
+    first, second = PydanticObjectId(), PydanticObjectId()
+
+    get_filter, get_motor_collection = fake_filter(stored)
+    with get_filter, get_motor_collection:
+        await asyncio.gather(
+            ExerciseSeenFilter.register(stored['user_id'], first),
+            ExerciseSeenFilter.register(stored['user_id'], second),
+        )
+
+    seen = ExerciseSeenFilter(**stored)
+    assert seen.current_count == 2
+    assert seen.previous == full.to_bytes()
+    predicate = seen.as_predicate()
+    assert predicate(first) and predicate(second) and predicate('old')
+
+
+@pytest.mark.asyncio
+async def test_register_logs_when_the_attempts_run_out(documents, caplog):
+    stored = {
+        'id': PydanticObjectId(),
+        'user_id': uuid4(),
+        'current_count': 1,
+    }
+    collection = MagicMock(update_one=AsyncMock(return_value=Mock(matched_count=0)))
+
+    with (
+        patch.object(
+            ExerciseSeenFilter,
+            'get_filter',
+            AsyncMock(side_effect=lambda user_id: ExerciseSeenFilter(**stored)),
+        ),
+        patch.object(
+            ExerciseSeenFilter, 'get_motor_collection', return_value=collection
+        ),
+    ):
+        await ExerciseSeenFilter.register(stored['user_id'], PydanticObjectId())
+
+    assert collection.update_one.await_count == ExerciseSeenFilter.REGISTER_ATTEMPTS
+    assert 'not registered in the seen filter' in caplog.text
+
+
+def new_review(**fields) -> ExerciseReview:
+    return ExerciseReview(
+        user_id=uuid4(),
+        exercise_id=PydanticObjectId(),
+        type=ExerciseType.LISTEN_TERM,
+        language=Language.ENGLISH_USA,
+        **fields,
+    )
+
+
+def test_schedule_grows_the_interval(documents):
+    review = new_review()
+    intervals = list()
+    for _ in range(4):
+        review.schedule(True)
+        intervals.append(review.interval)
+
+    assert intervals == [1, 6, 15, 38]
+    assert review.repetitions == 4
+    assert review.ease == pytest.approx(2.5)
+
+
+def test_schedule_resets_on_a_wrong_answer(documents):
+    review = new_review(repetitions=3, interval=15)
+    review.schedule(False)
+
+    assert (review.repetitions, review.interval) == (0, 1)
+    assert review.ease == pytest.approx(2.5 - 0.54)
+    for _ in range(5):
+        review.schedule(False)
+    assert review.ease == ExerciseReview.MIN_EASE
+
+
+class FakeReviewCollection:
+    def __init__(self, stored: dict):
+        self.stored = stored
+
+    async def find_one(self, *args):
+        state = dict(self.stored)
+        await asyncio.sleep(0)
+        return ExerciseReview(**state)
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(0)
+        matched = query['due_at'] == self.stored['due_at']
+        if matched:
+            self.stored.update(update['$set'])
+        return Mock(matched_count=int(matched))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reviews_are_both_scheduled(documents):
+    stored = new_review(repetitions=2, interval=6).model_dump()
+    stored['id'] = PydanticObjectId()
+    exercise = Mock(id=stored['exercise_id'])
+    collection = FakeReviewCollection(stored)
+
+    with (
+        patch.object(ExerciseReview, 'find_one', side_effect=collection.find_one),
+        patch.object(ExerciseReview, 'get_motor_collection', return_value=collection),
+    ):
+        await asyncio.gather(
+            ExerciseReview.review(stored['user_id'], exercise, True),
+            ExerciseReview.review(stored['user_id'], exercise, True),
+        )
+
+    assert (stored['repetitions'], stored['interval']) == (4, 38)
+
+
+@pytest.mark.asyncio
+async def test_review_logs_when_the_attempts_run_out(documents, caplog):
+    review = new_review(id=PydanticObjectId())
+    collection = MagicMock(update_one=AsyncMock(return_value=Mock(matched_count=0)))
+
+    with (
+        patch.object(
+            ExerciseReview,
+            'find_one',
+            AsyncMock(side_effect=lambda *args: review.model_copy()),
+        ),
+        patch.object(ExerciseReview, 'get_motor_collection', return_value=collection),
+    ):
+        await ExerciseReview.review(review.user_id, Mock(id=review.exercise_id), True)
+
+    assert collection.update_one.await_count == ExerciseReview.REVIEW_ATTEMPTS
+    assert 'not scheduled after' in caplog.text
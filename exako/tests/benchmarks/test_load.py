@@ -0,0 +1,87 @@
+from random import Random
+from uuid import uuid4
+
+import pytest
+from fastapi.routing import APIRoute
+
+from exako.apps.exercise.builder import exercise_builder_map
+from exako.benchmarks.load import SPEAK_TYPES, LoadStats, answer_for, compare
+from exako.core.constants import ExerciseType
+from exako.main import app
+
+CHECK_ROUTES = {
+    route.operation_id: route for route in app.routes if isinstance(route, APIRoute)
+}
+
+
+def built_exercise(exercise_type: ExerciseType) -> dict:
+    choices = {str(uuid4()): 'word' for _ in range(8)}
+    return {
+        ExerciseType.ORDER_SENTENCE: {'sentence': ['i', 'like', 'pizza']},
+        ExerciseType.LISTEN_TERM: {'audio_url': 'https://example.com/a.mp3'},
+        ExerciseType.LISTEN_SENTENCE: {'audio_url': 'https://example.com/a.mp3'},
+        ExerciseType.LISTEN_TERM_MCHOICE: {'choices': choices, 'content': 'word'},
+        ExerciseType.TERM_SENTENCE_MCHOICE: {'choices': choices, 'content': 'word'},
+        ExerciseType.TERM_DEFINITION_MCHOICE: {'choices': choices, 'content': 'word'},
+        ExerciseType.TERM_IMAGE_MCHOICE: {
+            'audio_url': 'https://example.com/a.mp3',
+            'choices': choices,
+        },
+        ExerciseType.TERM_IMAGE_TEXT_MCHOICE: {
+            'image_url': 'https://example.com/a.svg',
+            'choices': choices,
+        },
+        ExerciseType.TERM_CONNECTION: {'choices': choices, 'content': 'word'},
+    }[exercise_type]
+
+
+@pytest.mark.parametrize(
+    'exercise_type',
+    [
+        exercise_type
+        for exercise_type in exercise_builder_map
+        if exercise_type not in SPEAK_TYPES
+    ],
+)
+def test_answer_matches_check_schema(exercise_type):
+    route = CHECK_ROUTES[f'check_{exercise_builder_map[exercise_type].__name__}']
+    exercise = built_exercise(exercise_type)
+    body = {
+        **exercise,
+        'seconds_to_answer': 10,
+        'answer': answer_for(exercise_type, exercise, Random(0)),
+    }
+
+    route.dependant.body_params[0].type_.model_validate(body)
+
+
+def test_stats_report():
+    stats = LoadStats()
+    stats.latencies['list_exercise'] = [0.01, 0.02, 0.03, 0.04]
+    stats.errors['list_exercise'] = 1
+
+    (report,) = stats.report(elapsed=2)
+    assert report['requests'] == 4
+    assert report['errors'] == 1
+    assert report['throughput_rps'] == 2
+    assert report['p50_ms'] == pytest.approx(20)
+    assert report['max_ms'] == pytest.approx(40)
+
+
+def test_compare_reports_regressions():
+    baseline = {
+        'routes': [
+            {'name': 'list_exercise', 'p50_ms': 10, 'p99_ms': 20, 'throughput_rps': 100}
+        ]
+    }
+    current = {
+        'routes': [
+            {'name': 'list_exercise', 'p50_ms': 10, 'p99_ms': 30, 'throughput_rps': 80},
+            {'name': 'check_X', 'p50_ms': 1, 'p99_ms': 2, 'throughput_rps': 1},
+        ]
+    }
+
+    assert compare(current, baseline, threshold=0.1) == [
+        'list_exercise p99_ms: 20.000 -> 30.000',
+        'list_exercise throughput_rps: 100.0 -> 80.0',
+    ]
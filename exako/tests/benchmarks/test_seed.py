@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timezone
+from random import Random
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+
+from exako.benchmarks.seed import (
+    FACTORIES,
+    BatchWriter,
+    Distribution,
+    build_computed,
+    build_exercises,
+    build_history,
+    parse_distribution,
+    reservoir_add,
+    seed_generators,
+    seed_users,
+)
+from exako.core.constants import ExerciseType, Language, Level
+from exako.core.database import DatabaseInitializer, document_models
+
+UNTIL = datetime(2024, 1, 1)
+
+
+@pytest_asyncio.fixture
+async def documents():
+    database = MagicMock()
+    database.command = AsyncMock(return_value={'version': '7.0.0'})
+    await DatabaseInitializer(
+        database=database, document_models=document_models(), create_indexes=False
+    )
+
+
+def test_parse_distribution():
+    assert parse_distribution(Language, ['en-us=8', 'PORTUGUESE_BRAZIL=2', 'fr']) == {
+        Language.ENGLISH_USA: 8,
+        Language.PORTUGUESE_BRAZIL: 2,
+        Language.FRENCH: 1,
+    }
+    assert parse_distribution(Level, ['none=1', 'a1=3']) == {None: 1, Level.BEGINNER: 3}
+    assert parse_distribution(ExerciseType, ['listen_term', '1=2']) == {
+        ExerciseType.LISTEN_TERM: 1,
+        ExerciseType.ORDER_SENTENCE: 2,
+    }
+
+
+@pytest.mark.parametrize('values', [['klingon=1'], ['en-us=x'], ['en-us=0']])
+def test_parse_distribution_invalid(values):
+    with pytest.raises(ValueError):
+        parse_distribution(Language, values)
+
+
+def test_distribution_follows_weights():
+    distribution = Distribution({Level.BEGINNER: 9, None: 1, Level.MASTER: 0})
+    sample = distribution.sample(Random(0), 10_000)
+
+    assert Level.MASTER not in sample
+    assert 8500 < sample.count(Level.BEGINNER) < 9500
+
+
+@pytest.mark.asyncio
+async def test_build_exercises_is_deterministic(documents):
+    types = Distribution.uniform(FACTORIES)
+    languages = Distribution({Language.ENGLISH_USA: 1})
+    levels = Distribution.uniform([None, *Level])
+
+    first = build_exercises(50, seed_generators(7), types, languages, levels, UNTIL)
+    second = build_exercises(50, seed_generators(7), types, languages, levels, UNTIL)
+
+    assert [exercise.model_dump() for exercise in first] == [
+        exercise.model_dump() for exercise in second
+    ]
+    assert len({exercise.id for exercise in first}) == 50
+    assert {exercise.language for exercise in first} == {Language.ENGLISH_USA}
+
+
+@pytest.mark.asyncio
+async def test_build_computed_is_partial(documents):
+    computed = build_computed(
+        50,
+        seed_generators(7),
+        Distribution.uniform(FACTORIES),
+        Distribution.uniform(Language),
+        UNTIL,
+    )
+
+    for document in computed:
+        assert getattr(document, document.term_reference) is not None
+        with pytest.raises(ValidationError):
+            document.model(**document.model_dump())
+
+
+@pytest.mark.asyncio
+async def test_build_history(documents):
+    generator = seed_generators(7)
+    exercises = build_exercises(
+        10,
+        generator,
+        Distribution.uniform(FACTORIES),
+        Distribution.uniform(Language),
+        Distribution.uniform([None]),
+        UNTIL,
+    )
+    users = seed_users(generator, 3)
+
+    history = build_history(
+        100, generator, [exercise.id for exercise in exercises], users, UNTIL
+    )
+
+    assert {row.user_id for row in history} <= set(users)
+    assert {row.exercise.ref.id for row in history} <= {
+        exercise.id for exercise in exercises
+    }
+    assert all(row.created_at <= UNTIL for row in history)
+    assert all(
+        row.id.generation_time
+        == row.created_at.astimezone(timezone.utc).replace(microsecond=0)
+        for row in history
+    )
+
+
+def test_reservoir_add_keeps_the_size():
+    sample = list()
+    generator = Random(0)
+    reservoir_add(sample, 0, list(range(10)), generator, 20)
+    reservoir_add(sample, 10, list(range(10, 100)), generator, 20)
+
+    assert len(sample) == 20
+    assert len(set(sample)) == 20
+
+
+@pytest.mark.asyncio
+async def test_batch_writer_limits_concurrency():
+    running = 0
+    most_running = 0
+
+    async def insert_many(documents, ordered):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    model = MagicMock(insert_many=insert_many)
+    writer = BatchWriter(concurrency=2)
+    for _ in range(6):
+        await writer.write(model, [object()] * 10)
+    await writer.close()
+
+    assert most_running == 2
+    assert writer.inserted == 60
@@ -0,0 +1,36 @@
+from exako.apps.exercise.voice.text import text_speak_time
+from exako.benchmarks.speak import compare, measure, percentile, vocabulary_for
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3
+
+
+def test_vocabulary_fits_audio_duration():
+    for duration in (2, 6, 16):
+        assert text_speak_time(' '.join(vocabulary_for(duration))) >= duration
+
+
+def test_compare_reports_regressions():
+    baseline = {
+        'decode': [{'name': 'decode-1s', 'p50_ms': 10, 'p99_ms': 20}],
+        'text': [{'name': 'text_diff-5w', 'p50_ms': 1, 'p99_ms': 2}],
+    }
+    current = {
+        'decode': [{'name': 'decode-1s', 'p50_ms': 10.5, 'p99_ms': 30}],
+        'text': [{'name': 'text_diff-20w', 'p50_ms': 5, 'p99_ms': 9}],
+    }
+    assert compare(current, baseline, threshold=0.1) == [
+        'decode-1s p99_ms: 20.000 -> 30.000'
+    ]
+
+
+def test_measure_reports_python_and_process_memory():
+    size = 1024 * 1024
+    result = measure(bytearray, size, repeat=2)
+    assert result['python_peak_bytes'] >= size
+    assert result['rss_bytes'] > result['python_peak_bytes']
+    assert result['rss_growth_bytes'] is not None
@@ -19,7 +19,10 @@ async def clear_database():
 
 @pytest_asyncio.fixture
 async def client():
-    with patch.object(settings, 'DATABASE_NAME', 'test_database'):
+    with (
+        patch.object(settings, 'DATABASE_NAME', 'test_database'),
+        patch.object(settings, 'DATABASE_CREATE_INDEXES', True),
+    ):
         async with LifespanManager(app):
             async with AsyncClient(app=app, base_url='http://testserver') as client:
                 app.dependency_overrides[current_admin_user] = lambda: {}
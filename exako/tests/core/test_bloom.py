@@ -0,0 +1,32 @@
+from uuid import uuid4
+
+from exako.core.bloom import BloomFilter
+
+
+def test_bloom_filter_contains_added_items():
+    bloom = BloomFilter()
+    items = [str(uuid4()) for _ in range(500)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+
+
+def test_bloom_filter_round_trip_bytes():
+    bloom = BloomFilter()
+    bloom.add('test')
+
+    restored = BloomFilter(bloom.to_bytes())
+
+    assert 'test' in restored
+    assert len(restored.to_bytes()) == 1024
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter()
+    for _ in range(500):
+        bloom.add(str(uuid4()))
+
+    false_positives = sum(str(uuid4()) in bloom for _ in range(10_000))
+
+    assert false_positives < 100
@@ -0,0 +1,159 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReadPreference
+
+from exako.core.database import (
+    DatabaseInitializer,
+    MissingIndexError,
+    client_options,
+    document_models,
+    expected_indexes,
+    get_read_preference,
+    index_hash,
+    index_spec,
+    verify_indexes,
+)
+from exako.settings import settings
+
+
+@pytest.mark.parametrize(
+    'name, expected',
+    [
+        ('primary', ReadPreference.PRIMARY),
+        ('secondaryPreferred', ReadPreference.SECONDARY_PREFERRED),
+        ('nearest', ReadPreference.NEAREST),
+    ],
+)
+def test_get_read_preference(name, expected):
+    assert get_read_preference(name) == expected
+
+
+def test_client_options():
+    with (
+        patch.object(settings, 'DATABASE_MAX_POOL_SIZE', 20),
+        patch.object(settings, 'DATABASE_WAIT_QUEUE_TIMEOUT_MS', 500),
+        patch.object(settings, 'DATABASE_COMPRESSORS', ['zstd', 'zlib']),
+        patch.object(settings, 'DATABASE_READ_PREFERENCE', 'secondaryPreferred'),
+        patch.object(settings, 'DATABASE_WRITE_CONCERN', 'majority'),
+    ):
+        client = AsyncIOMotorClient(settings.DATABASE, **client_options())
+
+    assert client.options.pool_options.max_pool_size == 20
+    assert client.options.pool_options.wait_queue_timeout == 0.5
+    assert client.options.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert client.write_concern.document == {'w': 'majority'}
+    client.close()
+
+
+def test_index_spec_ignores_server_options():
+    expected = IndexModel(
+        [('user_id', 1), ('due_at', 1)], name='due_index', unique=True
+    ).document
+    current = {'v': 2, 'key': [('user_id', 1.0), ('due_at', 1.0)], 'unique': True}
+
+    assert index_spec(expected) == index_spec(current)
+
+
+def test_index_spec_partial_filter():
+    index = IndexModel(
+        [('term_id', 1), ('type', 1)], partialFilterExpression={'type': 2}
+    ).document
+    other = IndexModel(
+        [('term_id', 1), ('type', 1)], partialFilterExpression={'type': 3}
+    ).document
+
+    assert index_spec(index) != index_spec(other)
+
+
+def test_index_hash_ignores_order():
+    specs = {'a': index_spec({'key': [('a', 1)]}), 'b': index_spec({'key': [('b', 1)]})}
+
+    assert index_hash(specs) == index_hash(dict(reversed(specs.items())))
+    assert index_hash(specs) != index_hash({'a': specs['a']})
+
+
+async def declared_indexes() -> dict[str, dict[str, str]]:
+    database = MagicMock()
+    database.command = AsyncMock(return_value={'version': '7.0.0'})
+    await DatabaseInitializer(
+        database=database, document_models=document_models(), create_indexes=False
+    )
+    return expected_indexes(document_models())
+
+
+def indexed_database(indexes: dict[str, dict[str, str]], missing: set[str]):
+    def collection(name):
+        information = {'_id_': {'key': [('_id', 1)]}}
+        for index, spec in indexes[name].items():
+            if index not in missing:
+                information[index] = json.loads(spec)
+        return MagicMock(index_information=AsyncMock(return_value=information))
+
+    database = MagicMock()
+    database.__getitem__.side_effect = collection
+    return database
+
+
+@pytest.mark.asyncio
+async def test_expected_indexes():
+    indexes = await declared_indexes()
+
+    assert json.loads(indexes['exercise_review']['exercise_review_unique_index']) == {
+        'key': [['user_id', 1], ['exercise_id', 1]],
+        'unique': True,
+    }
+    assert 'listen_term_unique_index' in indexes['exercises']
+    assert 'user_id_1' in indexes['exercise_seen_filter']
+
+
+@pytest.mark.asyncio
+async def test_expected_indexes_match_beanie():
+    # fails when a beanie upgrade changes the indexes it creates
+    created = dict()
+
+    def collection(name):
+        async def create_indexes(indexes):
+            for index in indexes:
+                created.setdefault(name, dict())[index.document['name']] = index_spec(
+                    index.document
+                )
+            return list()
+
+        return MagicMock(
+            index_information=AsyncMock(return_value=dict()),
+            create_indexes=create_indexes,
+        )
+
+    database = MagicMock()
+    database.command = AsyncMock(return_value={'version': '7.0.0'})
+    database.__getitem__.side_effect = collection
+    await DatabaseInitializer(database=database, document_models=document_models())
+
+    expected = expected_indexes(document_models())
+    assert created == {name: specs for name, specs in expected.items() if specs}
+
+
+@pytest.mark.asyncio
+async def test_verify_indexes_logs_drift(caplog):
+    indexes = await declared_indexes()
+    database = indexed_database(indexes, {'exercise_review_due_index'})
+
+    assert not await verify_indexes(database, indexes, require_unique=True)
+    assert len(caplog.records) == 1
+    assert caplog.records[0].args[:2] == (
+        'exercise_review',
+        ['exercise_review_due_index'],
+    )
+
+
+@pytest.mark.asyncio
+async def test_verify_indexes_requires_unique_indexes():
+    indexes = await declared_indexes()
+    database = indexed_database(indexes, {'exercise_review_unique_index'})
+
+    assert not await verify_indexes(database, indexes)
+    with pytest.raises(MissingIndexError, match='exercise_review_unique_index'):
+        await verify_indexes(database, indexes, require_unique=True)
@@ -0,0 +1,54 @@
+from uuid import uuid4
+
+from beanie.odm.utils.encoder import Encoder
+from bson import Binary
+from pydantic import TypeAdapter
+
+from exako.core.fields import CHOICE_MAP_ENCODERS, ChoiceMap, ChoiceMapField
+from exako.core.migrations import migrate_document
+
+choice_map_adapter = TypeAdapter(ChoiceMapField)
+
+
+def test_choice_map_from_dict():
+    choice_id = uuid4()
+    choices = choice_map_adapter.validate_python({str(choice_id): 'casa'})
+    assert isinstance(choices, ChoiceMap)
+    assert choices == {choice_id: 'casa'}
+
+
+def test_choice_map_from_bson():
+    choice_id, other_id = uuid4(), uuid4()
+    choices = choice_map_adapter.validate_python(
+        [
+            {'id': Binary.from_uuid(choice_id), 'text': 'casa'},
+            {'id': other_id, 'text': 'carro'},
+        ]
+    )
+    assert choices == {choice_id: 'casa', other_id: 'carro'}
+
+
+def test_choice_map_encoder():
+    choice_id = uuid4()
+    encoded = Encoder(custom_encoders=CHOICE_MAP_ENCODERS).encode(
+        {'distractors': ChoiceMap({choice_id: 'casa'})}
+    )
+    assert encoded == {
+        'distractors': [{'id': Binary.from_uuid(choice_id), 'text': 'casa'}]
+    }
+
+
+def test_migrate_document():
+    term_id, choice_id = uuid4(), uuid4()
+    update = migrate_document(
+        {
+            'term_id': str(term_id),
+            'distractors': {str(choice_id): 'casa'},
+            'connections': [{'id': Binary.from_uuid(choice_id), 'text': 'casa'}],
+        }
+    )
+    assert update == {
+        'term_id': Binary.from_uuid(term_id),
+        'distractors': [{'id': Binary.from_uuid(choice_id), 'text': 'casa'}],
+    }
+    assert migrate_document({'term_id': Binary.from_uuid(term_id)}) == {}
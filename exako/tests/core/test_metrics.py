@@ -0,0 +1,96 @@
+from unittest.mock import Mock
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from exako.core import metrics
+
+
+@pytest.fixture
+def registry():
+    return metrics.MetricsRegistry()
+
+
+def test_histogram_buckets_are_inclusive():
+    histogram = metrics.Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+
+    counts, total = histogram.snapshot()
+    assert counts == [2, 1, 1]
+    assert total == pytest.approx(2.65)
+
+
+def test_render_prometheus_text(registry):
+    family = registry.histogram('test_seconds', 'Test histogram.', ('route',))
+    family.buckets = (0.1, 1)
+    family.labels('get_"item"').observe(0.5)
+    family.labels('get_"item"').observe(3)
+
+    assert registry.render().splitlines() == [
+        '# HELP test_seconds Test histogram.',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{route="get_\\"item\\"",le="0.1"} 0',
+        'test_seconds_bucket{route="get_\\"item\\"",le="1"} 1',
+        'test_seconds_bucket{route="get_\\"item\\"",le="+Inf"} 2',
+        'test_seconds_sum{route="get_\\"item\\""} 3.5',
+        'test_seconds_count{route="get_\\"item\\""} 2',
+    ]
+
+
+def test_timer_observes_elapsed_time():
+    histogram = metrics.Histogram(metrics.LATENCY_BUCKETS)
+    with histogram.time():
+        pass
+
+    counts, total = histogram.snapshot()
+    assert counts[0] == 1
+    assert 0 <= total < metrics.LATENCY_BUCKETS[0]
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_by_operation_id(monkeypatch):
+    family = metrics.HistogramFamily('test', 'Test.', ('route', 'method', 'status'))
+    monkeypatch.setattr(metrics, 'request_duration', family)
+
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get('/items/{item_id}', operation_id='get_item')
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail='item not found.')
+        return {}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://testserver'
+    ) as client:
+        await client.get('/items/1')
+        await client.get('/items/2')
+        await client.get('/items/0')
+        await client.get('/missing/1')
+
+    assert {
+        values: sum(histogram.snapshot()[0])
+        for values, histogram in family.children.items()
+    } == {
+        ('get_item', 'GET', '200'): 2,
+        ('get_item', 'GET', '404'): 1,
+        ('unmatched', 'GET', '404'): 1,
+    }
+
+
+def test_command_listener(monkeypatch):
+    family = metrics.HistogramFamily('test', 'Test.', ('command', 'status'))
+    monkeypatch.setattr(metrics, 'mongo_command_duration', family)
+    listener = metrics.MetricsCommandListener()
+
+    listener.succeeded(Mock(command_name='find', duration_micros=1500))
+    listener.failed(Mock(command_name='insert', duration_micros=500))
+
+    assert family.labels('find', 'succeeded').snapshot() == (
+        [0, 1] + [0] * (len(metrics.LATENCY_BUCKETS) - 1),
+        0.0015,
+    )
+    assert family.labels('insert', 'failed').snapshot()[0][0] == 1
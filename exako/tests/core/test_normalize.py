@@ -0,0 +1,39 @@
+import pytest
+
+from exako.core.constants import Language
+from exako.core.normalize import normalize_text, normalize_texts
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    [
+        ('  Hello, World!  ', 'hello world'),
+        ('¿Dónde está?', 'dónde está'),
+        ('“Don’t” — stop…', 'dont  stop'),
+        ('Straße', 'strasse'),
+    ],
+)
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+def test_normalize_text_composed_and_decomposed_accents():
+    assert normalize_text('cafe\u0301', Language.FRENCH) == 'caf\u00e9'
+
+
+def test_normalize_text_accent_insensitive_language():
+    assert normalize_text('Café naïve', Language.ENGLISH_USA) == 'cafe naive'
+    assert normalize_text('Café', Language.PORTUGUESE_BRAZIL) == 'café'
+
+
+def test_normalize_text_turkish_dotted_i():
+    assert normalize_text('İstanbul', Language.TURKISH) == 'istanbul'
+    assert normalize_text('IRMAK', Language.TURKISH) == 'ırmak'
+
+
+def test_normalize_texts():
+    assert normalize_texts(['The', 'dog.', '!'], Language.ENGLISH_UK) == [
+        'the',
+        'dog',
+        '',
+    ]
@@ -0,0 +1,224 @@
+import asyncio
+from itertools import count
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+from bson import ObjectId
+
+from exako.core import query_monitor
+from exako.core.query_monitor import (
+    QueryMonitor,
+    explain_command,
+    query_key,
+    query_shape,
+)
+from exako.settings import settings
+
+request_ids = count()
+
+
+def run_command(monitor, command, duration_ms, database='exako'):
+    command_name = next(iter(command))
+    request_id = next(request_ids)
+    monitor.started(
+        Mock(
+            command_name=command_name,
+            command=command,
+            connection_id=('localhost', 27017),
+            request_id=request_id,
+            database_name=database,
+        )
+    )
+    monitor.succeeded(
+        Mock(
+            command_name=command_name,
+            connection_id=('localhost', 27017),
+            request_id=request_id,
+            duration_micros=duration_ms * 1000,
+            database_name=database,
+        )
+    )
+
+
+def test_query_shape_removes_values():
+    command = {
+        'find': 'exercises',
+        'filter': {
+            '_id': ObjectId(),
+            'type': {'$in': [1, 2, 3]},
+            '$or': [{'language': 'en-us'}, {'level': 'a1'}],
+        },
+        'limit': 1,
+        'lsid': {'id': 'session'},
+        '$db': 'exako',
+    }
+
+    assert query_shape('find', command) == {
+        'find': 'exercises',
+        'filter': {
+            '_id': '?',
+            'type': {'$in': '?'},
+            '$or': [{'language': '?'}, {'level': '?'}],
+        },
+        'limit': '?',
+    }
+
+
+def test_query_shape_batches_and_cursors():
+    insert = {'insert': 'exercise_history', 'documents': [{'a': 1}, {'a': 2, 'b': 3}]}
+    get_more = {'getMore': 123456, 'collection': 'exercises'}
+
+    assert query_shape('insert', insert) == {
+        'insert': 'exercise_history',
+        'documents': [{'a': '?'}],
+    }
+    assert query_shape('getMore', get_more) == {
+        'getMore': '?',
+        'collection': 'exercises',
+    }
+
+
+def test_query_key_is_hashable_shape():
+    first = {'find': 'exercises', 'filter': {'level': 'a1', 'type': {'$in': [1]}}}
+    second = {'find': 'exercises', 'filter': {'level': 'b1', 'type': {'$in': [2, 3]}}}
+    other = {'find': 'exercises', 'filter': {'level': 'a1'}, 'sort': {'_id': 1}}
+
+    assert query_key('find', first) == query_key('find', second)
+    assert query_key('find', first) != query_key('find', other)
+    assert len({query_key('find', first), query_key('find', other)}) == 2
+
+
+def test_shapes_are_built_once_per_key():
+    monitor = QueryMonitor()
+    with patch.object(
+        query_monitor, 'query_shape', wraps=query_monitor.query_shape
+    ) as shape:
+        monitor.started(
+            Mock(
+                command_name='find',
+                command={'find': 'exercises', 'filter': {'level': 'a1'}},
+                connection_id=('localhost', 27017),
+                request_id=-1,
+            )
+        )
+        assert shape.call_count == 0
+        for level in ('b1', 'c1'):
+            run_command(monitor, {'find': 'exercises', 'filter': {'level': level}}, 5)
+
+    # query_key goes through query_shape with tuples, the dict is built once
+    assert [call.kwargs for call in shape.call_args_list].count({}) == 1
+    (stats,) = monitor.top(10)
+    assert stats['count'] == 2
+
+
+def test_explain_command():
+    command = {
+        'update': 'exercises',
+        'updates': [{'q': {'_id': 1}, 'u': {'$inc': {'attempts': 1}}}] * 2,
+        'ordered': True,
+        'lsid': {'id': 'session'},
+        '$db': 'exako',
+    }
+
+    assert explain_command(command) == {
+        'explain': {
+            'update': 'exercises',
+            'updates': [{'q': {'_id': 1}, 'u': {'$inc': {'attempts': 1}}}],
+        },
+        'verbosity': 'queryPlanner',
+    }
+
+
+def test_top_shapes_by_total_time():
+    monitor = QueryMonitor()
+    for value in range(3):
+        run_command(monitor, {'find': 'exercises', 'filter': {'_id': value}}, 5)
+    run_command(monitor, {'find': 'exercise_review', 'filter': {'user_id': 1}}, 12)
+
+    top = monitor.top(10)
+    assert [stats['shape']['find'] for stats in top] == [
+        'exercises',
+        'exercise_review',
+    ]
+    assert top[0]['count'] == 3
+    assert top[0]['mean_ms'] == 5
+    assert monitor.top(1) == top[:1]
+    assert monitor.pending == {}
+
+
+def test_evicts_the_cheapest_shape():
+    monitor = QueryMonitor()
+    with patch.object(settings, 'QUERY_MONITOR_MAX_SHAPES', 2):
+        run_command(monitor, {'find': 'a'}, 10)
+        run_command(monitor, {'find': 'b'}, 1)
+        run_command(monitor, {'find': 'c'}, 5)
+
+    assert [stats['shape']['find'] for stats in monitor.top(10)] == ['a', 'c']
+
+
+def test_evicts_shapes_no_longer_seen():
+    monitor = QueryMonitor()
+    with (
+        patch.object(settings, 'QUERY_MONITOR_MAX_SHAPES', 2),
+        patch.object(settings, 'QUERY_MONITOR_HALF_LIFE', 60),
+        patch.object(query_monitor, 'monotonic', return_value=0),
+    ):
+        run_command(monitor, {'find': 'a'}, 100)
+        query_monitor.monotonic.return_value = 600
+        run_command(monitor, {'find': 'b'}, 5)
+        run_command(monitor, {'find': 'c'}, 3)
+
+    assert [stats['shape']['find'] for stats in monitor.top(10)] == ['b', 'c']
+
+
+def test_drops_commands_without_reply():
+    monitor = QueryMonitor()
+    with patch.object(query_monitor, 'MAX_PENDING', 2):
+        for request_id in range(3):
+            monitor.started(
+                Mock(
+                    command_name='find',
+                    command={'find': 'exercises'},
+                    connection_id=('localhost', 27017),
+                    request_id=request_id,
+                )
+            )
+
+    assert list(monitor.pending) == [
+        (('localhost', 27017), 1),
+        (('localhost', 27017), 2),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_slow_query_is_explained_once(caplog):
+    database = MagicMock()
+    database.command = AsyncMock(
+        return_value={'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}, 'ok': 1}
+    )
+    client = MagicMock()
+    client.__getitem__.return_value = database
+    monitor = QueryMonitor()
+    monitor.start(client)
+
+    with patch.object(settings, 'SLOW_QUERY_THRESHOLD_MS', 50):
+        run_command(monitor, {'find': 'exercises', 'filter': {'level': 'a1'}}, 10)
+        for level in ('b1', 'c1'):
+            await asyncio.to_thread(
+                run_command,
+                monitor,
+                {'find': 'exercises', 'filter': {'level': level}},
+                80,
+            )
+    await asyncio.gather(*monitor.tasks)
+
+    database.command.assert_awaited_once_with(
+        {
+            'explain': {'find': 'exercises', 'filter': {'level': 'b1'}},
+            'verbosity': 'queryPlanner',
+        }
+    )
+    (stats,) = monitor.top(10)
+    assert stats['slow_count'] == 2
+    assert stats['explain'] == {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}}
+    assert caplog.text.count('slow find') == 2
@@ -0,0 +1,167 @@
+import asyncio
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from httpx import ASGITransport, AsyncClient
+
+from exako.core import tracing
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.Tracer()
+    tracer.configure(tracing.JSONExporter(io.StringIO()))
+    return tracer
+
+
+@pytest.mark.parametrize(
+    'value, expected',
+    [
+        (f'00-{TRACE_ID}-{PARENT_ID}-01', (TRACE_ID, PARENT_ID)),
+        (f'00-{"0" * 32}-{PARENT_ID}-01', None),
+        (f'00-{TRACE_ID}-xyz-01', None),
+        ('invalid', None),
+        (None, None),
+    ],
+)
+def test_parse_traceparent(value, expected):
+    assert tracing.parse_traceparent(value) == expected
+
+
+def test_disabled_tracer():
+    tracer = tracing.Tracer()
+    with tracer.span('noop') as span:
+        assert span is None
+    assert tracer.pending == []
+
+
+@pytest.mark.asyncio
+async def test_spans_propagate_across_tasks_and_threads(tracer):
+    def decode():
+        with tracer.span('decode'):
+            pass
+
+    async def load():
+        with tracer.span('load'):
+            await asyncio.sleep(0)
+
+    with tracer.span('request', kind='server') as root:
+        await asyncio.gather(load(), run_in_threadpool(decode))
+        assert tracer.propagation_headers() == {'traceparent': root.traceparent}
+
+    spans = {span.name: span for span in tracer.pending}
+    assert spans.keys() == {'request', 'load', 'decode'}
+    assert {span.trace_id for span in spans.values()} == {root.trace_id}
+    assert spans['load'].parent_id == root.span_id
+    assert spans['decode'].parent_id == root.span_id
+    assert root.parent_id is None
+    assert tracing.current_span.get() is None
+
+
+def test_span_records_error(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span('failing', item=1):
+            raise ValueError('invalid item.')
+
+    (span,) = tracer.pending
+    assert span.error == "ValueError('invalid item.')"
+    assert span.attributes == {'item': 1}
+    assert span.end_ns >= span.start_ns
+
+
+@pytest.mark.asyncio
+async def test_json_exporter(tracer):
+    with tracer.span('parent', traceparent=f'00-{TRACE_ID}-{PARENT_ID}-01'):
+        pass
+    await tracer.flush()
+
+    (line,) = tracer.exporter.stream.getvalue().splitlines()
+    record = json.loads(line)
+    assert record['trace_id'] == TRACE_ID
+    assert record['parent_id'] == PARENT_ID
+    assert record['name'] == 'parent'
+    assert tracer.pending == []
+
+
+@pytest.mark.asyncio
+async def test_json_exporter_opens_file_on_start(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    tracer = tracing.Tracer()
+    tracer.configure(tracing.JSONExporter(path=path))
+    assert not path.exists()
+
+    tracer.start()
+    with tracer.span('request'):
+        pass
+    await tracer.stop()
+
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line)['name'] == 'request'
+    assert tracer.exporter.file is None
+
+
+@pytest.mark.asyncio
+async def test_otlp_client_closed_on_stop():
+    tracer = tracing.Tracer()
+    tracer.configure(tracing.OTLPExporter('http://collector/v1/traces', 'exako'))
+
+    tracer.start()
+    client = tracer.exporter.client
+    await tracer.stop()
+
+    assert client.is_closed
+    assert tracer.exporter.client is None
+
+
+def test_otlp_payload():
+    exporter = tracing.OTLPExporter('http://collector/v1/traces', 'exako')
+    span = tracing.Span(
+        'speech.decode', attributes={'mode': 'local', 'stream': False, 'size': 3}
+    )
+    span.end_ns = span.start_ns + 1000
+    span.error = 'boom'
+
+    (encoded,) = exporter.payload([span])['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert encoded['kind'] == 1
+    assert encoded['endTimeUnixNano'] == str(span.start_ns + 1000)
+    assert encoded['attributes'] == [
+        {'key': 'mode', 'value': {'stringValue': 'local'}},
+        {'key': 'stream', 'value': {'boolValue': False}},
+        {'key': 'size', 'value': {'intValue': '3'}},
+    ]
+    assert encoded['status'] == {'code': 2, 'message': 'boom'}
+    assert 'parentSpanId' not in encoded
+
+
+@pytest.mark.asyncio
+async def test_middleware_continues_remote_trace(tracer, monkeypatch):
+    monkeypatch.setattr(tracing, 'tracer', tracer)
+    monkeypatch.setattr(tracing, 'span', tracer.span)
+
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get('/items/{item_id}', operation_id='get_item')
+    async def get_item(item_id: int):
+        with tracer.span('item.load'):
+            return {}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://testserver'
+    ) as client:
+        await client.get(
+            '/items/1', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'}
+        )
+
+    load, request = tracer.pending
+    assert request.name == 'GET get_item'
+    assert request.kind == 'server'
+    assert (request.trace_id, request.parent_id) == (TRACE_ID, PARENT_ID)
+    assert request.attributes['status'] == 200
+    assert load.parent_id == request.span_id
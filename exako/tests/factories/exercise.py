@@ -1,7 +1,7 @@
 import json
 from random import choice
 from typing import ClassVar
-from uuid import UUID, uuid4
+from uuid import UUID
 
 from beanie import PydanticObjectId
 from faker import Faker
@@ -15,8 +15,13 @@ from exako.core.constants import ExerciseType, Language, Level
 faker = Faker()
 
 
+def fake_uuid() -> UUID:
+    # drawn from the faker random, so seed_instance makes the references repeat
+    return faker.uuid4(cast_to=None)
+
+
 def generate_alternatives(number):
-    return {uuid4(): faker.word() for _ in range(number)}
+    return {fake_uuid(): faker.word() for _ in range(number)}
 
 
 class ExerciseBaseFactory(BaseModel):
@@ -34,9 +39,17 @@ class ExerciseBaseFactory(BaseModel):
         cls.__init__(instance, **data)
         return cls.model(**instance.model_dump(exclude_none=True)).insert()
 
+    @classmethod
+    def build(cls, **kwargs):
+        instance = cls(insert_mongo=False, **kwargs)
+        return cls.model(**instance.model_dump(exclude_none=True))
+
     @classmethod
     async def insert_batch(cls, *, size, **kwargs):
-        return [await cls(**kwargs) for _ in range(size)]
+        # insert_many does not set the ids back, so they are generated here
+        documents = [cls.build(id=PydanticObjectId(), **kwargs) for _ in range(size)]
+        await cls.model.insert_many(documents)
+        return documents
 
     @classmethod
     def generate_payload(cls, include=None, exclude=None, **kwargs):
@@ -67,7 +80,7 @@ class OrderSentenceFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.ORDER_SENTENCE
     sentence: list[str] = Field(default_factory=lambda: faker.sentence().split())
     distractors: list[str] | None = ['qawe', 'awr', 'q2awt', 'q245asr']
-    term_example_id: UUID = Field(default_factory=uuid4)
+    term_example_id: UUID = Field(default_factory=fake_uuid)
 
     model: ClassVar = models.OrderSentence
     term_reference: ClassVar[str] = 'term_example_id'
@@ -78,7 +91,7 @@ class ListenTermFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.LISTEN_TERM
     audio_url: str = 'https://example.com/url.mp3'
     answer: str = Field(default_factory=lambda: faker.word())
-    term_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
 
     model: ClassVar = models.ListenTerm
     term_reference: ClassVar[str] = 'term_id'
@@ -89,7 +102,7 @@ class ListenTermMChoiceFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.LISTEN_TERM_MCHOICE
     audio_url: str = 'https://example.com/url.mp3'
     content: str = Field(default_factory=lambda: faker.word())
-    term_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
     distractors: dict[UUID, str] = Field(
         default_factory=lambda: generate_alternatives(8)
     )
@@ -103,7 +116,7 @@ class ListenSentenceFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.LISTEN_SENTENCE
     audio_url: str = 'https://example.com/url.mp3'
     answer: str = Field(default_factory=lambda: faker.word())
-    term_example_id: UUID = Field(default_factory=uuid4)
+    term_example_id: UUID = Field(default_factory=fake_uuid)
 
     model: ClassVar = models.ListenSentence
     term_reference: ClassVar[str] = 'term_example_id'
@@ -115,7 +128,7 @@ class SpeakTermFactory(ExerciseBaseFactory):
     audio_url: str = 'https://example.com/url.mp3'
     phonetic: str = 'head'
     answer: str = Field(default_factory=lambda: faker.word())
-    term_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
 
     model: ClassVar = models.SpeakTerm
     term_reference: ClassVar[str] = 'term_id'
@@ -127,7 +140,7 @@ class SpeakSentenceFactory(ExerciseBaseFactory):
     audio_url: str = 'https://example.com/url.mp3'
     phonetic: str = 'head'
     answer: str = Field(default_factory=lambda: faker.word())
-    term_example_id: UUID = Field(default_factory=uuid4)
+    term_example_id: UUID = Field(default_factory=fake_uuid)
 
     model: ClassVar = models.SpeakSentence
     term_reference: ClassVar[str] = 'term_example_id'
@@ -138,7 +151,7 @@ class TermSentenceMChoiceFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.TERM_SENTENCE_MCHOICE
     sentence: str = Field(default_factory=lambda: faker.sentence())
     answer: str = Field(default_factory=lambda: faker.word())
-    term_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
     distractors: dict[UUID, str] = Field(
         default_factory=lambda: generate_alternatives(8)
     )
@@ -152,8 +165,8 @@ class TermDefinitionMChoiceFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.TERM_DEFINITION_MCHOICE
     content: str = Field(default_factory=lambda: faker.word())
     answer: str = Field(default_factory=lambda: faker.word())
-    term_id: UUID = Field(default_factory=uuid4)
-    term_definition_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
+    term_definition_id: UUID = Field(default_factory=fake_uuid)
     distractors: dict[UUID, str] = Field(
         default_factory=lambda: generate_alternatives(8)
     )
@@ -167,7 +180,7 @@ class TermImageMChoiceFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.TERM_IMAGE_MCHOICE
     audio_url: str = 'https://example.com/url.mp3'
     image_url: str = 'https://example.com/url.svg'
-    term_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
     distractors: dict[UUID, str] = Field(
         default_factory=lambda: generate_alternatives(8)
     )
@@ -181,7 +194,7 @@ class TermImageTextMChoiceFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.TERM_IMAGE_TEXT_MCHOICE
     image_url: str = 'https://example.com/url.svg'
     answer: str = Field(default_factory=lambda: faker.word())
-    term_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
     distractors: dict[UUID, str] = Field(
         default_factory=lambda: generate_alternatives(8)
     )
@@ -194,7 +207,7 @@ class TermImageTextMChoiceFactory(ExerciseBaseFactory):
 class TermConnectionFactory(ExerciseBaseFactory):
     type: ExerciseType = ExerciseType.TERM_CONNECTION
     content: str = Field(default_factory=lambda: faker.word())
-    term_id: UUID = Field(default_factory=uuid4)
+    term_id: UUID = Field(default_factory=fake_uuid)
     connections: dict[UUID, str] = Field(
         default_factory=lambda: generate_alternatives(8)
     )